@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 07:00
+# @Description   : 接口压测
+"""
+启动 stardew.runserver.app(进程内，经由ASGI调用，不经过网络)或压测已启动的服务(--url)，
+准备固定的测试数据后依次执行各场景，每个场景输出一行json: 吞吐量、延迟分位数及错误数。
+进程内运行时还会输出每次操作执行的sql语句数及redis往返次数(取自请求指标)，这两项与机器负载无关，
+可以直接在不同提交间比较；耗时类指标请在同一台机器、相同参数下比较。
+
+场景:
+    login     : 获取验证码，从redis读取验证码后登录(两个请求，包含一次bcrypt校验)。
+                受bcrypt的cpu时间限制，操作次数由 --login-requests 单独指定
+    user_list : 用户列表第一页(游标分页)
+    menu_list : 菜单列表，需要admin角色
+    menu_tree : 权限树，需要 sys:menu:tree 权限
+    role_crud : 创建角色，查询、修改、删除一个预置的角色(四个请求)
+
+数据库:
+    --db sqlite: 在临时目录中新建sqlite数据库(sqlite+aiosqlite)，每次运行的数据完全相同(默认)
+    --db env   : 使用 .env / 环境变量中的数据库配置。库中已有数据时需要指定 --reset 清空重建(会删除所有数据!)
+redis:
+    --redis env : 使用 .env / 环境变量中的redis配置(默认)。缓存需要与测试数据一致，db中已有数据时需要指定 --reset 清空
+    --redis fake: 进程内启动fakeredis服务，需要安装 fakeredis[lua]
+    其他值作为redis的URI
+
+运行方式:
+    python -m benchmarks.bench_api --reset --users 1000 --concurrency 20 --requests 2000
+    python -m benchmarks.bench_api --db env --reset --scenarios login,menu_tree --output results.jsonl
+    python -m benchmarks.bench_api --url http://127.0.0.1:8000 --db env --reset
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+import httpx
+
+# 测试用户的密码，所有用户共用一个哈希
+_PASSWORD: str = "bench_password"
+# 鉴权场景所需的权限
+_REQUIRED_PERMS: Tuple[str, ...] = ("sys:menu:tree", "sys:role:query", "sys:role:delete")
+
+
+def configure(args: argparse.Namespace) -> Optional[Any]:
+    """
+    根据参数设置数据库及redis的环境变量，必须在导入stardew之前调用
+    :return: fakeredis服务，未使用时为None
+    """
+    if args.db == "sqlite":
+        path: str = os.path.join(tempfile.mkdtemp(prefix="stardew_bench_"), "stardew.db")
+        os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+        os.environ["SQLALCHEMY_ASYNC_DATABASE_URI"] = f"sqlite+aiosqlite:///{path}"
+    server = None
+    if args.redis == "fake":
+        try:
+            import lupa  # noqa: F401
+            from fakeredis import TcpFakeServer
+        except ImportError:
+            sys.exit("--redis fake 需要安装 fakeredis[lua]")
+        server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+        threading.Thread(target=server.serve_forever, name="fakeredis", daemon=True).start()
+        os.environ["REDIS_DSN"] = f"redis://127.0.0.1:{server.server_address[1]}/0"
+    elif args.redis != "env":
+        os.environ["REDIS_DSN"] = args.redis
+    # 压测时不记录每个请求的日志
+    os.environ.setdefault("LOG_LEVEL", "30")
+    return server
+
+
+def seed(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    准备测试数据: 菜单树、角色(admin拥有全部菜单)及用户(都拥有admin角色)，以及role_crud场景消耗的角色
+    :return: 用户邮箱及role_crud场景使用的角色id
+    """
+    from sqlalchemy import func, insert, select
+
+    from stardew.settings import settings
+    from stardew.core.db.base import Base, Database
+    from stardew.common.utils import SecurityUtil
+    from stardew.models.system import SysMenu, SysRole, SysUser, role_menu, user_role
+
+    db = Database(dsn=settings.SQLALCHEMY_DATABASE_URI, async_dsn=settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+    if args.reset:
+        Base.metadata.drop_all(db.engine)
+    Base.metadata.create_all(db.engine)
+    rng = random.Random(args.seed)
+    with db.session() as session:
+        if session.execute(select(func.count()).select_from(SysUser)).scalar():
+            sys.exit("数据库中已有用户数据，请使用空数据库或指定 --reset")
+
+        menus: List[Dict[str, Any]] = [{"id": "0", "name": "root", "path": "/", "perm": "", "order_num": 0}]
+        for i in range(max(args.menus, len(_REQUIRED_PERMS))):
+            perm: str = _REQUIRED_PERMS[i] if i < len(_REQUIRED_PERMS) else f"bench:menu:{i}"
+            # 前10个挂在根节点下，之后随机挂在已有的菜单下，形成多层的树
+            parent: str = "0" if i < 10 else rng.choice(menus[1:])["id"]
+            menus.append({"id": f"menu{i:08d}", "name": perm, "parent_id": parent, "path": f"/{perm}",
+                          "perm": perm, "order_num": i})
+        roles: List[Dict[str, Any]] = [{"id": "role_admin", "name": "admin", "key": "admin"}]
+        roles += [{"id": f"role{i:08d}", "name": f"bench_{i}", "key": f"bench_{i}"} for i in range(1, args.roles)]
+        disposable: List[Dict[str, Any]] = [
+            {"id": f"disposable{i:08d}", "name": f"disposable_{i}", "key": f"disposable_{i}"}
+            for i in range(args.requests + args.warmup)
+        ] if "role_crud" in args.scenarios else []
+        hashed: str = SecurityUtil.generate_password(_PASSWORD)
+        users: List[Dict[str, Any]] = [
+            {"id": f"user{i:08d}", "username": f"bench_{i}", "email": f"bench_{i}@stardew.io", "password": hashed}
+            for i in range(args.users)
+        ]
+        role_menus: List[Dict[str, str]] = [{"role_id": "role_admin", "menu_id": menu["id"]} for menu in menus[1:]]
+        for role in roles[1:]:
+            for menu in rng.sample(menus[1:], min(5, len(menus) - 1)):
+                role_menus.append({"role_id": role["id"], "menu_id": menu["id"]})
+
+        session.execute(insert(SysMenu), menus)
+        session.execute(insert(SysRole), roles + disposable)
+        session.execute(insert(SysUser), users)
+        session.execute(insert(role_menu), role_menus)
+        session.execute(insert(user_role), [{"user_id": user["id"], "role_id": "role_admin"} for user in users])
+        session.commit()
+    db.engine.dispose()
+    return {
+        "emails": [user["email"] for user in users],
+        "disposable": [role["id"] for role in disposable],
+    }
+
+
+class Context:
+
+    """ 场景共享的数据 """
+
+    def __init__(self, client: httpx.AsyncClient, redis: Any, data: Dict[str, Any]) -> None:
+        self.client = client
+        self.redis = redis
+        self.emails: List[str] = data["emails"]
+        self.disposable: List[str] = data["disposable"]
+        # 已登录用户的请求头，鉴权场景轮流使用
+        self.headers: List[Dict[str, str]] = []
+        self.created: int = 0
+
+    async def login(self, email: str) -> httpx.Response:
+        from stardew.common.constants import Constant
+
+        response: httpx.Response = await self.client.get("/captcha")
+        if response.status_code != 200:
+            return response
+        uid: str = response.json()["uid"]
+        code: str = await self.redis.get(Constant.CAPTCHA_REDIS_KEY + uid, encoding="utf-8")
+        return await self.client.post(
+            "/login", json={"email": email, "password": _PASSWORD, "uid": uid, "code": code or ""}
+        )
+
+
+def _status(*responses: httpx.Response) -> int:
+    """ 第一个失败的状态码，全部成功时返回最后一个 """
+    for response in responses:
+        if response.status_code >= 400:
+            return response.status_code
+    return responses[-1].status_code
+
+
+async def login(context: Context, index: int) -> int:
+    return (await context.login(context.emails[index % len(context.emails)])).status_code
+
+
+async def user_list(context: Context, index: int) -> int:
+    headers: Dict[str, str] = context.headers[index % len(context.headers)]
+    return _status(await context.client.get("/sys/user/", params={"cursor": "", "page_size": 20}, headers=headers))
+
+
+async def menu_list(context: Context, index: int) -> int:
+    headers: Dict[str, str] = context.headers[index % len(context.headers)]
+    return _status(await context.client.get("/sys/menu/", headers=headers))
+
+
+async def menu_tree(context: Context, index: int) -> int:
+    headers: Dict[str, str] = context.headers[index % len(context.headers)]
+    return _status(await context.client.get("/sys/menu/tree", headers=headers))
+
+
+async def role_crud(context: Context, index: int) -> int:
+    client: httpx.AsyncClient = context.client
+    headers: Dict[str, str] = context.headers[index % len(context.headers)]
+    key: str = f"created_{context.created}"
+    context.created += 1
+    role_id: str = context.disposable.pop()
+    responses: List[httpx.Response] = [
+        await client.post("/sys/role/", json={"name": key, "key": key}, headers=headers),
+        await client.get(f"/sys/role/{role_id}", params={"role_id": role_id}, headers=headers),
+        await client.put(f"/sys/role/{role_id}", json={"name": f"{key}_updated"}, headers=headers),
+        await client.delete(f"/sys/role/{role_id}", headers=headers),
+    ]
+    return _status(*responses)
+
+
+SCENARIOS: Dict[str, Callable[[Context, int], Awaitable[int]]] = {
+    "login": login,
+    "user_list": user_list,
+    "menu_list": menu_list,
+    "menu_tree": menu_tree,
+    "role_crud": role_crud,
+}
+
+
+def _percentile(latencies: List[float], percent: float) -> float:
+    """ 最近秩法，latencies 已排序 """
+    index: int = max(int(len(latencies) * percent / 100 + 0.5) - 1, 0)
+    return round(latencies[min(index, len(latencies) - 1)] * 1000, 2)
+
+
+def _request_counters() -> Tuple[int, int, int]:
+    """ 请求指标中全部路由的 (请求数, sql语句数, redis往返次数) """
+    from stardew.core.metrics import request_metrics
+
+    routes = request_metrics.routes()
+    return (
+        sum(route.count for route in routes),
+        sum(route.db_statements for route in routes),
+        sum(route.redis_round_trips for route in routes),
+    )
+
+
+async def run(
+        scenario: Callable[[Context, int], Awaitable[int]],
+        context: Context,
+        concurrency: int,
+        total: int
+) -> Dict[str, Any]:
+    """
+    使用 concurrency 个协程执行 total 次操作
+    :return: 吞吐量、延迟分位数及按状态码统计的错误数
+    """
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter: List[int] = [0]
+
+    async def worker() -> None:
+        while counter[0] < total:
+            index: int = counter[0]
+            counter[0] += 1
+            start: float = time.perf_counter()
+            try:
+                code: int = await scenario(context, index)
+            except Exception as e:
+                code = 0
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            latencies.append(time.perf_counter() - start)
+            if code >= 400:
+                errors[str(code)] = errors.get(str(code), 0) + 1
+
+    begin: float = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed: float = time.perf_counter() - begin
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "rps": round(total / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p50_ms": _percentile(latencies, 50),
+        "p90_ms": _percentile(latencies, 90),
+        "p99_ms": _percentile(latencies, 99),
+        "max_ms": round(latencies[-1] * 1000, 2),
+        "errors": errors,
+    }
+
+
+def _revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def emit(record: Dict[str, Any], output: Optional[str]) -> None:
+    line: str = orjson.dumps(record).decode()
+    print(line)
+    if output:
+        with open(output, "a") as f:
+            f.write(line + "\n")
+
+
+async def main(args: argparse.Namespace) -> None:
+    import aioredis
+
+    from stardew.settings import settings
+
+    redis = await aioredis.create_redis_pool(settings.REDIS_DSN)
+    if args.redis != "fake":
+        # 角色权限、菜单树等缓存必须与新准备的数据一致
+        if not args.reset and await redis.dbsize():
+            sys.exit("redis当前db中已有数据，请使用空的db(--redis redis://host:port/db)或指定 --reset")
+        await redis.flushdb()
+    data: Dict[str, Any] = seed(args)
+
+    app = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from stardew.runserver import app
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://stardew", timeout=60)
+
+    emit({
+        "revision": _revision(),
+        "python": platform.python_version(),
+        "db": args.db if args.db == "sqlite" else settings.SQLALCHEMY_ASYNC_DATABASE_URI.split(":")[0],
+        "redis": args.redis if args.redis in ("env", "fake") else "dsn",
+        "target": args.url or "asgi",
+        "users": args.users,
+        "roles": args.roles,
+        "menus": args.menus,
+        "seed": args.seed,
+    }, args.output)
+
+    context = Context(client, redis, data)
+    try:
+        if set(args.scenarios) - {"login"}:
+            # 鉴权场景使用的登录会话，每个并发协程一个
+            for index in range(min(args.concurrency, len(context.emails))):
+                response: httpx.Response = await context.login(context.emails[index])
+                response.raise_for_status()
+                context.headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+        for name in args.scenarios:
+            scenario = SCENARIOS[name]
+            total: int = args.login_requests if name == "login" else args.requests
+            await run(scenario, context, args.concurrency, args.warmup)
+            before: Tuple[int, int, int] = _request_counters()
+            result: Dict[str, Any] = await run(scenario, context, args.concurrency, total)
+            if app is not None:
+                requests, statements, round_trips = (b - a for a, b in zip(before, _request_counters()))
+                result["http_requests_per_op"] = round(requests / total, 2)
+                result["db_statements_per_op"] = round(statements / total, 2)
+                result["redis_round_trips_per_op"] = round(round_trips / total, 2)
+            emit({"scenario": name, **result}, args.output)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+        redis.close()
+        await redis.wait_closed()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", choices=("sqlite", "env"), default="sqlite", help="数据库")
+    parser.add_argument("--redis", default="env", help="env、fake 或redis的URI")
+    parser.add_argument("--reset", action="store_true", help="清空数据库(删除并重建所有表)及redis当前db")
+    parser.add_argument("--url", default=None, help="压测已启动的服务，为空时在进程内启动应用")
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS),
+                        help=f"逗号分隔的场景，可选: {','.join(SCENARIOS)}")
+    parser.add_argument("--users", type=int, default=1000, help="预置用户数")
+    parser.add_argument("--roles", type=int, default=20, help="预置角色数")
+    parser.add_argument("--menus", type=int, default=200, help="预置菜单数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发协程数")
+    parser.add_argument("--requests", type=int, default=1000, help="每个场景的操作次数")
+    parser.add_argument("--login-requests", type=int, default=100, help="login场景的操作次数")
+    parser.add_argument("--warmup", type=int, default=50, help="每个场景正式计时前的操作次数")
+    parser.add_argument("--seed", type=int, default=0, help="生成测试数据的随机种子")
+    parser.add_argument("--output", default=None, help="同时追加写入的结果文件")
+    arguments: argparse.Namespace = parser.parse_args()
+    unknown: List[str] = [name for name in arguments.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知的场景: {','.join(unknown)}")
+    fake_redis = configure(arguments)
+    asyncio.run(main(arguments))
+    if fake_redis is not None:
+        fake_redis.shutdown()
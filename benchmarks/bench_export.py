@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 00:40
+# @Description   : 一次性查询全表与流式导出的耗时及内存峰值对比
+"""
+导出全部用户，对比:
+    list  : 列表接口的方式，查询全部orm对象，逐个 UserSimpleSchema.from_orm，再经 jsonable_encoder 序列化
+    stream: stardew.core.exporter，服务端游标分批读取列数据并直接以orjson编码
+
+内存峰值通过 tracemalloc 统计，流式导出的峰值只与 --chunk-size 有关。
+
+运行方式:
+    python -m benchmarks.bench_export --users 100000 --chunk-size 1000
+"""
+import time
+import asyncio
+import argparse
+import tracemalloc
+from typing import Dict, List, Callable, Awaitable
+
+import orjson
+from sqlalchemy import select
+from fastapi.encoders import jsonable_encoder
+
+from stardew.settings import settings
+from stardew.core.db.base import Database
+from stardew.core.exporter import schema_columns, encode_stream
+from stardew.models.system import SysUser
+from stardew.repository.system import AsyncUserRepository
+from stardew.schemas.system import UserSimpleSchema
+from benchmarks.bench_repository import seed_users
+
+
+async def measure(call: Callable[[], Awaitable[int]]) -> Dict:
+    """ 执行一次导出，返回耗时、输出大小及内存峰值 """
+    tracemalloc.start()
+    begin: float = time.perf_counter()
+    size: int = await call()
+    elapsed: float = time.perf_counter() - begin
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "bytes": size, "peak_mb": round(peak / 1024 / 1024, 2)}
+
+
+async def main(args: argparse.Namespace) -> None:
+    db = Database(dsn=args.dsn, async_dsn=args.async_dsn, echo=False)
+    seed_users(db, args.users)
+    repository = AsyncUserRepository(session_factory=db.async_session)
+    columns = schema_columns(SysUser, UserSimpleSchema)
+    names: List[str] = [column.key for column in columns]
+
+    async def list_call() -> int:
+        async with db.async_session() as session:
+            users: List[SysUser] = (await session.execute(select(SysUser).order_by(SysUser.id))).scalars().all()
+        return len(orjson.dumps(jsonable_encoder([UserSimpleSchema.from_orm(user) for user in users])))
+
+    async def stream_call() -> int:
+        size: int = 0
+        async for chunk in encode_stream("ndjson", names, repository.stream(columns, chunk_size=args.chunk_size)):
+            size += len(chunk)
+        return size
+
+    for name, call in (("list", list_call), ("stream", stream_call)):
+        result: Dict = await measure(call)
+        print(orjson.dumps({"mode": name, "users": args.users, **result}).decode())
+    await db.async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=settings.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument("--async-dsn", default=settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+    parser.add_argument("--users", type=int, default=100000, help="预置用户数")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="流式导出每批的行数")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 21:35
+# @Description   : 拼接字符串条件与绑定参数条件的查询耗时对比
+"""
+以不同的值反复执行同一结构的条件查询(按邮箱及状态查询用户)，对比:
+    text : 改造前 AsyncCRUDService.filter 的实现，f-string 拼接后包裹在 text() 中，
+           每个值都是一条新语句，sqlalchemy编译缓存与数据库预编译语句均无法复用
+    bound: stardew.core.db.filters 编译的绑定参数条件
+
+运行方式:
+    python -m benchmarks.bench_filter --users 10000 --repeat 2000
+"""
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, List, Callable, Awaitable
+
+import orjson
+from sqlalchemy import select, text
+from sqlalchemy.sql import Select
+
+from stardew.settings import settings
+from stardew.core.db.base import Database
+from stardew.core.db.crud import AsyncCRUDService
+from stardew.models.system import SysUser
+from benchmarks.bench_repository import seed_users
+
+
+async def measure(call: Callable[[str], Awaitable], emails: List[str]) -> Dict:
+    """ 依次以每个邮箱执行一次查询，返回吞吐量及耗时分布 """
+    latencies: List[float] = []
+    begin: float = time.perf_counter()
+    for email in emails:
+        start: float = time.perf_counter()
+        await call(email)
+        latencies.append(time.perf_counter() - start)
+    elapsed: float = time.perf_counter() - begin
+    latencies.sort()
+    return {
+        "queries": len(emails),
+        "qps": round(len(emails) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    db = Database(dsn=args.dsn, async_dsn=args.async_dsn, echo=False)
+    seed_users(db, args.users)
+    with db.session() as session:
+        emails: List[str] = session.execute(select(SysUser.email).limit(args.users)).scalars().all()
+    crud = AsyncCRUDService(model_class=SysUser, session_factory=db.async_session)
+
+    async def text_call(email: str) -> None:
+        async with db.async_session() as session:
+            where_stmt: str = " AND ".join(f"{k} = '{v}'" for k, v in {"email": email, "status": 0}.items())
+            stmt: Select = select(SysUser).where(text(where_stmt))
+            (await session.execute(stmt)).scalars().all()
+
+    async def bound_call(email: str) -> None:
+        await crud.filter(where_clause={"email": email, "status": 0})
+
+    for name, call in (("text", text_call), ("bound", bound_call)):
+        await measure(call, emails[:100])
+        result: Dict = await measure(call, random.choices(emails, k=args.repeat))
+        print(orjson.dumps({"mode": name, **result}).decode())
+    await db.async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=settings.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument("--async-dsn", default=settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+    parser.add_argument("--users", type=int, default=10000, help="预置用户数")
+    parser.add_argument("--repeat", type=int, default=2000, help="查询次数")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 05:40
+# @Description   : 日志输出方式对请求延迟的影响
+"""
+一个每次请求记录 --lines 条日志的接口，以 --concurrency 个并发持续请求，统计请求延迟分布:
+    off  : 不输出日志
+    sync : 改造前的方式，loguru同步写文件，在记录日志的线程中轮转并压缩
+    sync_json: 同上，使用loguru自带的json序列化(serialize=True)
+    queue: stardew.common.utils.log_sink.QueueFileSink，写文件、轮转、压缩都在后台线程
+为了在测试时间内触发轮转，轮转条件为 --rotation (默认 5 MB)
+
+运行方式:
+    python -m benchmarks.bench_logging --requests 20000 --concurrency 50 --lines 5
+"""
+import os
+import time
+import asyncio
+import tempfile
+import argparse
+from typing import Dict, List, Optional
+
+import httpx
+import orjson
+from fastapi import FastAPI
+from loguru import logger
+
+from stardew.common.utils.log_sink import QueueFileSink
+
+
+def create_app(lines: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping(user_id: str = "0a1b2c") -> Dict[str, str]:
+        for i in range(lines):
+            logger.bind(user_id=user_id).info(f"handling ping step {i} for {user_id}")
+        return {"ping": "pong"}
+
+    return app
+
+
+async def run(app: FastAPI, requests: int, concurrency: int) -> Dict[str, float]:
+    """ 并发请求，返回延迟分布(毫秒) """
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async def client() -> None:
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as session:
+            for i in remaining:
+                begin: float = time.perf_counter()
+                await session.get("/ping", params={"user_id": f"user{i}"})
+                latencies.append((time.perf_counter() - begin) * 1000)
+
+    begin: float = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed: float = time.perf_counter() - begin
+    latencies.sort()
+    return {
+        "rps": round(requests / elapsed),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)], 2),
+        "p999_ms": round(latencies[int(len(latencies) * 0.999)], 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    app = create_app(args.lines)
+    log_dir: str = tempfile.mkdtemp()
+    logger.remove()
+    for mode in ("off", "sync", "sync_json", "queue"):
+        path: str = os.path.join(log_dir, f"{mode}.log")
+        sink: Optional[QueueFileSink] = None
+        if mode == "sync":
+            handler_id = logger.add(path, rotation=args.rotation, compression="zip", format="{time} {level} {message}")
+        elif mode == "sync_json":
+            handler_id = logger.add(path, rotation=args.rotation, compression="zip", serialize=True)
+        elif mode == "queue":
+            sink = QueueFileSink(path, rotation=args.rotation)
+            handler_id = logger.add(sink, format="{message}")
+        result: Dict = await run(app, args.requests, args.concurrency)
+        if mode != "off":
+            logger.remove(handler_id)
+        print(orjson.dumps({"mode": mode, **result, **({"sink": sink.stats()} if sink else {})}).decode())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="请求数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发数")
+    parser.add_argument("--lines", type=int, default=5, help="每个请求记录的日志条数")
+    parser.add_argument("--rotation", default="5 MB", help="轮转条件")
+    asyncio.run(main(parser.parse_args()))
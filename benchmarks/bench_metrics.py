@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 06:40
+# @Description   : 请求指标中间件的开销
+"""
+直接调用ASGI应用(不经过网络及服务器)，对比有无 MetricsMiddleware 时单个请求的耗时。
+路由函数内记录3条sql及2次redis往返，与普通接口的量级相当。
+    plain  : 不加中间件
+    metrics: 加中间件
+    overhead_us 为两者之差，即每个请求的固定开销
+两种方式交替执行 --rounds 轮，取各自的最小值以减小机器负载波动的影响
+
+运行方式:
+    python -m benchmarks.bench_metrics --repeat 20000 --rounds 5
+"""
+import time
+import asyncio
+import argparse
+import tracemalloc
+from typing import Any, Dict
+
+import orjson
+from fastapi import FastAPI
+
+from stardew.core.metrics import MetricsMiddleware, RequestMetrics, record_db, record_redis
+
+_SCOPE: Dict[str, Any] = {
+    "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": "/items/1",
+    "raw_path": b"/items/1", "root_path": "", "query_string": b"", "headers": [],
+    "client": ("127.0.0.1", 1), "server": ("benchmark", 80),
+}
+
+
+async def _receive() -> Dict[str, Any]:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message: Dict[str, Any]) -> None:
+    pass
+
+
+def create_app(metrics: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> Dict[str, int]:
+        for _ in range(3):
+            record_db(0.001)
+        for _ in range(2):
+            record_redis()
+        return {"id": item_id}
+
+    if metrics:
+        request_metrics = RequestMetrics()
+        request_metrics.register_routes(app.routes)
+        app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+    return app
+
+
+async def measure(app: FastAPI, repeat: int) -> float:
+    """ 执行 repeat 次请求，返回单次平均耗时(微秒) """
+    for _ in range(100):
+        await app(dict(_SCOPE), _receive, _send)
+    begin: float = time.perf_counter()
+    for _ in range(repeat):
+        await app(dict(_SCOPE), _receive, _send)
+    return (time.perf_counter() - begin) / repeat * 1e6
+
+
+async def retained(app: FastAPI, repeat: int) -> int:
+    """ 预热后执行 repeat 次请求，返回请求结束后仍未释放的内存(字节) """
+    await measure(app, 100)
+    tracemalloc.start()
+    before: int = tracemalloc.get_traced_memory()[0]
+    await measure(app, repeat)
+    after: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before
+
+
+async def main(args: argparse.Namespace) -> None:
+    apps: Dict[str, FastAPI] = {name: create_app(name == "metrics") for name in ("plain", "metrics")}
+    results: Dict[str, float] = {name: float("inf") for name in apps}
+    for _ in range(args.rounds):
+        for name, app in apps.items():
+            results[name] = min(results[name], await measure(app, args.repeat))
+    for name, app in apps.items():
+        print(orjson.dumps({
+            "mode": name,
+            "request_us": round(results[name], 2),
+            "retained_bytes": await retained(app, args.repeat // 10),
+        }).decode())
+    print(orjson.dumps({"overhead_us": round(results["metrics"] - results["plain"], 2)}).decode())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000, help="每轮的请求次数")
+    parser.add_argument("--rounds", type=int, default=5, help="轮数")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 21:00
+# @Description   : OFFSET分页与游标分页在不同页码下的耗时对比
+"""
+对若干页码分别执行用户列表查询，对比:
+    offset: AsyncUserRepository.get_multi (OFFSET page_no * page_size LIMIT page_size)
+    keyset: AsyncUserRepository.get_after (WHERE id > :after ORDER BY id LIMIT page_size + 1)
+
+游标分页的耗时应与页码无关。默认预置 100,000 个用户以覆盖第 10,000 页。
+
+运行方式:
+    python -m benchmarks.bench_pagination --users 100000 --pages 1 100 1000 10000 --repeat 20
+"""
+import time
+import asyncio
+import argparse
+from typing import Dict, List, Callable, Awaitable
+
+import orjson
+from sqlalchemy import select
+
+from stardew.settings import settings
+from stardew.core.db.base import Database
+from stardew.models.system import SysUser
+from stardew.repository.system import AsyncUserRepository
+from benchmarks.bench_repository import seed_users
+
+
+async def measure(call: Callable[[], Awaitable], repeat: int) -> Dict:
+    """ 串行执行 repeat 次，返回耗时中位数及p99 """
+    latencies: List[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000, 2),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    db = Database(dsn=args.dsn, async_dsn=args.async_dsn, echo=False)
+    seed_users(db, args.users)
+    repository = AsyncUserRepository(session_factory=db.async_session)
+
+    for page in args.pages:
+        page_no: int = page - 1
+        # 游标即上一页最后一条数据的id，直接从库中取出，不计入耗时
+        async with db.async_session() as session:
+            after = (await session.execute(
+                select(SysUser.id).order_by(SysUser.id).offset(page_no * args.page_size - 1).limit(1)
+            )).scalar() if page_no else None
+
+        async def offset_call() -> None:
+            await repository.get_multi(page_no=page_no, page_size=args.page_size)
+
+        async def keyset_call() -> None:
+            await repository.get_after(after=after, page_size=args.page_size)
+
+        for name, call in (("offset", offset_call), ("keyset", keyset_call)):
+            await call()
+            result: Dict = await measure(call, args.repeat)
+            print(orjson.dumps({"mode": name, "page": page, "page_size": args.page_size, **result}).decode())
+    await db.async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=settings.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument("--async-dsn", default=settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+    parser.add_argument("--users", type=int, default=100000, help="预置用户数")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 10000], help="测试的页码(从1开始)")
+    parser.add_argument("--page-size", type=int, default=10, help="每页数据")
+    parser.add_argument("--repeat", type=int, default=20, help="每个页码重复次数")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 19:55
+# @Description   : 密码校验吞吐量与执行器大小的关系
+"""
+在协程中并发校验密码(登录的主要cpu开销)，对比:
+    inline : 直接在事件循环中调用 SecurityUtil.verify_password (改造前的方式)
+    thread : PasswordHasher + 线程池，依次使用 --workers 中的每个线程数
+    process: PasswordHasher + 进程池，依次使用 --workers 中的每个进程数
+
+运行方式:
+    python -m benchmarks.bench_password --workers 1 2 4 8 --concurrency 32 --requests 200
+"""
+import asyncio
+import argparse
+from typing import Dict
+
+import orjson
+
+from stardew.common.utils import SecurityUtil
+from stardew.core.hasher import init_password_hasher
+from benchmarks.bench_repository import run
+
+_PASSWORD = "stardew"
+
+
+async def main(args: argparse.Namespace) -> None:
+    hashed: str = SecurityUtil.generate_password(_PASSWORD)
+
+    async def inline_call() -> None:
+        SecurityUtil.verify_password(_PASSWORD, hashed)
+
+    result: Dict = await run(inline_call, args.concurrency, args.requests)
+    print(orjson.dumps({"mode": "inline", "workers": 1, **result}).decode())
+
+    for executor_type in args.executors:
+        for workers in args.workers:
+            resource = init_password_hasher(executor_type=executor_type, workers=workers, max_pending=args.concurrency)
+            hasher = await resource.__anext__()
+
+            async def pooled_call() -> None:
+                await hasher.verify(_PASSWORD, hashed)
+
+            # 预热执行器(进程池需要先启动子进程)
+            await run(pooled_call, workers, workers)
+            result = await run(pooled_call, args.concurrency, args.requests)
+            print(orjson.dumps({"mode": executor_type, "workers": workers, **result}).decode())
+            await resource.aclose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="执行器大小")
+    parser.add_argument("--executors", nargs="+", default=["thread", "process"], help="执行器类型")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发协程数")
+    parser.add_argument("--requests", type=int, default=200, help="总校验次数")
+    asyncio.run(main(parser.parse_args()))
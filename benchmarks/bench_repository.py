@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 17:05
+# @Description   : 同步/异步repository并发吞吐量对比
+"""
+在协程中并发调用用户列表查询，对比:
+    sync : 同步 UserRepository (改造前 async 接口内的调用方式，会阻塞事件循环)
+    async: AsyncUserRepository
+
+运行方式(连接配置读取自 .env / 环境变量，也可通过参数指定):
+    python -m benchmarks.bench_repository --users 1000 --concurrency 50 --requests 2000
+"""
+import time
+import asyncio
+import argparse
+from typing import List, Callable, Awaitable, Dict
+
+import orjson
+from sqlalchemy import func, select, insert
+
+from stardew.settings import settings
+from stardew.core.db.base import Base, Database
+from stardew.common.utils import StringUtil
+from stardew.models.system import SysUser
+from stardew.repository.system import UserRepository, AsyncUserRepository
+
+# 预先生成的哈希，避免在准备数据时执行bcrypt
+_DUMMY_PASSWORD = "$2b$12$" + "x" * 53
+
+
+def seed_users(db: Database, count: int) -> None:
+    """ 准备测试数据，已有数据足够时跳过 """
+    Base.metadata.create_all(db._engine)
+    with db.session() as session:
+        exists: int = session.execute(select(func.count()).select_from(SysUser)).scalar()
+        rows: List[Dict] = [
+            {
+                "id": StringUtil.get_unique_key(),
+                "username": f"bench_{i}",
+                "email": f"bench_{StringUtil.get_unique_key()}@stardew.io",
+                "password": _DUMMY_PASSWORD,
+            }
+            for i in range(max(count - exists, 0))
+        ]
+        if rows:
+            session.execute(insert(SysUser), rows)
+            session.commit()
+
+
+async def run(call: Callable[[], Awaitable], concurrency: int, total: int) -> Dict:
+    """
+    使用 concurrency 个协程执行 total 次调用，同时记录事件循环的最大延迟
+    :param call: 单次调用
+    :param concurrency: 并发数
+    :param total: 总调用次数
+    :return: 统计结果
+    """
+    latencies: List[float] = []
+    remaining: List[int] = [total]
+    max_lag: List[float] = [0.0]
+    running: List[bool] = [True]
+
+    async def worker() -> None:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start: float = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    async def ticker() -> None:
+        # 理想情况下每1ms被唤醒一次，实际间隔越大说明事件循环被阻塞得越久
+        while running[0]:
+            start: float = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag[0] = max(max_lag[0], time.perf_counter() - start - 0.001)
+
+    lag_task = asyncio.ensure_future(ticker())
+    begin: float = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed: float = time.perf_counter() - begin
+    running[0] = False
+    await lag_task
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "max_loop_lag_ms": round(max_lag[0] * 1000, 2),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    db = Database(dsn=args.dsn, async_dsn=args.async_dsn, echo=False)
+    seed_users(db, args.users)
+
+    sync_repository = UserRepository(session_factory=db.session)
+    async_repository = AsyncUserRepository(session_factory=db.async_session)
+
+    async def sync_call() -> None:
+        sync_repository.get_multi(page_no=0, page_size=args.page_size)
+
+    async def async_call() -> None:
+        await async_repository.get_multi(page_no=0, page_size=args.page_size)
+
+    for name, call in (("sync", sync_call), ("async", async_call)):
+        # 预热连接池
+        await run(call, args.concurrency, args.concurrency)
+        result: Dict = await run(call, args.concurrency, args.requests)
+        print(orjson.dumps({"mode": name, **result}).decode())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=settings.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument("--async-dsn", default=settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+    parser.add_argument("--users", type=int, default=1000, help="预置用户数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发协程数")
+    parser.add_argument("--requests", type=int, default=2000, help="总请求数")
+    parser.add_argument("--page-size", type=int, default=10, help="每次查询的条目数")
+    asyncio.run(main(parser.parse_args()))
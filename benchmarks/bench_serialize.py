@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 01:20
+# @Description   : 列表接口响应序列化耗时对比
+"""
+以不同的 page_size 查询一页用户，对比将其转换为响应体的耗时:
+    schema : 改造前的方式，逐个 UserSimpleSchema.from_orm，由fastapi执行 jsonable_encoder 后使用标准库json序列化
+    orjson : 同上，但使用 ORJSONResponse (create_app 中的默认响应类)
+    fast   : stardew.core.web.responses.orm_to_dicts 直接取列值，ORJSONResponse 序列化
+
+运行方式:
+    python -m benchmarks.bench_serialize --users 1000 --repeat 200
+"""
+import time
+import asyncio
+import argparse
+from typing import Dict, List, Callable
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from stardew.settings import settings
+from stardew.core.db.base import Database
+from stardew.core.web.responses import orm_to_dicts
+from stardew.models.system import SysUser
+from stardew.repository.system import AsyncUserRepository
+from stardew.schemas.system import UserSimpleSchema
+from benchmarks.bench_repository import seed_users
+
+
+def measure(call: Callable[[], bytes], repeat: int) -> Dict:
+    """ 执行 repeat 次，返回平均耗时 """
+    call()
+    begin: float = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    elapsed: float = time.perf_counter() - begin
+    return {"avg_ms": round(elapsed / repeat * 1000, 3), "bytes": len(call())}
+
+
+async def main(args: argparse.Namespace) -> None:
+    db = Database(dsn=args.dsn, async_dsn=args.async_dsn, echo=False)
+    seed_users(db, max(args.users, max(args.page_sizes)))
+    repository = AsyncUserRepository(session_factory=db.async_session)
+
+    for page_size in args.page_sizes:
+        users: List[SysUser] = await repository.get_multi(page_no=0, page_size=page_size)
+        modes: Dict[str, Callable[[], bytes]] = {
+            "schema": lambda: JSONResponse(jsonable_encoder([UserSimpleSchema.from_orm(user) for user in users])).body,
+            "orjson": lambda: ORJSONResponse(jsonable_encoder([UserSimpleSchema.from_orm(user) for user in users])).body,
+            "fast": lambda: ORJSONResponse(orm_to_dicts(users, UserSimpleSchema)).body,
+        }
+        for name, call in modes.items():
+            result: Dict = measure(call, args.repeat)
+            print(orjson.dumps({"mode": name, "page_size": page_size, **result}).decode())
+    await db.async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=settings.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument("--async-dsn", default=settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+    parser.add_argument("--users", type=int, default=1000, help="预置用户数")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 1000], help="每页数据")
+    parser.add_argument("--repeat", type=int, default=200, help="每种方式的执行次数")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 01:50
+# @Description   : 登录信息的json格式与二进制格式对比
+"""
+对比同一份登录信息两种保存格式的大小、redis内存占用及解码耗时:
+    json  : 改造前的格式，LoginUser.json() 保存，读取时 orjson.loads 后构造 LoginUser
+    binary: stardew.core.session.encode_session，读取时只解包头部，
+            binary_full 额外访问 sys_user / roles，触发其余部分的解析
+
+运行方式:
+    python -m benchmarks.bench_session --roles 5 --perms 200 --repeat 100000
+"""
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Callable, Dict
+
+import orjson
+import aioredis
+
+from stardew.settings import settings
+from stardew.common.enums import StatusEnum
+from stardew.common.utils import StringUtil
+from stardew.core.session import encode_session, decode_session
+from stardew.core.web.schemas import LoginUser
+from stardew.schemas.system import UserSimpleSchema
+
+
+def measure(call: Callable[[], object], repeat: int) -> float:
+    """ 执行 repeat 次，返回单次平均耗时(微秒) """
+    begin: float = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return round((time.perf_counter() - begin) / repeat * 1e6, 3)
+
+
+async def main(args: argparse.Namespace) -> None:
+    user = UserSimpleSchema(
+        id=StringUtil.get_unique_key(), username="stardew_user", nickname="stardew", email="stardew@example.com",
+        mobile="13800000000", gender=1, avatar="/avatar/stardew.png", status=0, is_super=False, remark=""
+    )
+    login_user = LoginUser(
+        login_time=datetime.utcnow(),
+        sys_user=user,
+        roles={f"role_{i}" for i in range(args.roles)},
+        # 权限id通常连续分配，位图长度与系统中的权限总数有关
+        perm_mask=format((1 << args.perms) - 1, "x")
+    )
+    encoded: Dict[str, bytes] = {"json": login_user.json().encode(), "binary": encode_session(login_user)}
+
+    redis = await aioredis.create_redis_pool(settings.REDIS_DSN)
+    memory: Dict[str, int] = {}
+    for name, value in encoded.items():
+        key: str = f"bench_session:{name}"
+        await redis.set(key, value)
+        memory[name] = await redis.execute("MEMORY", "USAGE", key)
+        await redis.delete(key)
+    redis.close()
+    await redis.wait_closed()
+
+    def json_decode() -> None:
+        current = LoginUser(**orjson.loads(encoded["json"]))
+        assert current.sys_user.status == StatusEnum.enable and current.has_perm(1)
+
+    def binary_decode() -> None:
+        current = decode_session(encoded["binary"])
+        assert current.status == StatusEnum.enable and current.has_perm(1)
+
+    def binary_full_decode() -> None:
+        current = decode_session(encoded["binary"])
+        assert current.sys_user.status == StatusEnum.enable and current.roles
+
+    for name, call, value in (
+            ("json", json_decode, encoded["json"]),
+            ("binary", binary_decode, encoded["binary"]),
+            ("binary_full", binary_full_decode, encoded["binary"]),
+    ):
+        print(orjson.dumps({
+            "format": name,
+            "bytes": len(value),
+            "redis_memory": memory[name.split("_")[0]],
+            "decode_us": measure(call, args.repeat),
+        }).decode())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roles", type=int, default=5, help="角色数")
+    parser.add_argument("--perms", type=int, default=200, help="权限总数")
+    parser.add_argument("--repeat", type=int, default=100000, help="解码次数")
+    asyncio.run(main(parser.parse_args()))
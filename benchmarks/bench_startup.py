@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 07:40
+# @Description   : 冷启动耗时及导入耗时分析
+"""
+在新的子进程中启动应用并处理第一个请求，统计各阶段耗时:
+    import_ms : 导入 stardew.runserver (包括 create_app)
+    startup_ms: 执行startup事件(初始化资源)
+    first_ms  : 第一个请求的耗时，延迟初始化模式下包含按需创建的资源
+    ready_ms  : 从创建子进程到收到第一个响应的总耗时，即冷启动时间，包括解释器启动
+eager 为默认模式，lazy 为 LAZY_STARTUP=true。两种模式交替执行 --rounds 轮，取中位数，并与 --target-ms 比较。
+
+指定 --profile 时额外以 python -X importtime 启动一次，输出累计耗时最多的模块及按顶层包汇总的导入耗时。
+
+运行方式(连接配置读取自 .env / 环境变量):
+    python -m benchmarks.bench_startup --rounds 5 --target-ms 2000
+    python -m benchmarks.bench_startup --modes lazy --profile --top 20
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Tuple
+
+import orjson
+
+_CHILD: str = """
+import sys, time, asyncio
+import httpx
+import orjson
+sys.stderr.write("%s\\n" % sys.argv[2])
+sys.stderr.flush()
+begin = time.perf_counter()
+from stardew.runserver import app
+imported = time.perf_counter()
+
+async def main():
+    await app.router.startup()
+    started = time.perf_counter()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://stardew") as client:
+        response = await client.get(sys.argv[1])
+    responded = time.perf_counter()
+    print(orjson.dumps({
+        "status": response.status_code,
+        "import_ms": (imported - begin) * 1000,
+        "startup_ms": (started - imported) * 1000,
+        "first_ms": (responded - started) * 1000,
+    }).decode(), flush=True)
+    await app.router.shutdown()
+
+asyncio.run(main())
+"""
+
+# 子进程在导入应用前写入标准错误输出的标记，此前导入的httpx等不计入分析
+_MARKER: str = "-- stardew --"
+_IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def start(mode: str, path: str, importtime: bool = False) -> Tuple[Dict[str, Any], str]:
+    """
+    启动一个子进程，返回各阶段耗时及标准错误输出
+    :param mode: eager 或 lazy
+    :param path: 第一个请求的路径
+    :param importtime: 是否输出导入耗时
+    :return:
+    """
+    env: Dict[str, str] = dict(os.environ, LAZY_STARTUP="true" if mode == "lazy" else "false")
+    command: List[str] = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", _CHILD, path, _MARKER]
+    # -X importtime 的输出很多，写入管道时会在子进程退出前阻塞，因此写到临时文件
+    with tempfile.TemporaryFile("w+") as errors:
+        begin: float = time.perf_counter()
+        process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=errors, text=True)
+        line: str = process.stdout.readline()
+        ready: float = time.perf_counter() - begin
+        process.communicate()
+        errors.seek(0)
+        stderr: str = errors.read()
+    if not line:
+        raise RuntimeError(f"子进程启动失败:\n{stderr}")
+    result: Dict[str, Any] = orjson.loads(line)
+    result["ready_ms"] = ready * 1000
+    return result, stderr
+
+
+def profile(stderr: str, top: int) -> Dict[str, Any]:
+    """
+    解析 -X importtime 的输出，包括导入应用、startup及第一个请求中导入的模块
+    :param stderr: 子进程的标准错误输出
+    :param top: 输出的模块数
+    :return: 累计耗时最多的模块，以及按顶层包汇总的自身耗时
+    """
+    modules: List[Tuple[str, int, int]] = []
+    packages: Dict[str, int] = {}
+    for match in _IMPORT_TIME.finditer(stderr.partition(_MARKER)[2]):
+        self_us, cumulative_us, name = int(match.group(1)), int(match.group(2)), match.group(4)
+        modules.append((name, self_us, cumulative_us))
+        package: str = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    modules.sort(key=lambda module: module[2], reverse=True)
+    return {
+        "modules": [
+            {"module": name, "cumulative_ms": round(cumulative / 1000, 1), "self_ms": round(self_us / 1000, 1)}
+            for name, self_us, cumulative in modules[:top]
+        ],
+        "packages": {
+            package: round(total / 1000, 1)
+            for package, total in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    results: Dict[str, List[Dict[str, Any]]] = {mode: [] for mode in args.modes}
+    for _ in range(args.rounds):
+        for mode in args.modes:
+            results[mode].append(start(mode, args.path)[0])
+    for mode in args.modes:
+        summary: Dict[str, Any] = {"mode": mode, "path": args.path, "status": results[mode][-1]["status"]}
+        for key in ("import_ms", "startup_ms", "first_ms", "ready_ms"):
+            summary[key] = round(statistics.median(result[key] for result in results[mode]), 1)
+        summary["target_ms"] = args.target_ms
+        summary["within_target"] = summary["ready_ms"] <= args.target_ms
+        print(orjson.dumps(summary).decode())
+        if args.profile:
+            print(orjson.dumps({"mode": mode, **profile(start(mode, args.path, importtime=True)[1], args.top)}).decode())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", type=lambda value: value.split(","), default=["eager", "lazy"],
+                        help="逗号分隔的启动模式: eager,lazy")
+    parser.add_argument("--path", default="/sys/user/", help="第一个请求的路径")
+    parser.add_argument("--rounds", type=int, default=5, help="每种模式的启动次数")
+    parser.add_argument("--target-ms", type=float, default=1500, help="冷启动(ready_ms)的目标耗时")
+    parser.add_argument("--profile", action="store_true", help="输出导入耗时分析")
+    parser.add_argument("--top", type=int, default=15, help="导入耗时分析输出的条目数")
+    main(parser.parse_args())
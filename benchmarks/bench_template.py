@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 05:00
+# @Description   : 邮件模板加载及批量渲染耗时
+"""
+在临时目录中生成一组带继承和循环的邮件模板，对比:
+    load     : 新建环境后首次获取全部模板的耗时。cold 为改造前的方式(每次都解析编译)，
+               bytecode 为从磁盘字节码缓存加载(重启后的情况)
+    render   : 渲染 --mails 封个性化邮件(每封内容不同)，reload 为改造前每次获取模板都检查文件修改时间，
+               precompiled 为预编译且关闭 auto_reload
+    broadcast: 群发 --mails 封相同内容的邮件，对比不使用和使用渲染缓存
+
+运行方式:
+    python -m benchmarks.bench_template --mails 10000 --templates 20
+"""
+import time
+import tempfile
+import argparse
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import orjson
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from stardew.common.utils.templates import TemplateRenderer
+
+_BASE = """<html><body>
+<h1>{% block title %}{% endblock %}</h1>
+{% block content %}{% endblock %}
+<footer>{{ footer | default("stardew") }}</footer>
+</body></html>"""
+
+_MAIL = """{% extends "base.html" %}
+{% block title %}{{ title }} - {{ user.nickname | title }}{% endblock %}
+{% block content %}
+<p>您好 {{ user.username }}，您的账号 {{ user.email }} 有以下通知:</p>
+<ul>{% for item in items %}<li class="{{ loop.cycle('odd', 'even') }}">{{ item.name }}: {{ item.value }}</li>{% endfor %}</ul>
+{% if user.is_super %}<p>管理员操作请谨慎。</p>{% endif %}
+{% endblock %}"""
+
+
+def measure(call: Callable[[], Any], repeat: int = 1) -> float:
+    """ 执行 repeat 次，返回总耗时(毫秒) """
+    begin: float = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return round((time.perf_counter() - begin) * 1000, 2)
+
+
+def main(args: argparse.Namespace) -> None:
+    root = Path(tempfile.mkdtemp())
+    template_dir, cache_dir = root / "templates", root / "cache"
+    template_dir.mkdir()
+    cache_dir.mkdir()
+    (template_dir / "base.html").write_text(_BASE, encoding="utf-8")
+    names: List[str] = [f"mail_{i}.html" for i in range(args.templates)]
+    for name in names:
+        (template_dir / name).write_text(_MAIL, encoding="utf-8")
+    loader = FileSystemLoader(str(template_dir))
+
+    def load_cold() -> None:
+        env = Environment(loader=loader, autoescape=select_autoescape())
+        for template_name in env.list_templates():
+            env.get_template(template_name)
+
+    TemplateRenderer(loader, cache_dir=str(cache_dir)).precompile()
+    print(orjson.dumps({
+        "case": "load", "templates": args.templates + 1,
+        "cold_ms": measure(load_cold),
+        "bytecode_ms": measure(lambda: TemplateRenderer(loader, cache_dir=str(cache_dir)).precompile()),
+    }).decode())
+
+    contents: List[Dict[str, Any]] = [{
+        "title": "系统通知",
+        "user": {"username": f"user{i}", "nickname": f"nick {i}", "email": f"user{i}@stardew.com", "is_super": i % 7 == 0},
+        "items": [{"name": f"item{j}", "value": i * j} for j in range(5)],
+    } for i in range(args.mails)]
+
+    reload_env = Environment(loader=loader, autoescape=select_autoescape())
+    renderer = TemplateRenderer(loader, cache_dir=str(cache_dir), render_cache_size=16)
+    renderer.precompile()
+    print(orjson.dumps({
+        "case": "render", "mails": args.mails,
+        "reload_ms": measure(lambda: [reload_env.get_template(names[i % len(names)]).render(**content)
+                                      for i, content in enumerate(contents)]),
+        "precompiled_ms": measure(lambda: [renderer.render(names[i % len(names)], content)
+                                           for i, content in enumerate(contents)]),
+    }).decode())
+    print(orjson.dumps({
+        "case": "broadcast", "mails": args.mails,
+        "uncached_ms": measure(lambda: renderer.render(names[0], contents[0]), args.mails),
+        "cached_ms": measure(lambda: renderer.render(names[0], contents[0], cache=True), args.mails),
+    }).decode())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mails", type=int, default=10000, help="邮件数")
+    parser.add_argument("--templates", type=int, default=20, help="模板数")
+    main(parser.parse_args())
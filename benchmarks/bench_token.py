@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 03:30
+# @Description   : token校验及登录校验依赖的单次耗时
+"""
+对比每个请求在身份校验上的开销:
+    verify: 仅校验token，backend 为 jose / hmac，cached 为 TokenVerifier 命中缓存
+    auth  : 完整执行 login_required 依赖(登录信息命中进程内缓存，不访问redis)，即每个需要登录的接口的固定开销
+
+运行方式:
+    python -m benchmarks.bench_token --repeat 20000
+"""
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Callable, Dict
+
+import orjson
+from fastapi.security import HTTPAuthorizationCredentials
+
+from stardew.settings import settings
+from stardew.common.utils import StringUtil, SecurityUtil
+from stardew.common.utils.tokens import JWT_BACKENDS, TokenVerifier, token_verifier
+from stardew.core.deps import security
+from stardew.core.session import SessionCache, encode_session, decode_session
+from stardew.core.web.schemas import LoginUser
+from stardew.schemas.system import UserSimpleSchema
+
+
+async def measure(call: Callable, repeat: int) -> float:
+    """ 执行 repeat 次，返回单次平均耗时(微秒) """
+    await call()
+    begin: float = time.perf_counter()
+    for _ in range(repeat):
+        await call()
+    return round((time.perf_counter() - begin) / repeat * 1e6, 3)
+
+
+async def main(args: argparse.Namespace) -> None:
+    user = UserSimpleSchema(
+        id=StringUtil.get_unique_key(), username="stardew_user", nickname="stardew", email="stardew@example.com",
+        mobile="", gender=1, avatar="", status=0, is_super=False, remark=""
+    )
+    login_user = LoginUser(login_time=datetime.utcnow(), sys_user=user, roles={"admin"}, perm_mask="1")
+    sub: str = StringUtil.get_unique_key()
+    token: str = SecurityUtil.create_token(subject=sub)
+    credentials = HTTPAuthorizationCredentials(scheme=settings.JWT_PREFIX, credentials=token)
+    session_cache = SessionCache()
+    session_cache.set(sub, decode_session(encode_session(login_user)))
+
+    verifiers: Dict[str, TokenVerifier] = {name: TokenVerifier(backend(settings.SECRET_KEY), maxsize=0)
+                                           for name, backend in JWT_BACKENDS.items()}
+    verifiers["cached"] = TokenVerifier(JWT_BACKENDS["hmac"](settings.SECRET_KEY), maxsize=1000)
+
+    for name, verifier in verifiers.items():
+        async def verify() -> None:
+            verifier.verify(token)
+
+        async def auth() -> None:
+            await security.login_required(
+                redis=None, session_cache=session_cache, authorization_credentials=credentials
+            )
+
+        # login_required 通过模块属性获取校验器
+        security.token_verifier = verifier
+        print(orjson.dumps({
+            "backend": name,
+            "verify_us": await measure(verify, args.repeat),
+            "auth_us": await measure(auth, args.repeat),
+        }).decode())
+    security.token_verifier = token_verifier
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000, help="每种方式的执行次数")
+    asyncio.run(main(parser.parse_args()))
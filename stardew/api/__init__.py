@@ -5,9 +5,10 @@
 from fastapi import APIRouter
 
 from stardew.api.system import system_router
-from stardew.api.common import login_router
+from stardew.api.common import login_router, metrics_router
 
 api = APIRouter()
 
 api.include_router(router=system_router, prefix='/sys')
 api.include_router(router=login_router)
+api.include_router(router=metrics_router)
@@ -3,7 +3,9 @@
 # @CreatedTime   : 2021/2/1 10:59
 # @Description   :
 from .login_controller import login_router
+from .metrics_controller import metrics_router
 
 __all__ = [
-    "login_router"
+    "login_router",
+    "metrics_router"
 ]
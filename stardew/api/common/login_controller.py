@@ -2,11 +2,16 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/2/1 11:52
 # @Description   :
-from fastapi import APIRouter, Depends
+from typing import Dict, Union
+
+from fastapi import APIRouter, Depends, Query, Response, status
 from dependency_injector.wiring import inject, Provide
 
 from stardew.schemas.common import LoginSchema
 from stardew.services.common import LoginService
+from stardew.core.captcha import CaptchaEngine
+from stardew.core.session import SessionUser
+from stardew.core.deps.security import login_required
 from stardew.core.container import IocContainer as Container
 from stardew.core.web.schemas import BearerToken, CaptchaInfo
 
@@ -16,13 +21,30 @@ login_router = APIRouter(tags=['login'])
 @login_router.get("/captcha", name="获取验证码接口")
 @inject
 async def create_captcha(
+        image_format: str = Query("base64", alias="format", regex="^(base64|png)$"),
         login_service: LoginService = Depends(Provide[Container.login_service])
-) -> CaptchaInfo:
-    """ 生成验证码 """
+) -> Union[CaptchaInfo, Response]:
+    """ 生成验证码。format=png 时直接返回图片，redis键名放在 X-Captcha-Uid 响应头中 """
+    if image_format == "png":
+        uid, image = await login_service.create_captcha_image()
+        return Response(
+            content=image,
+            media_type="image/png",
+            headers={"X-Captcha-Uid": uid, "Cache-Control": "no-store"}
+        )
     captcha = await login_service.create_captcha()
     return captcha
 
 
+@login_router.get("/captcha/stats", name="验证码预渲染池状态", dependencies=[Depends(login_required)])
+@inject
+async def captcha_stats(
+        captcha_engine: CaptchaEngine = Depends(Provide[Container.captcha_engine])
+) -> Dict[str, float]:
+    """ 预渲染池深度、命中次数及渲染耗时 """
+    return captcha_engine.stats()
+
+
 @login_router.post("/login", name="登录接口")
 @inject
 async def login(
@@ -36,3 +58,14 @@ async def login(
     token = await login_service.login(email=body.email, password=body.password)
     return token
 
+
+@login_router.post("/logout", name="注销登录", status_code=status.HTTP_204_NO_CONTENT)
+@inject
+async def logout(
+        everywhere: bool = Query(False, description="是否退出所有设备上的登录"),
+        current_user: SessionUser = Depends(login_required),
+        login_service: LoginService = Depends(Provide[Container.login_service])
+) -> Response:
+    """ 注销当前登录，everywhere=true 时注销该用户的所有登录 """
+    await login_service.logout(current_user, everywhere=everywhere)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
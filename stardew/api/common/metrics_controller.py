@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 06:20
+# @Description   : Prometheus指标导出
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from dependency_injector.wiring import inject, Provide
+
+from stardew.settings import settings
+from stardew.core.db.base import Database
+from stardew.core.mailer import Mailer
+from stardew.core.hasher import PasswordHasher
+from stardew.core.captcha import CaptchaEngine
+from stardew.core.session import SessionCache
+from stardew.core.metrics import request_metrics
+from stardew.core.container import IocContainer as Container
+from stardew.common.utils.logger import log_sink
+from stardew.common.utils.tokens import token_verifier
+
+metrics_router = APIRouter(tags=["monitor"])
+
+
+def metrics_token_required(authorization: Optional[str] = Header(None)) -> None:
+    """ 配置了 METRICS_TOKEN 时校验 Bearer token。抓取方通常不是系统用户，不走登录校验 """
+    if settings.METRICS_TOKEN is None:
+        return
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token, settings.METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="无效的token")
+
+
+@metrics_router.get(
+    path="/metrics",
+    name="Prometheus指标",
+    include_in_schema=False,
+    dependencies=[Depends(metrics_token_required)]
+)
+@inject
+async def get_metrics(
+        db: Database = Depends(Provide[Container.db]),
+        captcha_engine: CaptchaEngine = Depends(Provide[Container.captcha_engine]),
+        password_hasher: PasswordHasher = Depends(Provide[Container.password_hasher]),
+        mailer: Mailer = Depends(Provide[Container.mailer]),
+        session_cache: SessionCache = Depends(Provide[Container.session_cache])
+) -> PlainTextResponse:
+    """ 各路由的耗时直方图、状态码、数据库/redis/密码哈希/验证码开销，以及连接池、缓存等组件的状态 """
+    content: str = request_metrics.render({
+        "db_pool": db.pool_stats(),
+        "captcha": captcha_engine.stats(),
+        "password_hasher": {"pending": password_hasher.pending, "max_pending": password_hasher.max_pending},
+        "mailer": mailer.stats(),
+        "token_cache": token_verifier.stats(),
+        "session_cache": session_cache.stats(),
+        "log_sink": log_sink.stats(),
+    })
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
@@ -8,6 +8,7 @@ from fastapi import APIRouter
 from .user_controller import user_router
 from .role_controller import role_router
 from .menu_controller import menu_router
+from .monitor_controller import monitor_router
 
 
 system_router = APIRouter()
@@ -15,6 +16,7 @@ system_router = APIRouter()
 system_router.include_router(router=user_router, prefix="/user")
 system_router.include_router(router=role_router, prefix="/role")
 system_router.include_router(router=menu_router, prefix="/menu")
+system_router.include_router(router=monitor_router, prefix="/monitor")
 
 
 __all__ = {
@@ -2,18 +2,23 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/3/2 15:11
 # @Description   :
-from typing import List, Optional, Dict
+from typing import List, Optional, Union
 
+import orjson
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, Depends, Query, Response, status
-
-from stardew.core.web.schemas import TreeNode
-from stardew.models.system import SysMenu, SysRole
+from fastapi import APIRouter, Depends, Header, Query, Response, status
+from fastapi.responses import ORJSONResponse
+
+from stardew.settings import settings
+from stardew.core.exporter import FORMAT_NDJSON, encode_stream, export_headers
+from stardew.core.web.responses import StreamingResponse, etag_matches, orm_to_dict, orm_to_dicts
+from stardew.core.web.schemas import TreeNode, CursorPage
+from stardew.models.system import SysMenu
 from stardew.services.system import RoleService
 from stardew.services.system.menu import MenuService
 from stardew.core.container import IocContainer as Container
 from stardew.core.deps.security import role_required, permission_required
-from stardew.schemas.system import MenuSimpleSchema, MenuCreateSchema, MenuUpdateSchema, MenuSchema
+from stardew.schemas.system import MenuSimpleSchema, MenuCreateSchema, MenuUpdateSchema
 
 menu_router = APIRouter(tags=["menu"])
 
@@ -21,17 +26,78 @@ menu_router = APIRouter(tags=["menu"])
 @menu_router.get(
     path="/",
     name="查询所有menu",
+    response_model=Union[List[MenuSimpleSchema], CursorPage[MenuSimpleSchema]],
     dependencies=[Depends(role_required("admin"))]
 )
 @inject
-def get_menu_list(
+async def get_menu_list(
         page_no: Optional[int] = Query(0, description="对应页码"),
         page_size: Optional[int] = Query(10, description="每页数据"),
+        cursor: Optional[str] = Query(None, description="分页游标。传入时忽略页码，使用游标分页，空字符串表示第一页"),
         menu_service: MenuService = Depends(Provide[Container.menu_service])
-) -> List[MenuSchema]:
+) -> ORJSONResponse:
     """ 查询所有menu """
-    menus: List[SysMenu] = menu_service.get_menu_list(page_no=page_no, page_size=page_size)
-    return [MenuSchema.from_orm(menu) for menu in menus]
+    if cursor is not None:
+        items, next_cursor = await menu_service.get_menu_page(cursor=cursor, page_size=page_size)
+        return ORJSONResponse({"items": orm_to_dicts(items, MenuSimpleSchema), "next_cursor": next_cursor})
+    menus: List[SysMenu] = await menu_service.get_menu_list(page_no=page_no, page_size=page_size)
+    return ORJSONResponse(orm_to_dicts(menus, MenuSimpleSchema))
+
+
+@menu_router.get(
+    path="/export",
+    name="导出菜单",
+    response_class=StreamingResponse,
+    # dependencies=[Depends(permission_required("sys:menu:export"))]
+)
+@inject
+async def export_menus(
+        fmt: Optional[str] = Query(FORMAT_NDJSON, alias="format", regex="^(ndjson|csv)$", description="ndjson 或 csv"),
+        menu_service: MenuService = Depends(Provide[Container.menu_service])
+) -> StreamingResponse:
+    """ 流式导出全部菜单 """
+    names, partitions = await menu_service.export_menus(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    media_type, headers = export_headers(fmt, "menus")
+    return StreamingResponse(encode_stream(fmt, names, partitions), media_type=media_type, headers=headers)
+
+
+@menu_router.get(
+    path="/tree",
+    name="获取权限树结构",
+    response_model=List[TreeNode],
+    dependencies=[Depends(permission_required("sys:menu:tree"))]
+)
+@inject
+async def get_menu_tree(
+        if_none_match: Optional[str] = Header(None),
+        menu_service: MenuService = Depends(Provide[Container.menu_service]),
+) -> Response:
+    """ 获取权限树结构。返回缓存的序列化结果，版本号作为ETag """
+    version, tree = await menu_service.dump_menu_tree()
+    etag: str = f'W/"{version}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(content=tree, media_type="application/json", headers={"ETag": etag})
+
+
+@menu_router.get(
+    path="/tree_with_role/{role_id}",
+    name="获取某用户的权限树结构",
+    dependencies=[Depends(role_required("admin"))]
+)
+@inject
+async def tree_with_role(
+        role_id: str,
+        menu_service: MenuService = Depends(Provide[Container.menu_service]),
+        role_service: RoleService = Depends(Provide[Container.role_service])
+) -> Response:
+    """ 获取某角色的权限树。checked_keys_version 可用于之后调用 /sys/role/{role_id}/checked_keys 获取增量 """
+    version, checked_keys = await role_service.get_checked_keys(role_id=role_id)
+    _, tree = await menu_service.dump_menu_tree()
+    # 菜单树已经是序列化后的结果，直接拼接
+    content: bytes = b'{"tree":' + tree + b',"checked_keys":' + orjson.dumps(checked_keys) + \
+        b',"checked_keys_version":' + str(version).encode() + b'}'
+    return Response(content=content, media_type="application/json")
 
 
 @menu_router.post(
@@ -40,29 +106,30 @@ def get_menu_list(
     dependencies=[Depends(role_required("admin"))]
 )
 @inject
-def add_menu(
+async def add_menu(
         create_schema: MenuCreateSchema,
         menu_service: MenuService = Depends(Provide[Container.menu_service])
 ):
     """ 添加新menu """
 
-    menu_service.add_menu(create_schema=create_schema)
+    await menu_service.add_menu(create_schema=create_schema)
     return Response(status_code=status.HTTP_201_CREATED)
 
 
 @menu_router.get(
     path="/{menu_id}",
     name="查询menu信息",
+    response_model=MenuSimpleSchema,
     dependencies=[Depends(role_required("admin"))]
 )
 @inject
-def get_menu(
+async def get_menu(
         menu_id: str = Query(..., description="菜单id"),
         menu_service: MenuService = Depends(Provide[Container.menu_service])
-) -> MenuSimpleSchema:
+) -> ORJSONResponse:
     """ 查询menu详细信息 """
-    menu = menu_service.get_menu(menu_id=menu_id)
-    return MenuSimpleSchema.from_orm(menu)
+    menu = await menu_service.get_menu(menu_id=menu_id)
+    return ORJSONResponse(orm_to_dict(menu, MenuSimpleSchema))
 
 
 @menu_router.put(
@@ -71,12 +138,12 @@ def get_menu(
     dependencies=[Depends(role_required("admin"))]
 )
 @inject
-def update_menu(
+async def update_menu(
         menu_id: str,
         update_schema: MenuUpdateSchema,
         menu_service: MenuService = Depends(Provide[Container.menu_service])
 ):
-    menu_service.update_menu(menu_id=menu_id, update_schema=update_schema)
+    await menu_service.update_menu(menu_id=menu_id, update_schema=update_schema)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -86,44 +153,9 @@ def update_menu(
     dependencies=[Depends(role_required("admin"))]
 )
 @inject
-def delete_menu(
+async def delete_menu(
         menu_id: str,
         menu_service: MenuService = Depends(Provide[Container.menu_service])
 ):
-    menu_service.delete_menu(menu_id=menu_id)
+    await menu_service.delete_menu(menu_id=menu_id)
     return Response(status_code=status.HTTP_200_OK)
-
-
-@menu_router.get(
-    path="/tree",
-    name="获取权限树结构",
-    dependencies=[Depends(permission_required("sys:menu:tree"))]
-)
-@inject
-def get_menu_tree(
-        menu_service: MenuService = Depends(Provide[Container.menu_service]),
-) -> List[TreeNode]:
-    """ 获取权限树结构 """
-    tree: List[TreeNode] = menu_service.build_menu_tree()
-    return tree
-
-
-@menu_router.get(
-    path="/tree_with_role/{role_id}",
-    name="获取某用户的权限树结构",
-    dependencies=[Depends(role_required("admin"))]
-)
-@inject
-def tree_with_role(
-        role_id: str,
-        menu_service: MenuService = Depends(Provide[Container.menu_service]),
-        role_service: RoleService = Depends(Provide[Container.role_service])
-) -> Dict:
-    """ 获取某角色的权限树 """
-    role: SysRole = role_service.get_role(role_id=role_id)
-    checked_keys: List[str] = [menu.id for menu in role.perms]
-    tree = menu_service.build_menu_tree()
-    return {
-        "tree": tree,
-        "checked_keys": checked_keys
-    }
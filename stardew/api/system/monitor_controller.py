@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 23:20
+# @Description   : 系统运行状态
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+from dependency_injector.wiring import inject, Provide
+
+from stardew.core.db.base import Database
+from stardew.core.mailer import Mailer
+from stardew.core.deps.security import role_required
+from stardew.core.container import IocContainer as Container
+
+monitor_router: APIRouter = APIRouter(tags=["monitor"])
+
+
+@monitor_router.get(
+    path="/db",
+    name="数据库连接池状态",
+    dependencies=[Depends(role_required("admin"))]
+)
+@inject
+async def get_pool_stats(
+        db: Database = Depends(Provide[Container.db])
+) -> Dict[str, Dict[str, Any]]:
+    """ 连接池的连接数、获取连接的等待时间、溢出及超时次数、慢查询次数 """
+    return db.pool_stats()
+
+
+@monitor_router.get(
+    path="/mail",
+    name="邮件发送队列状态",
+    dependencies=[Depends(role_required("admin"))]
+)
+@inject
+async def get_mail_stats(
+        mailer: Mailer = Depends(Provide[Container.mailer])
+) -> Dict[str, Any]:
+    """ 待发送邮件数、连接数、发送成功/失败/重试次数及从入队到发送完成的耗时 """
+    return mailer.stats()
@@ -2,12 +2,17 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/3/2 11:58
 # @Description   :
-from typing import Optional, List
+from typing import Optional, List, Union, Dict
 
 from dependency_injector.wiring import inject, Provide
 from fastapi import APIRouter, Depends, Response, Query, status
+from fastapi.responses import ORJSONResponse
 
+from stardew.settings import settings
+from stardew.core.exporter import FORMAT_NDJSON, encode_stream, export_headers
 from stardew.models.system import SysRole
+from stardew.core.web.responses import StreamingResponse, orm_to_dict, orm_to_dicts
+from stardew.core.web.schemas import CursorPage
 from stardew.services.system import RoleService
 from stardew.core.deps.security import permission_required
 from stardew.core.container import IocContainer as Container
@@ -19,32 +24,73 @@ role_router: APIRouter = APIRouter(tags=["role"])
 @role_router.get(
     path="/",
     name="获取角色列表",
+    response_model=Union[List[RoleSimpleSchema], CursorPage[RoleSimpleSchema]],
     # dependencies=[Depends(permission_required("sys:role:list"))]
 )
 @inject
-def get_role_list(
+async def get_role_list(
         page_no: Optional[int] = Query(0, description="对应页码"),
         page_size: Optional[int] = Query(10, description="每页数据"),
+        cursor: Optional[str] = Query(None, description="分页游标。传入时忽略页码，使用游标分页，空字符串表示第一页"),
         role_service: RoleService = Depends(Provide[Container.role_service])
-) -> List[RoleSimpleSchema]:
+) -> ORJSONResponse:
     """ 获取角色列表 """
-    roles: List[SysRole] = role_service.get_role_list(page_no=page_no, page_size=page_size)
-    return [RoleSimpleSchema.from_orm(role) for role in roles]
+    if cursor is not None:
+        items, next_cursor = await role_service.get_role_page(cursor=cursor, page_size=page_size)
+        return ORJSONResponse({"items": orm_to_dicts(items, RoleSimpleSchema), "next_cursor": next_cursor})
+    roles: List[SysRole] = await role_service.get_role_list(page_no=page_no, page_size=page_size)
+    return ORJSONResponse(orm_to_dicts(roles, RoleSimpleSchema))
+
+
+@role_router.get(
+    path="/export",
+    name="导出角色",
+    response_class=StreamingResponse,
+    # dependencies=[Depends(permission_required("sys:role:export"))]
+)
+@inject
+async def export_roles(
+        fmt: Optional[str] = Query(FORMAT_NDJSON, alias="format", regex="^(ndjson|csv)$", description="ndjson 或 csv"),
+        role_service: RoleService = Depends(Provide[Container.role_service])
+) -> StreamingResponse:
+    """ 流式导出全部角色 """
+    names, partitions = await role_service.export_roles(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    media_type, headers = export_headers(fmt, "roles")
+    return StreamingResponse(encode_stream(fmt, names, partitions), media_type=media_type, headers=headers)
 
 
 @role_router.get(
     path="/{role_id}",
     name="获取角色信息",
+    response_model=RoleSimpleSchema,
     dependencies=[Depends(permission_required("sys:role:query"))]
 )
 @inject
-def get_role(
+async def get_role(
         role_id: str = Query(..., description="角色id"),
         role_service: RoleService = Depends(Provide[Container.role_service])
-) -> RoleSimpleSchema:
+) -> ORJSONResponse:
     """ 获取角色信息 """
-    role: SysRole = role_service.get_role(role_id=role_id)
-    return RoleSimpleSchema.from_orm(role)
+    role: SysRole = await role_service.get_role(role_id=role_id)
+    return ORJSONResponse(orm_to_dict(role, RoleSimpleSchema))
+
+
+@role_router.get(
+    path="/{role_id}/checked_keys",
+    name="获取角色已分配的菜单",
+    dependencies=[Depends(permission_required("sys:role:query"))]
+)
+@inject
+async def get_checked_keys(
+        role_id: str,
+        version: Optional[int] = Query(None, description="上次获取到的版本号，传入时只返回此后的变更"),
+        role_service: RoleService = Depends(Provide[Container.role_service])
+) -> Union[Dict, Response]:
+    """ 获取角色已分配的菜单id。版本号未变化时返回304 """
+    delta: Optional[Dict] = await role_service.get_checked_keys_delta(role_id=role_id, version=version)
+    if delta is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    return delta
 
 
 @role_router.post(
@@ -53,12 +99,12 @@ def get_role(
     # dependencies=[Depends(permission_required("sys:role:add"))]
 )
 @inject
-def add_role(
+async def add_role(
         create_schema: RoleCreateSchema,
         role_service: RoleService = Depends(Provide[Container.role_service])
 ):
     """ 添加角色 """
-    role_service.add_role(create_schema=create_schema)
+    await role_service.add_role(create_schema=create_schema)
     return Response(status_code=status.HTTP_201_CREATED)
 
 
@@ -68,13 +114,13 @@ def add_role(
     # dependencies=[Depends(permission_required("sys:role:update"))]
 )
 @inject
-def update_role(
+async def update_role(
         role_id: str,
         update_schema: RoleUpdateSchema,
         role_service: RoleService = Depends(Provide[Container.role_service])
 ):
     """ 更新角色 """
-    role_service.update_role(identity=role_id, update_schema=update_schema)
+    await role_service.update_role(identity=role_id, update_schema=update_schema)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -84,7 +130,7 @@ def update_role(
     dependencies=[Depends(permission_required("sys:role:delete"))]
 )
 @inject
-def delete_role(role_id: str, role_service: RoleService = Depends(Provide[Container.role_service])):
+async def delete_role(role_id: str, role_service: RoleService = Depends(Provide[Container.role_service])):
     """ 删除角色 """
-    role_service.delete_role(identity=role_id)
+    await role_service.delete_role(identity=role_id)
     return Response(status_code=status.HTTP_200_OK)
@@ -2,16 +2,22 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/2/8 12:38
 # @Description   : 系统用户管理
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
 
+from stardew.settings import settings
+from stardew.core.exporter import FORMAT_NDJSON, encode_stream, export_headers
 from stardew.models.system import SysUser
+from stardew.core.importer import FORMATS, parse_records, guess_format
+from stardew.core.web.responses import StreamingResponse, orm_to_dict, orm_to_dicts
+from stardew.core.web.schemas import CursorPage
 from stardew.services.system import UserService
 from stardew.core.deps.security import permission_required
 from stardew.core.container import IocContainer as Container
-from stardew.schemas.system import UserSimpleSchema, UserCreateSchema, UserUpdateSchema
+from stardew.schemas.system import UserSimpleSchema, UserCreateSchema, UserUpdateSchema, UserImportReportSchema
 
 user_router: APIRouter = APIRouter(tags=["user"])
 
@@ -19,17 +25,39 @@ user_router: APIRouter = APIRouter(tags=["user"])
 @user_router.get(
     path="/",
     name="获取用户列表",
+    response_model=Union[List[UserSimpleSchema], CursorPage[UserSimpleSchema]],
     # dependencies=[Depends(permission_required("sys:user:list"))]
 )
 @inject
 async def get_user_list(
         page_no: Optional[int] = Query(0, description="对应页码"),
         page_size: Optional[int] = Query(10, description="每页数据"),
+        cursor: Optional[str] = Query(None, description="分页游标。传入时忽略页码，使用游标分页，空字符串表示第一页"),
         user_service: UserService = Depends(Provide[Container.user_service])
-) -> List[UserSimpleSchema]:
+) -> ORJSONResponse:
     """ 获取用户列表 """
-    users: List[SysUser] = user_service.get_user_list(page_no=page_no, page_size=page_size)
-    return [UserSimpleSchema.from_orm(user) for user in users]
+    if cursor is not None:
+        items, next_cursor = await user_service.get_user_page(cursor=cursor, page_size=page_size)
+        return ORJSONResponse({"items": orm_to_dicts(items, UserSimpleSchema), "next_cursor": next_cursor})
+    users: List[SysUser] = await user_service.get_user_list(page_no=page_no, page_size=page_size)
+    return ORJSONResponse(orm_to_dicts(users, UserSimpleSchema))
+
+
+@user_router.get(
+    path="/export",
+    name="导出用户",
+    response_class=StreamingResponse,
+    # dependencies=[Depends(permission_required("sys:user:export"))]
+)
+@inject
+async def export_users(
+        fmt: Optional[str] = Query(FORMAT_NDJSON, alias="format", regex="^(ndjson|csv)$", description="ndjson 或 csv"),
+        user_service: UserService = Depends(Provide[Container.user_service])
+) -> StreamingResponse:
+    """ 流式导出全部用户 """
+    names, partitions = await user_service.export_users(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    media_type, headers = export_headers(fmt, "users")
+    return StreamingResponse(encode_stream(fmt, names, partitions), media_type=media_type, headers=headers)
 
 
 @user_router.get(
@@ -42,10 +70,10 @@ async def get_user_list(
 async def get_user(
         user_id: str = Query(..., description="用户id"),
         user_service: UserService = Depends(Provide[Container.user_service])
-) -> UserSimpleSchema:
+) -> ORJSONResponse:
     """ 获取用户详情 """
-    user: SysUser = user_service.get_user(identity=user_id)
-    return UserSimpleSchema.from_orm(user)
+    user: SysUser = await user_service.get_user(identity=user_id)
+    return ORJSONResponse(orm_to_dict(user, UserSimpleSchema))
 
 
 @user_router.post(
@@ -61,10 +89,38 @@ async def create_user(
     """
     创建新用户
     """
-    user_service.add_user(create_schema=create_schema)
+    await user_service.add_user(create_schema=create_schema)
     return Response(status_code=status.HTTP_201_CREATED)
 
 
+@user_router.post(
+    path="/import",
+    name="批量导入用户",
+    response_model=UserImportReportSchema,
+    # dependencies=[Depends(permission_required("sys:user:add"))]
+)
+@inject
+async def import_users(
+        request: Request,
+        fmt: Optional[str] = Query(
+            None, alias="format", regex=f"^({'|'.join(FORMATS)})$",
+            description="数据格式 jsonl 或 csv，为空时根据Content-Type判断"
+        ),
+        batch_size: Optional[int] = Query(settings.USER_IMPORT_BATCH_SIZE, ge=1, le=2000, description="每批处理的行数"),
+        user_service: UserService = Depends(Provide[Container.user_service])
+) -> UserImportReportSchema:
+    """
+    批量导入用户，请求体为json lines或csv(首行为表头，角色id以 ; 分隔)，边接收边处理。
+    返回每一行的处理结果
+    """
+    records = parse_records(
+        request.stream(),
+        fmt or guess_format(request.headers.get("content-type")),
+        list_fields=("roles",)
+    )
+    return await user_service.import_users(records=records, batch_size=batch_size)
+
+
 @user_router.put(
     path="/{user_id}",
     name="修改用户信息",
@@ -77,7 +133,7 @@ async def update_user(
         user_service: UserService = Depends(Provide[Container.user_service])
 ):
     """ 修改用户信息 """
-    user_service.update_user(identity=user_id, update_schema=update_schema)
+    await user_service.update_user(identity=user_id, update_schema=update_schema)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -92,5 +148,5 @@ async def delete_user(
         user_service: UserService = Depends(Provide[Container.user_service])
 ):
     """ 删除系统用户 """
-    user_service.delete_user(identity=user_id)
+    await user_service.delete_user(identity=user_id)
     return Response(status_code=status.HTTP_200_OK)
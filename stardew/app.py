@@ -2,40 +2,78 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/1/29 10:33
 # @Description   :
+from typing import Any, Callable, Dict
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.openapi.utils import get_openapi
 
 from stardew import api
 from stardew.core import deps
+from stardew.core.metrics import MetricsMiddleware, request_metrics
 from stardew.core.container import IocContainer
+from stardew.core.permission import permission_registry
+from stardew.settings import settings
+from stardew.common.utils import EmailUtil, logger
 
 
 def create_app() -> FastAPI:
     """ 实例化fastapi app """
-    app = FastAPI(title="STARDEW")
+    # 默认使用orjson序列化响应，比标准库json快数倍
+    app = FastAPI(title="STARDEW", default_response_class=ORJSONResponse)
     # 装配路由
     app.include_router(api.api)
+    if settings.METRICS_ENABLED:
+        # 按路由表预先创建各路由的指标
+        request_metrics.register_routes(app.routes)
+        app.add_middleware(MetricsMiddleware, metrics=request_metrics)
     # 初始化IOC容器。参考 https://python-dependency-injector.ets-labs.org/wiring.html#wiring
     container = IocContainer()
     container.wire(packages=[
         api,
         deps
     ])
+    app.container = container
+
+    @app.on_event("startup")
+    async def init_resources() -> None:
+        if settings.LAZY_STARTUP:
+            # 只启动登录会话失效监听并加载权限注册表(不查询菜单表)，其余资源在首次注入时初始化
+            await container.session_listener.init()
+            await permission_registry.sync(await container.redis_pool())
+            return
+        # 初始化redis连接池、登录会话失效监听等资源
+        await container.init_resources()
+        if settings.DB_POOL_WARMUP:
+            await container.db().warmup(settings.DB_POOL_SIZE)
+        # 预编译邮件模板
+        templates = EmailUtil.templates.precompile()
+        logger.info(f"Precompiled {len(templates)} email templates")
+
+    @app.on_event("shutdown")
+    async def shutdown_resources() -> None:
+        await container.shutdown_resources()
 
-    custom_openapi(app)
+    app.openapi = custom_openapi(app)
 
     return app
 
 
-def custom_openapi(app: FastAPI):
-    if not app.openapi_schema:
-        openapi_schema = get_openapi(
-            title="STARDEW API DOCS",
-            version="0.1.0",
-            description="This is a very custom OpenAPI schema",
-            routes=app.routes,
-        )
-        openapi_schema["info"]["x-logo"] = {
-            "url": "https://img.3dmgame.com/uploads/allimg/170506/316-1F506161K9.png"
-        }
-        app.openapi_schema = openapi_schema
+def custom_openapi(app: FastAPI) -> Callable[[], Dict[str, Any]]:
+    """ 生成文档的函数。遍历所有路由生成文档耗时较长，在首次访问 /openapi.json 时才生成 """
+
+    def openapi() -> Dict[str, Any]:
+        if not app.openapi_schema:
+            openapi_schema = get_openapi(
+                title="STARDEW API DOCS",
+                version="0.1.0",
+                description="This is a very custom OpenAPI schema",
+                routes=app.routes,
+            )
+            openapi_schema["info"]["x-logo"] = {
+                "url": "https://img.3dmgame.com/uploads/allimg/170506/316-1F506161K9.png"
+            }
+            app.openapi_schema = openapi_schema
+        return app.openapi_schema
+
+    return openapi
@@ -8,7 +8,17 @@ from string import ascii_letters, digits
 class Constant:
 	UTF8 = "utf-8"
 	LOGIN_REDIS_KEY = "login_key: "
+	# 用户id -> 该用户所有登录会话的sub
+	USER_SESSIONS_REDIS_KEY = "user_sessions: "
 	CAPTCHA_REDIS_KEY = "captcha_key: "
+	# 登录信息失效的广播频道
+	SESSION_INVALIDATE_CHANNEL = "session_invalidate"
+	# 权限字符串 -> 权限id
+	PERMISSION_REGISTRY_REDIS_KEY = "permission_registry"
+	# 菜单树版本号，菜单变更时递增
+	MENU_TREE_VERSION_REDIS_KEY = "menu_tree_version"
+	# 角色已分配的菜单id及其版本号、变更日志
+	ROLE_MENUS_REDIS_KEY = "role_menus: "
 	HTTP_PROTOCOL = "http://"
 	HTTPS_PROTOCOL = "https://"
 	CAPTCHA_LETTERS = ascii_letters + digits
@@ -5,6 +5,7 @@
 from .emails import EmailUtil
 from .strings import StringUtil
 from .security import SecurityUtil
+from .cache import LRUCache
 from .logger import logger
 
 __all__ = {
@@ -12,4 +13,5 @@ __all__ = {
     "EmailUtil",
     "SecurityUtil",
     "StringUtil",
+    "LRUCache",
 }
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 17:30
+# @Description   : 进程内缓存
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+
+    """ 带过期时间的LRU缓存。非线程安全，仅在事件循环线程内使用 """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        """
+        :param maxsize: 最大条目数，超出后淘汰最久未使用的条目
+        :param ttl: 默认过期秒数，为None时永不过期
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        # key -> (过期时间点, value)
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """
+        读取缓存，命中时将该条目移动到队尾
+        :param key: 键
+        :param default: 未命中时的返回值
+        :param count: 是否计入命中统计
+        :return:
+        """
+        item = self._data.get(key)
+        if item is not None:
+            expire_at, value = item
+            if expire_at is None or expire_at > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            self._discard(key)
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        写入缓存
+        :param key: 键
+        :param value: 值
+        :param ttl: 过期秒数，为空时使用默认值
+        :return:
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expire_at: Optional[float] = None if ttl is None else time.monotonic() + ttl
+        if key in self._data:
+            self._discard(key)
+        self._data[key] = (expire_at, value)
+        while len(self._data) > self.maxsize:
+            self._discard(next(iter(self._data)))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """ 移除并返回缓存条目 """
+        item = self._data.get(key)
+        if item is None:
+            return default
+        self._discard(key)
+        return item[1]
+
+    def clear(self) -> None:
+        for key in list(self._data):
+            self._discard(key)
+
+    def stats(self) -> Dict[str, int]:
+        """ 缓存统计信息 """
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _discard(self, key: Hashable) -> None:
+        """ 所有的删除(主动移除、过期、淘汰)都经过此方法，子类可以重写以维护额外索引 """
+        del self._data[key]
@@ -8,35 +8,54 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Tuple, Union, List, Dict, Any, Optional
 
-from jinja2 import Environment, PackageLoader, select_autoescape
-
 from stardew.settings import settings
 from stardew.common.constants import Constant
+from .templates import TemplateRenderer
+
+
+def _package_loader():
+    from jinja2 import PackageLoader
+
+    return PackageLoader("stardew")
+
+
+class _TemplateEnv:
+
+    """ EmailUtil.env，首次访问时才创建jinja2环境 """
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        return owner.templates.env
 
 
 class EmailUtil:
 
     """ 邮件工具集 """
 
-    env = Environment(loader=PackageLoader("stardew"), autoescape=select_autoescape())
+    templates = TemplateRenderer(
+        _package_loader,
+        bytecode_cache=settings.TEMPLATE_BYTECODE_CACHE,
+        cache_dir=settings.TEMPLATE_CACHE_DIR,
+        auto_reload=settings.TEMPLATE_AUTO_RELOAD,
+        render_cache_size=settings.TEMPLATE_RENDER_CACHE_SIZE
+    )
+    env = _TemplateEnv()
 
     @staticmethod
-    def send_mail(
+    def build_message(
         *,
         subject: str,
         html_content: str,
         receivers: Union[Tuple, List],
         sender_alias: Optional[str] = None
-    ) -> None:
+    ) -> MIMEMultipart:
         """
-        发送邮件。邮件应当使用Jinja2模板进行渲染。
+        构造邮件
         :param sender_alias: 发送者昵称
         :param receivers: 接收者
         :param subject: 邮件主题
         :param html_content: 已经渲染好的html文本
         :return:
         """
-
         mm = MIMEMultipart()
 
         # 设置发送者,注意严格遵守格式,里面邮箱为发件人邮箱
@@ -50,27 +69,54 @@ class EmailUtil:
         message_text = MIMEText(_text=html_content, _subtype="html", _charset=Constant.UTF8)
         # 向MIMEMultipart对象中添加文本对象
         mm.attach(message_text)
+        return mm
 
+    @staticmethod
+    def connect() -> smtplib.SMTP:
+        """ 创建SMTP连接并登录，未配置授权码时不登录 """
         # 创建SMTP对象，使用SSL加密
         if settings.SMTP_TLS:
-            stp = smtplib.SMTP_SSL(host=settings.SMTP_HOST, port=settings.SMTP_PORT)
+            stp = smtplib.SMTP_SSL(host=settings.SMTP_HOST, port=settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
         else:
-            stp = smtplib.SMTP(host=settings.SMTP_HOST, port=settings.SMTP_PORT)
-        stp.set_debuglevel(1)
-        # 登录邮箱，传递参数1：邮箱地址，参数2：邮箱授权码
-        stp.login(settings.EMAIL_SENDER, settings.SMTP_LICENCE)
+            stp = smtplib.SMTP(host=settings.SMTP_HOST, port=settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
+        if settings.SMTP_LICENCE:
+            # 登录邮箱，传递参数1：邮箱地址，参数2：邮箱授权码
+            stp.login(settings.SMTP_USER or settings.EMAIL_SENDER, settings.SMTP_LICENCE)
+        return stp
+
+    @classmethod
+    def send_mail(
+        cls,
+        *,
+        subject: str,
+        html_content: str,
+        receivers: Union[Tuple, List],
+        sender_alias: Optional[str] = None
+    ) -> None:
+        """
+        同步发送邮件，每次都会建立新连接。在协程中应使用 stardew.core.mailer.Mailer 入队后台发送
+        :param sender_alias: 发送者昵称
+        :param receivers: 接收者
+        :param subject: 邮件主题
+        :param html_content: 已经渲染好的html文本
+        :return:
+        """
+        mm = cls.build_message(
+            subject=subject, html_content=html_content, receivers=receivers, sender_alias=sender_alias
+        )
+        stp = cls.connect()
         # 发送邮件，传递参数1：发件人邮箱地址，参数2：收件人邮箱地址，参数3：内容转纯字符串
         stp.sendmail(settings.EMAIL_SENDER, receivers, mm.as_string())
         # 关闭SMTP对象
         stp.quit()
 
     @classmethod
-    def render_template(cls, template_name, content: Dict[str, Any]) -> str:
+    def render_template(cls, template_name, content: Dict[str, Any], cache: bool = False) -> str:
         """
         渲染html模板，用于邮件正文部分的构建
         :param template_name: 模板名称
         :param content: 邮件正文内容
+        :param cache: 是否缓存渲染结果，群发内容相同的邮件时开启
         :return:
         """
-        template = cls.env.get_template(template_name)
-        return template.render(**content)
\ No newline at end of file
+        return cls.templates.render(template_name, content, cache=cache)
\ No newline at end of file
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 05:20
+# @Description   : 非阻塞的日志文件输出
+import os
+import re
+import time
+import zipfile
+import threading
+import traceback
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+import orjson
+
+# 达到该级别(ERROR)的日志在队列满时仍然入队，不会被丢弃
+_KEEP_LEVEL_NO: int = 40
+
+_SIZE_UNITS: Dict[str, int] = {"b": 1, "kb": 1 << 10, "mb": 1 << 20, "gb": 1 << 30}
+_TIME_UNITS: Dict[str, int] = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 604800}
+
+
+def parse_rotation(rotation: str) -> Tuple[Optional[int], Optional[float]]:
+    """
+    解析轮转条件
+    :param rotation: 如 "500 MB"、"1 week"、"12 hours"
+    :return: (按大小轮转的字节数, 按时间轮转的秒数)，两者只有一个不为空
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]+)\s*", rotation)
+    if match is None:
+        raise ValueError(f"无法解析的日志轮转条件: {rotation}")
+    value, unit = float(match.group(1)), match.group(2).lower()
+    if unit in _SIZE_UNITS:
+        return int(value * _SIZE_UNITS[unit]), None
+    unit = unit[:-1] if unit.endswith("s") else unit
+    if unit in _TIME_UNITS:
+        return None, value * _TIME_UNITS[unit]
+    raise ValueError(f"无法解析的日志轮转条件: {rotation}")
+
+
+def serialize_record(record: Dict[str, Any]) -> bytes:
+    """ 将loguru的日志记录转换为一行json """
+    data: Dict[str, Any] = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "name": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    if record["extra"]:
+        data["extra"] = record["extra"]
+    if record["exception"] is not None:
+        exc_type, exc_value, exc_traceback = record["exception"]
+        data["exception"] = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
+    return orjson.dumps(data, default=str) + b"\n"
+
+
+class QueueFileSink:
+    """
+    loguru的文件输出。
+    记录日志的线程只负责序列化(orjson，约1微秒)并追加到队列，写文件、轮转都在后台线程中进行，
+    轮转后的压缩在另一个线程中进行，不阻塞写入。后台线程大部分时间处于文件IO中，不持有GIL，
+    对事件循环线程的影响很小。
+    队列满时丢弃ERROR以下级别的日志并计数(dropped)；ERROR及以上级别仍然入队并计数(overflowed)。
+    后台线程每次取出至多 batch_size 条日志合并为一次写入，队列积压到 batch_size 条时立即唤醒，
+    否则每 flush_interval 秒写入一次
+    """
+
+    def __init__(
+            self,
+            path: str,
+            rotation: Optional[str] = None,
+            compression: bool = True,
+            serialize: bool = True,
+            queue_size: int = 10000,
+            batch_size: int = 256,
+            flush_interval: float = 0.5,
+    ) -> None:
+        """
+        :param path: 日志文件路径
+        :param rotation: 轮转条件，为空时不轮转
+        :param compression: 轮转后是否压缩为zip
+        :param serialize: 为True时每行输出一个json对象，否则输出loguru格式化后的文本
+        :param queue_size: 队列容量
+        :param batch_size: 每次写入的最大条数
+        :param flush_interval: 队列未积压时写入的间隔秒数
+        """
+        self.path = path
+        self.rotate_size, self.rotate_interval = parse_rotation(rotation) if rotation else (None, None)
+        self.compression = compression
+        self.serialize = serialize
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # 入队、写入、丢弃、超出容量入队的条数，写入次数及轮转次数
+        self.queued: int = 0
+        self.written: int = 0
+        self.dropped: int = 0
+        self.overflowed: int = 0
+        self.batches: int = 0
+        self.rotations: int = 0
+        # deque的append/popleft是线程安全的，入队不需要加锁
+        self._queue: "deque[bytes]" = deque()
+        self._wakeup = threading.Event()
+        self._compressor: Optional[ThreadPoolExecutor] = None
+        self._file: BinaryIO = self._open()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def write(self, message: Any) -> None:
+        """ loguru调用，message为格式化后的文本，message.record为原始记录 """
+        size: int = len(self._queue)
+        if size >= self.queue_size:
+            if message.record["level"].no < _KEEP_LEVEL_NO:
+                self.dropped += 1
+                return
+            self.overflowed += 1
+        self._queue.append(serialize_record(message.record) if self.serialize else str(message).encode())
+        self.queued += 1
+        if size + 1 == self.batch_size:
+            self._wakeup.set()
+
+    def stop(self) -> None:
+        """ 写完队列中剩余的日志后关闭文件，loguru移除该输出时调用 """
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._file.close()
+        if self._compressor is not None:
+            self._compressor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, int]:
+        """ 队列深度及各项计数 """
+        return {
+            "queue_depth": len(self._queue),
+            "queued": self.queued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "overflowed": self.overflowed,
+            "batches": self.batches,
+            "rotations": self.rotations,
+        }
+
+    def _open(self) -> BinaryIO:
+        file: BinaryIO = open(self.path, "ab")
+        # 按时间轮转时以文件的创建时间为起点，重启后继续计算
+        self._opened_at: float = os.path.getmtime(self.path) if file.tell() else time.time()
+        return file
+
+    def _run(self) -> None:
+        """ 后台线程: 批量取出并写入 """
+        while True:
+            if not self._queue:
+                if self._stopped.is_set():
+                    return
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                continue
+            batch: List[bytes] = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            self._write(b"".join(batch))
+            self.written += len(batch)
+            self.batches += 1
+
+    def _write(self, data: bytes) -> None:
+        if self._should_rotate(len(data)):
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+
+    def _should_rotate(self, size: int) -> bool:
+        if self.rotate_size is not None:
+            position: int = self._file.tell()
+            return position > 0 and position + size > self.rotate_size
+        if self.rotate_interval is not None:
+            return time.time() - self._opened_at >= self.rotate_interval
+        return False
+
+    def _rotate(self) -> None:
+        """ 重命名当前文件并打开新文件，压缩交给另一个线程 """
+        self._file.close()
+        root, ext = os.path.splitext(self.path)
+        rotated: str = f"{root}.{datetime.now().strftime('%Y-%m-%d_%H-%M-%S_%f')}{ext}"
+        os.rename(self.path, rotated)
+        self._file = self._open()
+        self.rotations += 1
+        if self.compression:
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-compress")
+            self._compressor.submit(self._compress, rotated)
+
+    @staticmethod
+    def _compress(path: str) -> None:
+        with zipfile.ZipFile(path + ".zip", "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(path, arcname=os.path.basename(path))
+        os.remove(path)
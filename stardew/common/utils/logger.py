@@ -3,20 +3,57 @@
 # @CreatedTime   : 2021/2/10 13:31
 # @Description   : 日志组件
 import os
+import atexit
+import logging
 
 from loguru import logger
 
-from stardew.common.constants import Constant
 from stardew.settings import settings
+from .log_sink import QueueFileSink
 
 log_dir = os.path.join(settings.BASE_DIR, "logs")
 if not os.path.exists(log_dir):
     os.mkdir(log_dir)
+# 写文件、轮转及压缩都在后台线程中进行，记录日志时只需入队
+log_sink = QueueFileSink(
+    path=os.path.join(log_dir, settings.LOG_FILENAME),
+    rotation=settings.LOG_ROTATION,
+    compression=True,
+    serialize=settings.LOG_SERIALIZE,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    batch_size=settings.LOG_BATCH_SIZE,
+    flush_interval=settings.LOG_FLUSH_INTERVAL
+)
 logger.add(
-    sink=os.path.join(log_dir, "stardew.log"),
+    sink=log_sink,
     level=settings.LOG_LEVEL,
-    format=settings.LOG_FORMAT,
-    rotation=settings.LOG_ROTATION,
-    compression="zip",
-    encoding=Constant.UTF8
+    # 输出json时由后台线程序列化原始记录，不需要loguru再格式化一次
+    format="{message}" if settings.LOG_SERIALIZE else settings.LOG_FORMAT
 )
+# 进程退出前写完队列中的日志
+atexit.register(log_sink.stop)
+
+
+class InterceptHandler(logging.Handler):
+
+    """ 将标准库logging的日志转发到loguru，如sqlalchemy输出的sql语句 """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        logger.opt(depth=6, exception=record.exc_info).log(level, record.getMessage())
+
+
+def intercept_logging(name: str, level: int = logging.INFO) -> None:
+    """
+    将某个标准库logger的输出转发到loguru
+    :param name: logger名称
+    :param level: 日志级别
+    :return:
+    """
+    std_logger: logging.Logger = logging.getLogger(name)
+    std_logger.handlers = [InterceptHandler()]
+    std_logger.setLevel(level)
+    std_logger.propagate = False
@@ -5,19 +5,19 @@
 from typing import Union, Any, Dict
 from datetime import timedelta, datetime
 
-from jose.constants import ALGORITHMS
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
-from jose import jwt, ExpiredSignatureError, JWTError
+from jose import ExpiredSignatureError, JWTError
 
 from stardew.settings import settings
+from .tokens import token_verifier
 
 
 class SecurityUtil:
 
 	""" 安全相关的功能集合 """
 
-	_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+	_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 	@staticmethod
 	def create_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
@@ -32,7 +32,7 @@ class SecurityUtil:
 		else:
 			expire = datetime.utcnow() + timedelta(minutes=settings.JWT_EXPIRED_MINUTES)
 		payload = {"exp": expire, "sub": str(subject)}
-		token = jwt.encode(payload, settings.SECRET_KEY, algorithm=ALGORITHMS.HS256)
+		token = token_verifier.encode(payload)
 		return token
 
 	@staticmethod
@@ -40,10 +40,10 @@ class SecurityUtil:
 		"""
 		解析token,获取token携带的信息
 		:param token: 待解析的token
-		:return: 解析后的信息
+		:return: 解析后的信息，与其他请求共享，不应修改
 		"""
 		try:
-			return jwt.decode(token, key=settings.SECRET_KEY, algorithms=[ALGORITHMS.HS256])
+			return token_verifier.verify(token)
 		# 令牌过期
 		except ExpiredSignatureError:
 			raise HTTPException(status.HTTP_401_UNAUTHORIZED, "登录信息已过期，请重新登录")
@@ -53,7 +53,7 @@ class SecurityUtil:
 
 	@classmethod
 	def verify_password(cls, plain_password: str, hashed_password: str) -> bool:
-		""" 校验密码 """
+		""" 校验密码。计算耗时较长，在协程中应使用 PasswordHasher """
 		return cls._pwd_context.verify(plain_password, hashed_password)
 
 	@classmethod
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 04:30
+# @Description   : 邮件模板的预编译与渲染缓存
+import hashlib
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Union
+
+import orjson
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    from jinja2 import BaseLoader, Environment
+
+
+class TemplateRenderer:
+    """
+    模板渲染。
+        字节码缓存: 编译后的模板保存到磁盘，重启后只需校验源码的校验和，不需要重新解析和编译
+        预编译   : 启动时加载全部模板，首个请求不需要等待编译；运行期间不再检查模板文件是否变化
+        延迟创建 : jinja2及模板加载器(PackageLoader会导入pkg_resources，耗时上百毫秒)在首次使用时才导入和创建
+        渲染缓存 : 群发邮件时同一模板、同一内容只渲染一次，按 (模板名, 内容摘要) 缓存渲染结果。
+                  仅在调用时显式开启，个性化内容不应进入缓存
+    """
+
+    def __init__(
+            self,
+            loader: Union["BaseLoader", Callable[[], "BaseLoader"]],
+            bytecode_cache: bool = True,
+            cache_dir: Optional[str] = None,
+            auto_reload: bool = False,
+            render_cache_size: int = 0
+    ) -> None:
+        """
+        :param loader: 模板加载器，或创建加载器的函数(首次使用时调用)
+        :param bytecode_cache: 是否将编译后的模板缓存到磁盘
+        :param cache_dir: 字节码缓存目录，为空时使用系统临时目录
+        :param auto_reload: 每次获取模板时是否检查文件是否修改，开发时开启
+        :param render_cache_size: 渲染结果的缓存条目数，为0时不缓存
+        """
+        self.loader = loader
+        self.bytecode_cache = bytecode_cache
+        self.cache_dir = cache_dir
+        self.auto_reload = auto_reload
+        self._env: Optional["Environment"] = None
+        self._rendered: Optional[LRUCache] = LRUCache(maxsize=render_cache_size) if render_cache_size else None
+
+    @property
+    def env(self) -> "Environment":
+        if self._env is None:
+            from jinja2 import Environment, FileSystemBytecodeCache, select_autoescape
+
+            self._env = Environment(
+                loader=self.loader() if callable(self.loader) else self.loader,
+                autoescape=select_autoescape(),
+                auto_reload=self.auto_reload,
+                bytecode_cache=FileSystemBytecodeCache(self.cache_dir) if self.bytecode_cache else None
+            )
+        return self._env
+
+    def precompile(self) -> List[str]:
+        """
+        加载全部模板
+        :return: 已加载的模板名
+        """
+        try:
+            names: List[str] = self.env.list_templates()
+        except FileNotFoundError:
+            # 尚未创建模板目录
+            return []
+        for name in names:
+            self.env.get_template(name)
+        return names
+
+    def render(self, template_name: str, content: Dict[str, Any], cache: bool = False) -> str:
+        """
+        渲染模板
+        :param template_name: 模板名称
+        :param content: 模板变量
+        :param cache: 是否使用渲染缓存，用于群发等内容相同的邮件
+        :return:
+        """
+        if not cache or self._rendered is None:
+            return self.env.get_template(template_name).render(**content)
+        key: Hashable = (template_name, self._digest(content))
+        html: Optional[str] = self._rendered.get(key)
+        if html is None:
+            html = self.env.get_template(template_name).render(**content)
+            self._rendered.set(key, html)
+        return html
+
+    def stats(self) -> Dict[str, int]:
+        """ 渲染缓存统计信息 """
+        return self._rendered.stats() if self._rendered is not None else {}
+
+    @staticmethod
+    def _digest(content: Dict[str, Any]) -> bytes:
+        """ 模板变量的摘要，键的顺序不影响结果 """
+        return hashlib.blake2b(
+            orjson.dumps(content, option=orjson.OPT_SORT_KEYS, default=str), digest_size=16
+        ).digest()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 03:00
+# @Description   : token的签发与校验
+"""
+签发和校验统一经过 token_verifier:
+    backend: 具体的HS256实现，由 settings.JWT_BACKEND 选择。
+             hmac 使用标准库 hmac/hashlib 及 orjson，jose 使用python-jose，两者签发的token可以互相校验，
+             抛出的异常均为 jose.JWTError / jose.ExpiredSignatureError
+    缓存   : 校验通过的token -> claims，存活到token的exp为止。同一个token的后续请求只需一次字典查找
+"""
+import hmac
+import time
+import base64
+import hashlib
+import calendar
+from datetime import datetime
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Type
+
+import orjson
+from jose import jwt, ExpiredSignatureError, JWTError
+from jose.exceptions import JWTClaimsError
+from jose.constants import ALGORITHMS
+
+from stardew.settings import settings
+from .cache import LRUCache
+
+# 签发时转换为时间戳的字段，与python-jose一致
+_TIME_CLAIMS = ("exp", "iat", "nbf")
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class JWTBackend(ABC):
+
+    """ HS256 token的编码与解码 """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+
+    @abstractmethod
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """ 签发token, exp/iat/nbf 可以是datetime """
+
+    @abstractmethod
+    def decode(self, token: str) -> Dict[str, Any]:
+        """ 校验签名及exp/nbf，返回claims。过期时抛出 ExpiredSignatureError，其余错误抛出 JWTError """
+
+
+class JoseBackend(JWTBackend):
+
+    """ python-jose 实现 """
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        return jwt.encode(claims, self.key, algorithm=ALGORITHMS.HS256)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        return jwt.decode(token, key=self.key, algorithms=[ALGORITHMS.HS256])
+
+
+class HMACBackend(JWTBackend):
+
+    """ 仅支持HS256，直接使用标准库计算签名，省去python-jose中算法协商、密钥对象构造等开销 """
+
+    def __init__(self, key: str) -> None:
+        super().__init__(key)
+        # 预先完成密钥的填充，每次签名只需复制
+        self._hmac = hmac.new(key.encode(), digestmod=hashlib.sha256)
+        self._header: bytes = _b64encode(orjson.dumps({"alg": ALGORITHMS.HS256, "typ": "JWT"}))
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return _b64encode(mac.digest())
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        claims = dict(claims)
+        for name in _TIME_CLAIMS:
+            if isinstance(claims.get(name), datetime):
+                claims[name] = calendar.timegm(claims[name].utctimetuple())
+        signing_input: bytes = self._header + b"." + _b64encode(orjson.dumps(claims))
+        return (signing_input + b"." + self._sign(signing_input)).decode()
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            signing_input, _, signature = token.encode("ascii").rpartition(b".")
+            header_segment, _, payload_segment = signing_input.partition(b".")
+            if not hmac.compare_digest(signature, self._sign(signing_input)):
+                raise JWTError("Signature verification failed.")
+            header = orjson.loads(_b64decode(header_segment))
+            claims = orjson.loads(_b64decode(payload_segment))
+        except ValueError:
+            raise JWTError("Invalid token.")
+        if not isinstance(header, dict) or header.get("alg") != ALGORITHMS.HS256:
+            raise JWTError("The specified alg value is not allowed")
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload.")
+        now: int = int(time.time())
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise JWTClaimsError("Expiration Time claim (exp) must be an integer.")
+            if exp < now:
+                raise ExpiredSignatureError("Signature has expired.")
+        nbf = claims.get("nbf")
+        if nbf is not None and (not isinstance(nbf, (int, float)) or nbf > now):
+            raise JWTClaimsError("The token is not yet valid (nbf)")
+        return claims
+
+
+JWT_BACKENDS: Dict[str, Type[JWTBackend]] = {
+    "hmac": HMACBackend,
+    "jose": JoseBackend,
+}
+
+
+class TokenVerifier:
+
+    """ 带缓存的token校验 """
+
+    def __init__(self, backend: JWTBackend, maxsize: int = 10000) -> None:
+        """
+        :param backend: HS256实现
+        :param maxsize: 缓存的token数，为0时不缓存
+        """
+        self.backend = backend
+        self._cache: Optional[LRUCache] = LRUCache(maxsize=maxsize) if maxsize else None
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """ 签发token """
+        return self.backend.encode(claims)
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        校验token。
+        命中缓存时直接返回上次校验的结果，该字典在多次请求间共享，调用方不应修改
+        :param token: token
+        :return: claims
+        """
+        if self._cache is not None:
+            claims: Optional[Dict[str, Any]] = self._cache.get(token)
+            if claims is not None:
+                return claims
+        claims = self.backend.decode(token)
+        if self._cache is not None:
+            exp = claims.get("exp")
+            self._cache.set(token, claims, None if exp is None else exp - time.time())
+        return claims
+
+    def stats(self) -> Dict[str, int]:
+        """ 缓存统计信息 """
+        return self._cache.stats() if self._cache is not None else {}
+
+
+def create_verifier(backend: str, key: str, maxsize: int = 10000) -> TokenVerifier:
+    """
+    :param backend: JWT_BACKENDS 中的名称
+    :param key: 签名密钥
+    :param maxsize: 缓存的token数
+    :return:
+    """
+    if backend not in JWT_BACKENDS:
+        raise ValueError(f"不支持的JWT_BACKEND: {backend}，可选值: {', '.join(JWT_BACKENDS)}")
+    return TokenVerifier(JWT_BACKENDS[backend](key), maxsize=maxsize)
+
+
+token_verifier: TokenVerifier = create_verifier(settings.JWT_BACKEND, settings.SECRET_KEY, settings.JWT_CACHE_SIZE)
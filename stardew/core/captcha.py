@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 20:10
+# @Description   : 验证码预渲染池
+import os
+import time
+import asyncio
+import secrets
+from io import BytesIO
+from string import ascii_letters, digits
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from stardew.common.utils import logger
+from stardew.core.metrics import record_captcha
+
+if TYPE_CHECKING:
+    from captcha.image import ImageCaptcha
+
+_ALLOWED_LETTERS: str = digits + ascii_letters
+
+# 每个工作进程内按尺寸缓存 ImageCaptcha，避免重复加载字体
+_image_captchas: Dict[Tuple[int, int], "ImageCaptcha"] = {}
+
+
+def render_captcha(width: int, height: int, length: int) -> Tuple[str, bytes]:
+    """
+    生成验证码并渲染为png。在工作进程中执行，必须是模块级函数以便序列化。
+    captcha及PIL在此处导入，使用进程池时主进程不需要导入
+    :param width: 图片宽度
+    :param height: 图片高度
+    :param length: 验证码字符数
+    :return: (验证码, png图片)
+    """
+    image_captcha: Optional["ImageCaptcha"] = _image_captchas.get((width, height))
+    if image_captcha is None:
+        from captcha.image import ImageCaptcha
+
+        image_captcha = _image_captchas[(width, height)] = ImageCaptcha(width, height)
+    code: str = "".join(secrets.choice(_ALLOWED_LETTERS) for _ in range(length))
+    with BytesIO() as f:
+        image_captcha.generate_image(code).save(f, format="png")
+        return code, f.getvalue()
+
+
+class CaptchaEngine:
+    """
+    验证码引擎。
+    渲染验证码需要数毫秒的cpu时间，登录高峰时在事件循环中渲染会拖慢所有请求。
+    引擎在后台由执行器预先渲染一批验证码放入池中，请求时直接取用；池为空时才现场渲染(同样在执行器中)。
+    每个验证码只会被取用一次。
+    """
+
+    def __init__(
+            self,
+            executor: Executor,
+            width: int = 160,
+            height: int = 60,
+            length: int = 4,
+            pool_size: int = 64,
+            feeders: int = 1
+    ) -> None:
+        """
+        :param executor: 执行渲染的进程池或线程池
+        :param width: 图片宽度
+        :param height: 图片高度
+        :param length: 验证码字符数
+        :param pool_size: 预渲染池容量
+        :param feeders: 并行补充池的任务数，通常与执行器大小一致
+        """
+        self.executor = executor
+        self.width = width
+        self.height = height
+        self.length = length
+        self.pool_size = pool_size
+        self.feeders = feeders
+        # 取用时命中/未命中预渲染池的次数
+        self.hits: int = 0
+        self.misses: int = 0
+        # 请求中现场渲染的次数、累计耗时及最大耗时(秒)
+        self.rendered: int = 0
+        self.render_seconds: float = 0.0
+        self.render_max_seconds: float = 0.0
+        # 后台预渲染的次数及累计耗时(秒)，单独统计，不影响请求中的渲染耗时
+        self.prerendered: int = 0
+        self.prerender_seconds: float = 0.0
+        # 队列和后台任务需要在事件循环中创建
+        self._pool: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """ 启动后台补充任务 """
+        self._pool = asyncio.Queue(maxsize=self.pool_size)
+        self._tasks = [asyncio.ensure_future(self._feed()) for _ in range(self.feeders)]
+
+    async def stop(self) -> None:
+        """ 停止后台补充任务 """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def get(self) -> Tuple[str, bytes]:
+        """
+        取出一个验证码
+        :return: (验证码, png图片)
+        """
+        if self._pool is not None and not self._pool.empty():
+            self.hits += 1
+            return self._pool.get_nowait()
+        self.misses += 1
+        return await self.render()
+
+    async def render(
+            self,
+            width: Optional[int] = None,
+            height: Optional[int] = None,
+            record: bool = True
+    ) -> Tuple[str, bytes]:
+        """
+        在执行器中渲染一个验证码，不经过预渲染池
+        :param width: 图片宽度，默认为引擎配置
+        :param height: 图片高度，默认为引擎配置
+        :param record: 是否计入请求中的渲染耗时及请求指标，后台预渲染时为False
+        :return: (验证码, png图片)
+        """
+        start: float = time.perf_counter()
+        result: Tuple[str, bytes] = await asyncio.get_event_loop().run_in_executor(
+            self.executor, render_captcha, width or self.width, height or self.height, self.length
+        )
+        elapsed: float = time.perf_counter() - start
+        if not record:
+            self.prerendered += 1
+            self.prerender_seconds += elapsed
+            return result
+        self.rendered += 1
+        self.render_seconds += elapsed
+        self.render_max_seconds = max(self.render_max_seconds, elapsed)
+        record_captcha(elapsed)
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """ 池深度、命中率，以及请求中和后台预渲染的耗时 """
+        return {
+            "pool_depth": 0 if self._pool is None else self._pool.qsize(),
+            "pool_size": self.pool_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rendered": self.rendered,
+            "render_avg_ms": round(self.render_seconds / self.rendered * 1000, 2) if self.rendered else 0.0,
+            "render_max_ms": round(self.render_max_seconds * 1000, 2),
+            "prerendered": self.prerendered,
+            "prerender_avg_ms": round(self.prerender_seconds / self.prerendered * 1000, 2) if self.prerendered else 0.0,
+        }
+
+    async def _feed(self) -> None:
+        """ 持续渲染并放入池中，池满时阻塞在put上 """
+        while True:
+            try:
+                await self._pool.put(await self.render(record=False))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to render captcha")
+                await asyncio.sleep(1)
+
+
+async def init_captcha_engine(
+        executor_type: str = "process",
+        workers: Optional[int] = None,
+        width: int = 160,
+        height: int = 60,
+        length: int = 4,
+        pool_size: int = 64
+) -> AsyncIterator[CaptchaEngine]:
+    """
+    创建验证码引擎并开始预渲染
+    :param executor_type: process 或 thread。PIL绘制时大部分时间持有GIL，默认使用进程池
+    :param workers: 工作进程/线程数，为空时使用cpu核数
+    :param width: 图片宽度
+    :param height: 图片高度
+    :param length: 验证码字符数
+    :param pool_size: 预渲染池容量
+    :return:
+    """
+    workers = workers or os.cpu_count() or 1
+    executor: Executor = ProcessPoolExecutor(max_workers=workers) if executor_type == "process" \
+        else ThreadPoolExecutor(max_workers=workers, thread_name_prefix="captcha")
+    engine: CaptchaEngine = CaptchaEngine(
+        executor, width=width, height=height, length=length, pool_size=pool_size, feeders=workers
+    )
+    engine.start()
+    try:
+        yield engine
+    finally:
+        await engine.stop()
+        executor.shutdown(wait=True)
@@ -4,15 +4,22 @@
 # @Description   :
 from dependency_injector import containers, providers
 
-from stardew.repository.system import UserRepository, RoleRepository
+from stardew.repository.system import AsyncUserRepository, AsyncRoleRepository
 from stardew.settings import settings
 from stardew.core.db.base import Database
 from stardew.core.redis import init_redis_pool
+from stardew.core.hasher import init_password_hasher
+from stardew.core.captcha import init_captcha_engine
+from stardew.core.mailer import init_mailer
+from stardew.core.menu_tree import MenuTree
+from stardew.core.role_menus import RoleMenuCache
+from stardew.core.session import SessionCache, init_session_listener
+from stardew.core.permission import permission_registry, init_permission_registry
 from stardew.services.common.impl import LoginServiceImpl
-from stardew.models.system import SysUser, SysRole, SysMenu
-from stardew.core.db.crud import CRUDService, AsyncCRUDService
+from stardew.models.system import SysMenu
+from stardew.core.db.crud import AsyncCRUDService
 from stardew.services.system.impl import (
-    UserServiceImpl, RoleServiceImpl, MenuServiceImpl
+    AsyncUserServiceImpl, AsyncRoleServiceImpl, AsyncMenuServiceImpl
 )
 
 
@@ -24,7 +31,16 @@ class IocContainer(containers.DeclarativeContainer):
     """
     db = providers.Singleton(
         Database,
-        dsn=settings.SQLALCHEMY_DATABASE_URI
+        dsn=settings.SQLALCHEMY_DATABASE_URI,
+        async_dsn=settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        slow_query_ms=settings.DB_SLOW_QUERY_MS,
+        record_metrics=settings.METRICS_ENABLED
     )
 
     redis_pool = providers.Resource(
@@ -32,41 +48,101 @@ class IocContainer(containers.DeclarativeContainer):
         redis_dsn=settings.REDIS_DSN
     )
 
-    login_service = providers.Factory(
-        LoginServiceImpl,
-        crud=providers.Factory(
-            CRUDService,
-            model_class=SysUser,
-            session_factory=db.provided.session
-        ),
-        redis=redis_pool
+    session_cache = providers.Singleton(
+        SessionCache,
+        maxsize=settings.SESSION_CACHE_MAXSIZE,
+        ttl=settings.SESSION_CACHE_TTL
+    )
+
+    session_listener = providers.Resource(
+        init_session_listener,
+        redis=redis_pool,
+        cache=session_cache
+    )
+
+    permission_registry = providers.Resource(
+        init_permission_registry,
+        registry=providers.Object(permission_registry),
+        redis=redis_pool,
+        session_factory=db.provided.async_session
+    )
+
+    password_hasher = providers.Resource(
+        init_password_hasher,
+        executor_type=settings.PASSWORD_HASH_EXECUTOR,
+        workers=settings.PASSWORD_HASH_WORKERS,
+        max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        timeout=settings.PASSWORD_HASH_TIMEOUT
+    )
+
+    captcha_engine = providers.Resource(
+        init_captcha_engine,
+        executor_type=settings.CAPTCHA_EXECUTOR,
+        workers=settings.CAPTCHA_WORKERS,
+        width=settings.CAPTCHA_WIDTH,
+        height=settings.CAPTCHA_HEIGHT,
+        length=settings.CAPTCHA_CHAR_LENGTH,
+        pool_size=settings.CAPTCHA_POOL_SIZE
+    )
+
+    mailer = providers.Resource(
+        init_mailer,
+        sender=settings.EMAIL_SENDER,
+        connections=settings.MAIL_CONNECTIONS,
+        queue_size=settings.MAIL_QUEUE_SIZE,
+        batch_size=settings.MAIL_BATCH_SIZE,
+        max_retries=settings.MAIL_MAX_RETRIES,
+        retry_backoff=settings.MAIL_RETRY_BACKOFF,
+        idle_timeout=settings.MAIL_IDLE_TIMEOUT
     )
 
     user_repository = providers.Factory(
-        UserRepository,
-        session_factory=db.provided.session,
+        AsyncUserRepository,
+        session_factory=db.provided.async_session,
+    )
+
+    login_service = providers.Factory(
+        LoginServiceImpl,
+        repository=user_repository,
+        redis=redis_pool,
+        registry=permission_registry,
+        hasher=password_hasher,
+        captcha_engine=captcha_engine
     )
 
     role_repository = providers.Factory(
-        RoleRepository,
-        session_factory=db.provided.session,
+        AsyncRoleRepository,
+        session_factory=db.provided.async_session,
     )
 
     user_service = providers.Factory(
-        UserServiceImpl,
-        repository=user_repository
+        AsyncUserServiceImpl,
+        repository=user_repository,
+        redis=redis_pool,
+        hasher=password_hasher
+    )
+
+    role_menu_cache = providers.Factory(
+        RoleMenuCache,
+        redis=redis_pool,
+        log_size=settings.ROLE_MENUS_LOG_SIZE
     )
 
     role_service = providers.Factory(
-        RoleServiceImpl,
-        repository=role_repository
+        AsyncRoleServiceImpl,
+        repository=role_repository,
+        cache=role_menu_cache
     )
 
+    menu_tree = providers.Singleton(MenuTree)
+
     menu_service = providers.Factory(
-        MenuServiceImpl,
+        AsyncMenuServiceImpl,
         crud=providers.Factory(
-            CRUDService,
+            AsyncCRUDService,
             model_class=SysMenu,
-            session_factory=db.provided.session
-        )
+            session_factory=db.provided.async_session
+        ),
+        tree=menu_tree,
+        redis=redis_pool
     )
@@ -2,17 +2,24 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/2/1 11:55
 # @Description   :
+import asyncio
+from threading import Lock
 from contextlib import contextmanager, asynccontextmanager
-from typing import Callable, ContextManager, AsyncContextManager, Any
+from typing import Callable, ContextManager, AsyncContextManager, Any, Dict, List, Optional
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.engine.base import Engine
 from sqlalchemy.orm import scoped_session, Session
 from sqlalchemy.ext.declarative import as_declarative
-from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, AsyncEngine, create_async_engine
 
 from stardew.common.utils import logger
+from stardew.common.utils.logger import intercept_logging
+from stardew.core.db.pool import (
+    MeteredQueuePool, MeteredAsyncAdaptedQueuePool, pool_status, log_slow_queries, record_statements
+)
 
 
 @as_declarative()
@@ -26,32 +33,127 @@ class Database:
     数据库会话支持
     """
 
-    def __init__(self, dsn: str) -> None:
+    def __init__(
+            self,
+            dsn: str,
+            async_dsn: Optional[str] = None,
+            echo: bool = False,
+            pool_size: int = 5,
+            max_overflow: int = 10,
+            pool_recycle: int = -1,
+            pool_pre_ping: bool = False,
+            pool_timeout: float = 30,
+            slow_query_ms: Optional[float] = None,
+            record_metrics: bool = True
+    ) -> None:
         """
         初始化数据库
         :param dsn: 连接URI。参考 https://docs.sqlalchemy.org/en/14/core/engines.html#database-urls
+        :param async_dsn: 异步引擎的连接URI，必须使用异步驱动(如 postgresql+asyncpg)。为空时使用dsn
+        :param echo: 是否输出执行的sql语句，经由loguru写入日志文件，开销较大，仅用于调试
+        :param pool_size: 连接池保持的连接数
+        :param max_overflow: 连接池满时允许额外创建的连接数
+        :param pool_recycle: 连接的最长存活秒数，-1表示不限制
+        :param pool_pre_ping: 取出连接时是否先检测连接可用
+        :param pool_timeout: 等待可用连接的最长秒数
+        :param slow_query_ms: 慢查询阈值(毫秒)，为空时不记录
+        :param record_metrics: 是否将sql语句的执行次数及耗时计入请求指标
         """
-        self._engine: Engine = create_engine(dsn, future=True, echo=True)
-        self._async_engine: AsyncEngine = create_async_engine(dsn, future=True, echo=True)
+        pool_options: Dict[str, Any] = dict(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            pool_timeout=pool_timeout,
+        )
+        if echo:
+            # 不使用sqlalchemy的echo(同步写标准输出)，转发到loguru由后台线程写入
+            intercept_logging("sqlalchemy.engine")
+        # 接口只使用异步引擎，同步引擎(及psycopg2)在首次使用时才创建，减少启动耗时
+        self._dsn: str = dsn
+        self._pool_kwargs: Dict[str, Any] = self._pool_options(dsn, MeteredQueuePool, pool_options)
+        self._slow_query_ms: Optional[float] = slow_query_ms
+        self._record_metrics: bool = record_metrics
+        self._engine: Optional[Engine] = None
+        self._engine_lock: Lock = Lock()
+        self._async_engine: AsyncEngine = create_async_engine(
+            async_dsn or dsn,
+            future=True,
+            **self._pool_options(async_dsn or dsn, MeteredAsyncAdaptedQueuePool, pool_options)
+        )
+        self._instrument(self._async_engine.sync_engine)
         self._session_factory = scoped_session(
             sessionmaker(
                 autocommit=False,
                 autoflush=False,
-                bind=self._engine,
             ),
         )
-        self._async_session_factory = scoped_session(
-            sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                class_=AsyncSession,
-                bind=self._async_engine,
-            ),
+        # 异步会话不能使用scoped_session: 同一线程内的所有协程会共享同一个会话。
+        # 每次进入async_session都创建新的会话，提交后不过期对象，以便会话关闭后继续读取属性
+        self._async_session_factory = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            expire_on_commit=False,
+            class_=AsyncSession,
+            bind=self._async_engine,
         )
 
+    def _instrument(self, engine: Engine) -> None:
+        """ 记录慢查询及请求指标 """
+        if self._slow_query_ms is not None:
+            log_slow_queries(engine, self._slow_query_ms)
+        if self._record_metrics:
+            record_statements(engine)
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    engine: Engine = create_engine(self._dsn, future=True, **self._pool_kwargs)
+                    self._instrument(engine)
+                    self._session_factory.configure(bind=engine)
+                    self._engine = engine
+        return self._engine
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        return self._async_engine
+
+    async def warmup(self, connections: int) -> None:
+        """
+        同时建立多个异步引擎的连接后放回连接池，避免首批请求等待建立连接
+        :param connections: 连接数，超过 pool_size 的部分放回时会被关闭
+        :return:
+        """
+        results: List[Any] = await asyncio.gather(
+            *(self._async_engine.connect().start() for _ in range(connections)),
+            return_exceptions=True
+        )
+        opened: List[AsyncConnection] = [result for result in results if isinstance(result, AsyncConnection)]
+        await asyncio.gather(*(connection.close() for connection in opened))
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """ 同步及异步引擎的连接池状态，同步引擎未创建时不包含sync """
+        stats: Dict[str, Dict[str, Any]] = {"async": pool_status(self._async_engine.sync_engine)}
+        if self._engine is not None:
+            stats["sync"] = pool_status(self._engine)
+        return stats
+
+    @staticmethod
+    def _pool_options(dsn: str, pool_class: type, options: Dict[str, Any]) -> Dict[str, Any]:
+        """ sqlite使用sqlalchemy默认的连接池，不支持以下参数 """
+        if make_url(dsn).get_backend_name() == "sqlite":
+            return {}
+        return dict(poolclass=pool_class, **options)
+
     @contextmanager
     def session(self) -> Callable[..., ContextManager[Session]]:
         """ sqlalchemy数据库会话上下文管理 """
+        self.engine  # 确保同步引擎已创建并绑定到会话工厂
         session: Session = self._session_factory()
         try:
             yield session
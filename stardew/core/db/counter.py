@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 19:05
+# @Description   : sql语句计数
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryCounter:
+    """
+    统计某段代码在引擎上执行的sql语句。
+    Example:
+        with QueryCounter(db.async_engine) as counter:
+            await repository.get_login_info(email=email)
+        assert counter.count == 1
+    """
+
+    def __init__(self, engine: Union[Engine, AsyncEngine]) -> None:
+        # 异步引擎的事件需要注册在其内部的同步引擎上
+        self.engine: Engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement)
+
+
+@contextmanager
+def assert_query_count(engine: Union[Engine, AsyncEngine], expected: int) -> Iterator[QueryCounter]:
+    """
+    断言代码块内执行的sql语句数量
+    :param engine: 数据库引擎
+    :param expected: 期望的语句数量
+    :return:
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+    assert counter.count == expected, \
+        f"expected {expected} statements, got {counter.count}:\n" + "\n".join(counter.statements)
@@ -3,16 +3,21 @@
 # @CreatedTime   : 2021/2/1 14:39
 # @Description   : 数据库增删改查
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Type, TypeVar, Union, Callable, AsyncContextManager, ContextManager
+from typing import Any, Dict, List, Optional, Sequence, Type, TypeVar, Union, Callable, AsyncContextManager, \
+    ContextManager, AsyncIterator
 
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy.engine.result import Result
+from sqlalchemy import Column
+from sqlalchemy.engine.result import Result, Row
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncResult
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy.sql import select, Select, insert, Insert, delete, Delete, update, Update, text, Executable
+from sqlalchemy.sql import select, Select, insert, Insert, delete, Delete, update, Update, Executable
 
 from stardew.core.db.base import Base
+from stardew.core.db.filters import apply_filters
+from stardew.core.db.pagination import keyset
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -23,18 +28,19 @@ class AbstractCRUDService(ABC):
     __slots__ = ("Model", "session_factory")
 
     @abstractmethod
-    def filter(self, *, where_clause: Dict) -> List[ModelType]:
+    def filter(self, *, where_clause: Dict, order_by: Optional[Sequence[str]] = None) -> List[ModelType]:
         """
-        自定义过滤条件
-        :param where_clause: 过滤条件
+        自定义过滤条件，格式参考 stardew.core.db.filters
+        :param where_clause: 过滤条件，如 {"perm": "sys:user:add", "order_num__ge": 1}
+        :param order_by: 排序列，列名前加 - 表示降序
         :return: 符合条件的对象列表
         """
 
     @abstractmethod
-    def get_by_id(self, *, identify: Any) -> Optional[ModelType]:
+    def get_by_id(self, *, identity: Any) -> Optional[ModelType]:
         """
         通过id进行查询
-        :param identify: 对象id
+        :param identity: 对象id
         :return:
         """
 
@@ -85,13 +91,10 @@ class CRUDService(AbstractCRUDService):
         self.Model = model_class
         self.session_factory = session_factory
 
-    def filter(self, *, where_clause: Dict) -> List[ModelType]:
+    def filter(self, *, where_clause: Dict, order_by: Optional[Sequence[str]] = None) -> List[ModelType]:
+        stmt: Select = apply_filters(select(self.Model), self.Model, where_clause, order_by)
         with self.session_factory() as session:
-            clauses: List = []
-            for k, v in where_clause.items():
-                clauses.append(f"{k} = '{v}'")
-            stmt: str = " AND ".join(clauses)
-            return session.query(self.Model).filter(text(stmt)).all()
+            return session.execute(stmt).scalars().all()
 
     def get_by_id(self, *, identity: Any) -> Optional[ModelType]:
         with self.session_factory() as session:
@@ -100,7 +103,7 @@ class CRUDService(AbstractCRUDService):
     def get_multi(self, *, page_no: int = 0, page_size: int = 100) -> List[ModelType]:
         offset: int = page_no * page_size
         with self.session_factory() as session:
-            return session.query(self.Model).offset(offset).limit(page_size).all()
+            return session.query(self.Model).order_by(self.Model.id).offset(offset).limit(page_size).all()
 
     def add(self, *, create_schema: Union[CreateSchemaType, Dict[str, Any]]) -> None:
         with self.session_factory() as session:
@@ -148,28 +151,36 @@ class AsyncCRUDService(AbstractCRUDService):
         self.Model = model_class
         self.session_factory = session_factory
 
-    async def get_by_id(self, *, identify: Any) -> Optional[ModelType]:
+    async def get_by_id(self, *, identity: Any) -> Optional[ModelType]:
         async with self.session_factory() as session:
-            return await session.get(entity=self.Model, ident=identify)
+            return await session.get(entity=self.Model, ident=identity)
 
-    async def filter(self, *, where_clause: Dict) -> List[ModelType]:
+    async def filter(self, *, where_clause: Dict, order_by: Optional[Sequence[str]] = None) -> List[ModelType]:
+        stmt: Select = apply_filters(select(self.Model), self.Model, where_clause, order_by)
         async with self.session_factory() as session:
-            clauses_stmt: List = []
-            for k, v in where_clause.items():
-                clauses_stmt.append(f"{k} = '{v}'")
-            where_stmt: str = " AND ".join(clauses_stmt)
-            stmt: Select = select(self.Model).where(text(where_stmt))
-            result: Result = session.execute(stmt)
-            return [x[0] for x in result.fetchall()]
+            result: Result = await session.execute(stmt)
+            return result.scalars().all()
 
     async def get_multi(self, *, page_no: int = 0, page_size: int = 100) -> List[ModelType]:
         async with self.session_factory() as session:
             offset: int = page_no * page_size
-            stmt: Select = select(self.Model).offset(offset).limit(page_size)
+            stmt: Select = select(self.Model).order_by(self.Model.id).offset(offset).limit(page_size)
             result: Result = await session.execute(stmt)
             # ORM模式下的select，其返回结果与Core模式不同
             # 具体信息，参考 https://docs.sqlalchemy.org/en/14/tutorial/data.html#selecting-orm-entities-and-columns
-            return [x[0] for x in result.fetchall()]
+            return result.scalars().all()
+
+    async def get_after(self, *, after: Optional[Any] = None, page_size: int = 100) -> List[ModelType]:
+        async with self.session_factory() as session:
+            result: Result = await session.execute(keyset(select(self.Model), self.Model.id, after, page_size))
+            return result.scalars().all()
+
+    async def stream(self, *, columns: Sequence[Column], chunk_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+        stmt: Select = select(*columns).order_by(self.Model.id)
+        async with self.session_factory() as session:
+            result: AsyncResult = await session.stream(stmt)
+            async for rows in result.partitions(chunk_size):
+                yield rows
 
     async def update(self, *, identity: Any, update_schema: Union[UpdateSchemaType, Dict[str, Any]]) -> None:
         async with self.session_factory() as session:
@@ -179,10 +190,13 @@ class AsyncCRUDService(AbstractCRUDService):
             await session.execute(stmt)
             await session.commit()
 
-    async def add(self, *, create_schema: CreateSchemaType) -> None:
+    async def add(self, *, create_schema: Union[CreateSchemaType, Dict[str, Any]]) -> None:
         async with self.session_factory() as session:
-            obj_in_data = jsonable_encoder(create_schema)
-            stmt: Insert = insert(self.Model).values(**obj_in_data)
+            if isinstance(create_schema, dict):
+                input_data = create_schema
+            else:
+                input_data = create_schema.dict(exclude_unset=True)
+            stmt: Insert = insert(self.Model).values(**input_data)
             await session.execute(stmt)
             await session.commit()
 
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 21:20
+# @Description   : 查询条件构造
+"""
+以字典描述查询条件，键为 列名 或 列名__操作符，例如:
+    {"status": 0, "order_num__ge": 1, "id__in": ["a", "b"], "name__like": "sys%"}
+排序以列名列表描述，列名前加 - 表示降序，例如: ["-order_num", "id"]
+
+所有条件都编译为绑定参数的表达式，语句结构只与键有关，与值无关，
+因此sqlalchemy的编译缓存和数据库的预编译语句都可以复用。
+"""
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, status
+from sqlalchemy import Column, and_
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+from stardew.core.db.base import Base
+
+_OPERATORS: Dict[str, Callable[[Column, Any], ColumnElement]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+    "in": lambda column, value: column.in_(value),
+    "between": lambda column, value: column.between(*value),
+    "like": lambda column, value: column.like(value),
+    "ilike": lambda column, value: column.ilike(value),
+    "isnull": lambda column, value: column.is_(None) if value else column.isnot(None),
+}
+
+# 值为多个元素的操作符
+_SEQUENCE_OPERATORS: Tuple[str, ...] = ("in", "between")
+
+# 布尔值可接受的写法(字符串不区分大小写)，查询参数中的 "false" 不能按 bool("false") 转换
+_BOOLEANS: Dict[Any, bool] = {"true": True, "1": True, 1: True, "false": False, "0": False, 0: False}
+
+
+def _bad_filter(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+@lru_cache(maxsize=1024)
+def _resolve(model: Type[Base], key: str) -> Tuple[Column, str, Optional[type]]:
+    """
+    解析条件键并校验列名及操作符，结果按 (模型, 键) 缓存
+    :param model: orm模型
+    :param key: 列名 或 列名__操作符
+    :return: (列, 操作符, 列对应的python类型)
+    """
+    name, _, op = key.partition("__")
+    op = op or "eq"
+    column: Optional[Column] = model.__table__.columns.get(name)
+    if column is None:
+        raise _bad_filter(f"不支持的查询字段: {name}")
+    if op not in _OPERATORS:
+        raise _bad_filter(f"不支持的查询操作: {op}")
+    try:
+        python_type: Optional[type] = column.type.python_type
+    except NotImplementedError:
+        python_type = None
+    return getattr(model, name), op, python_type
+
+
+def _parse_bool(key: str, value: Any) -> bool:
+    """ 解析布尔值，只接受 true/false/1/0，否则抛出400 """
+    if isinstance(value, bool):
+        return value
+    try:
+        return _BOOLEANS[value.lower() if isinstance(value, str) else value]
+    except (KeyError, TypeError):
+        raise _bad_filter(f"查询条件 {key} 的值类型错误")
+
+
+def _coerce(key: str, value: Any, python_type: Optional[type]) -> Any:
+    """ 将值转换为列对应的类型，无法转换时抛出400 """
+    if python_type is bool and value is not None:
+        return _parse_bool(key, value)
+    if value is None or python_type is None or isinstance(value, python_type):
+        return value
+    try:
+        return python_type(value)
+    except (TypeError, ValueError):
+        raise _bad_filter(f"查询条件 {key} 的值类型错误")
+
+
+def compile_filters(model: Type[Base], where_clause: Optional[Dict[str, Any]]) -> Optional[ColumnElement]:
+    """
+    将条件字典编译为where表达式
+    :param model: orm模型
+    :param where_clause: 查询条件
+    :return: 条件为空时返回None
+    """
+    if not where_clause:
+        return None
+    clauses: List[ColumnElement] = []
+    for key, value in where_clause.items():
+        column, op, python_type = _resolve(model, key)
+        if op in _SEQUENCE_OPERATORS:
+            if isinstance(value, (str, bytes)) or not isinstance(value, Sequence) \
+                    or (op == "between" and len(value) != 2):
+                raise _bad_filter(f"查询条件 {key} 的值类型错误")
+            value = [_coerce(key, item, python_type) for item in value]
+        elif op == "isnull":
+            value = _parse_bool(key, value)
+        else:
+            value = _coerce(key, value, python_type)
+        clauses.append(_OPERATORS[op](column, value))
+    return and_(*clauses)
+
+
+def compile_order_by(model: Type[Base], order_by: Optional[Sequence[str]]) -> List[ColumnElement]:
+    """
+    将排序列表编译为order by表达式
+    :param model: orm模型
+    :param order_by: 列名列表，列名前加 - 表示降序
+    :return:
+    """
+    orderings: List[ColumnElement] = []
+    for name in order_by or ():
+        column, _, _ = _resolve(model, name.lstrip("-"))
+        orderings.append(column.desc() if name.startswith("-") else column.asc())
+    return orderings
+
+
+def apply_filters(
+        stmt: Select,
+        model: Type[Base],
+        where_clause: Optional[Dict[str, Any]] = None,
+        order_by: Optional[Sequence[str]] = None
+) -> Select:
+    """
+    为查询追加过滤及排序条件
+    :param stmt: 查询语句
+    :param model: orm模型，用于校验列名
+    :param where_clause: 查询条件
+    :param order_by: 排序
+    :return:
+    """
+    criteria: Optional[ColumnElement] = compile_filters(model, where_clause)
+    if criteria is not None:
+        stmt = stmt.where(criteria)
+    orderings: List[ColumnElement] = compile_order_by(model, order_by)
+    if orderings:
+        stmt = stmt.order_by(*orderings)
+    return stmt
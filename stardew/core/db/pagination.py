@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 20:45
+# @Description   : 游标(keyset)分页
+import base64
+import binascii
+from typing import Any, List, Optional, Sequence, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def encode_cursor(key: Any) -> str:
+    """
+    将上一页最后一条数据的排序键编码为游标。客户端应将游标视为不透明字符串
+    :param key: 排序键
+    :return: 游标
+    """
+    return base64.urlsafe_b64encode(orjson.dumps([key])).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    解析游标，格式错误时抛出400。排序键均为字符串id，其他类型的值(数字、对象等)同样视为格式错误
+    :param cursor: 游标
+    :return: 排序键
+    """
+    try:
+        key: List = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        assert isinstance(key, list) and len(key) == 1 and isinstance(key[0], str)
+        return key[0]
+    except (binascii.Error, orjson.JSONDecodeError, AssertionError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+
+
+def keyset(stmt: Select, column: ColumnElement, after: Optional[Any], page_size: int) -> Select:
+    """
+    为查询追加keyset分页条件。多取一条用于判断是否还有下一页
+    :param stmt: 查询语句
+    :param column: 排序列，必须唯一且有索引
+    :param after: 上一页最后一条数据的排序键，为None时从头开始
+    :param page_size: 每页数据
+    :return:
+    """
+    if after is not None:
+        stmt = stmt.where(column > after)
+    return stmt.order_by(column).limit(page_size + 1)
+
+
+def split_page(rows: Sequence, page_size: int, key: str = "id") -> Tuple[List, Optional[str]]:
+    """
+    将keyset查询的结果拆分为当前页数据和下一页游标
+    :param rows: 查询结果，最多 page_size + 1 条
+    :param page_size: 每页数据
+    :param key: 排序键对应的属性名
+    :return: (当前页数据, 下一页游标，没有下一页时为None)
+    """
+    rows = list(rows)
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(getattr(rows[-1], key))
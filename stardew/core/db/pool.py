@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 23:00
+# @Description   : 连接池指标、慢查询日志及请求的sql统计
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from stardew.common.utils import logger
+from stardew.core.metrics import record_db
+
+
+class PoolMetrics:
+    """ 连接池运行指标 """
+
+    def __init__(self) -> None:
+        # 获取连接的次数及等待时间(秒)
+        self.checkouts: int = 0
+        self.wait_seconds: float = 0.0
+        self.wait_max_seconds: float = 0.0
+        # 超出pool_size后额外创建连接的次数
+        self.overflows: int = 0
+        # 等待连接超时的次数
+        self.timeouts: int = 0
+        # 慢查询次数
+        self.slow_queries: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "wait_avg_ms": round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max_seconds * 1000, 3),
+            "overflows": self.overflows,
+            "timeouts": self.timeouts,
+            "slow_queries": self.slow_queries,
+        }
+
+
+class _MeteredPoolMixin:
+    """ 统计从连接池获取连接的等待时间、溢出及超时 """
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start: float = time.perf_counter()
+        overflow: int = self._overflow
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        elapsed: float = time.perf_counter() - start
+        metrics: PoolMetrics = self.metrics
+        metrics.checkouts += 1
+        metrics.wait_seconds += elapsed
+        metrics.wait_max_seconds = max(metrics.wait_max_seconds, elapsed)
+        if self._overflow > overflow and self._overflow > 0:
+            metrics.overflows += 1
+        return connection
+
+    def recreate(self):
+        # engine.dispose()时会重建连接池，指标需要延续
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+
+class MeteredAsyncAdaptedQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """
+    连接池当前状态
+    :param engine: 同步引擎，异步引擎请传入 async_engine.sync_engine
+    :return:
+    """
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    metrics: PoolMetrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.to_dict())
+    return status
+
+
+def log_slow_queries(engine: Engine, threshold_ms: float) -> None:
+    """
+    记录执行时间超过阈值的sql语句
+    :param engine: 同步引擎，异步引擎请传入 async_engine.sync_engine
+    :param threshold_ms: 阈值(毫秒)
+    :return:
+    """
+    threshold: float = threshold_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        starts: List[float] = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed: float = time.perf_counter() - starts.pop()
+        if elapsed < threshold:
+            return
+        metrics: PoolMetrics = getattr(engine.pool, "metrics", None)
+        if metrics is not None:
+            metrics.slow_queries += 1
+        # 参数中可能包含密码等敏感信息，只记录语句
+        logger.warning(f"Slow query ({elapsed * 1000:.1f}ms): {statement}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context) -> None:
+        # 执行出错时不会触发after_cursor_execute
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
+
+
+def record_statements(engine: Engine) -> None:
+    """
+    将每条sql语句的执行时间计入当前请求的指标
+    :param engine: 同步引擎，异步引擎请传入 async_engine.sync_engine
+    :return:
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        # 开始时间记录在本次执行的上下文上，执行出错时随上下文一起丢弃
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        start: float = getattr(context, "_metrics_start", None)
+        if start is not None:
+            record_db(time.perf_counter() - start)
@@ -2,22 +2,22 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/2/9 21:53
 # @Description   :
-from typing import Union, List, Set, Dict, Optional, Callable, Coroutine
+from typing import Union, List, Dict, FrozenSet, Optional, Callable, Coroutine
 
-import orjson
-from jose import jwt
 from aioredis import Redis
 from pydantic import ValidationError
-from jose.constants import ALGORITHMS
+from jose import ExpiredSignatureError, JWTError
 from fastapi import Depends, HTTPException, status
 from dependency_injector.wiring import inject, Provide
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from stardew.settings import settings
 from stardew.common.enums import StatusEnum
-from stardew.common.constants import Constant
+from stardew.common.utils.tokens import token_verifier
+from stardew.core.session import SessionCache, SessionUser, read_session, refresh_session
+from stardew.core.permission import permission_registry
 from stardew.core.container import IocContainer as Container
-from stardew.core.web.schemas import TokenPayload, LoginUser
+from stardew.core.web.schemas import TokenPayload
 
 http_bearer = HTTPBearer(scheme_name=settings.JWT_PREFIX, auto_error=False)
 
@@ -25,11 +25,13 @@ http_bearer = HTTPBearer(scheme_name=settings.JWT_PREFIX, auto_error=False)
 @inject
 async def login_required(
         redis: Redis = Depends(Provide[Container.redis_pool]),
+        session_cache: SessionCache = Depends(Provide[Container.session_cache]),
         authorization_credentials: Optional[HTTPAuthorizationCredentials] = Depends(http_bearer)
-) -> LoginUser:
+) -> SessionUser:
     """
     登录校验
     :param redis: redis客户端， 通常为 `aioredis.commands.Redis` 实例
+    :param session_cache: 登录会话的进程内缓存，命中时不再访问redis
     :param authorization_credentials: 身份凭证
     :return: 当前登录者的信息
     """
@@ -39,37 +41,39 @@ async def login_required(
             detail="请先登录",
         )
     try:
-        payload: Dict = jwt.decode(
-            token=authorization_credentials.credentials,
-            key=settings.SECRET_KEY,
-            algorithms=ALGORITHMS.HS256
-        )
+        # 与 SecurityUtil.parse_token 共用同一个校验器，已校验过的token直接命中缓存
+        payload: Dict = token_verifier.verify(authorization_credentials.credentials)
         token_data = TokenPayload(sub=payload["sub"])
-    except jwt.ExpiredSignatureError:
+    except ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="登录信息已过期，请重新登录",
         )
-    except (jwt.JWTError, ValidationError):
+    except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="无效的身份信息",
         )
-    redis_key: str = Constant.LOGIN_REDIS_KEY + token_data.sub
-    redis_value: str = await redis.get(redis_key)
-
-    if not redis_value:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="登录信息已过期，请重新登录。")
-
-    info: Dict = orjson.loads(redis_value)
-    login_user: LoginUser = LoginUser(**info)
-
-    if not login_user.sys_user.status == StatusEnum.enable:
+    login_user: Optional[SessionUser] = session_cache.get(token_data.sub)
+    if login_user is None:
+        login_user = await read_session(redis, token_data.sub)
+        if login_user is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="登录信息已过期，请重新登录。")
+        session_cache.set(token_data.sub, login_user)
+    if login_user.perm_generation != permission_registry.generation:
+        # 权限注册表在redis中重建后编号已变化，旧的权限位图不再可信
+        await permission_registry.refresh(redis)
+        if login_user.perm_generation != permission_registry.generation:
+            session_cache.invalidate_session(token_data.sub)
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="登录信息已过期，请重新登录。")
+
+    if not login_user.status == StatusEnum.enable:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="当前用户不可用，请联系管理员。")
+    await refresh_session(redis, login_user, payload["exp"])
     return login_user
 
 
-def role_required(key: Union[str, List[str]]) -> Callable[[LoginUser], Coroutine[None, None, LoginUser]]:
+def role_required(key: Union[str, List[str]]) -> Callable[[SessionUser], Coroutine[None, None, SessionUser]]:
     """
     角色校验。若当前登录者的角色(roles)属性中包含所需角色则视为通过校验。
     Example:
@@ -88,19 +92,19 @@ def role_required(key: Union[str, List[str]]) -> Callable[[LoginUser], Coroutine
     :return: 校验通过则返回当前登录者信息，否则抛出403异常
     """
 
-    async def wrapper(current_user: LoginUser = Depends(login_required)) -> LoginUser:
-        roles: Set[str] = current_user.roles
-        key_set: Set = set(tuple(key)) if isinstance(key, str) else set(key)
-        if not set(key_set).issubset(roles) and current_user.sys_user.is_super:
+    key_set: FrozenSet[str] = frozenset((key,) if isinstance(key, str) else key)
+
+    async def wrapper(current_user: SessionUser = Depends(login_required)) -> SessionUser:
+        if not key_set.issubset(current_user.roles) and not current_user.is_super:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="权限不足，请联系管理员")
         return current_user
 
     return wrapper
 
 
-def permission_required(key: str) -> Callable[[LoginUser], Coroutine[None, None, LoginUser]]:
+def permission_required(key: str) -> Callable[[SessionUser], Coroutine[None, None, SessionUser]]:
     """
-    权限校验。若当前登录者的权限(perms)属性中包含所需角色则视为通过校验。
+    权限校验。若当前登录者的权限位图(perm_mask)中包含所需权限则视为通过校验。
     Example:
         1: 在具体逻辑中不需要使用到登录者具体信息时，可以放在路由装饰器的dependencies参数中:
             @some_router.get(
@@ -117,9 +121,11 @@ def permission_required(key: str) -> Callable[[LoginUser], Coroutine[None, None,
     :return: 校验通过则返回当前登录者信息，否则抛出403异常
     """
 
-    async def wrapper(current_user: LoginUser = Depends(login_required)) -> LoginUser:
-        permissions: Set[str] = current_user.perms
-        if key not in permissions and not current_user.sys_user.is_super:
+    # 权限在应用启动时统一注册，之后每次校验只需一次按位与
+    permission_registry.require(key)
+
+    async def wrapper(current_user: SessionUser = Depends(login_required)) -> SessionUser:
+        if not current_user.has_perm(permission_registry.mask_of(key)) and not current_user.is_super:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="权限不足，请联系管理员")
         return current_user
 
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 00:10
+# @Description   : 流式导出
+"""
+数据库端使用服务端游标分批读取，每批直接编码为字节写入响应，不构造orm对象和pydantic对象，
+内存占用只与每批的行数有关，与表的大小无关。支持两种格式:
+    ndjson: 每行一个json对象
+    csv   : 第一行为表头，utf-8编码并带BOM，便于excel直接打开
+"""
+import io
+import csv
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Sequence, Tuple, Type
+
+import orjson
+from pydantic import BaseModel
+from sqlalchemy import Column
+
+from stardew.core.db.base import Base
+
+FORMAT_NDJSON: str = "ndjson"
+FORMAT_CSV: str = "csv"
+
+MEDIA_TYPES: Dict[str, str] = {
+    FORMAT_NDJSON: "application/x-ndjson",
+    FORMAT_CSV: "text/csv",
+}
+
+
+def schema_columns(model: Type[Base], schema: Type[BaseModel]) -> List[Column]:
+    """
+    schema中字段对应的列，导出的字段与列表接口保持一致
+    :param model: orm模型
+    :param schema: 序列化schema，如 UserSimpleSchema
+    :return:
+    """
+    columns = model.__table__.columns
+    return [columns[name] for name in schema.__fields__ if name in columns]
+
+
+def encode_ndjson(names: Sequence[str], rows: Sequence[Sequence[Any]]) -> bytes:
+    """ 将一批数据编码为ndjson """
+    return b"".join(orjson.dumps(dict(zip(names, row))) + b"\n" for row in rows)
+
+
+def encode_csv(rows: Sequence[Sequence[Any]]) -> bytes:
+    """ 将一批数据编码为csv """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def encode_stream(
+        fmt: str,
+        names: Sequence[str],
+        partitions: AsyncIterable[Sequence[Sequence[Any]]]
+) -> AsyncIterator[bytes]:
+    """
+    将分批读取的数据编码为响应内容，每批数据对应一个数据块
+    :param fmt: ndjson 或 csv
+    :param names: 字段名
+    :param partitions: 分批读取的数据
+    :return:
+    """
+    if fmt == FORMAT_CSV:
+        yield "\ufeff".encode() + encode_csv([names])
+        async for rows in partitions:
+            yield encode_csv(rows)
+    else:
+        async for rows in partitions:
+            yield encode_ndjson(names, rows)
+
+
+def export_headers(fmt: str, name: str) -> Tuple[str, Dict[str, str]]:
+    """
+    导出响应的媒体类型及响应头
+    :param fmt: ndjson 或 csv
+    :param name: 下载的文件名(不含扩展名)
+    :return: (媒体类型, 响应头)
+    """
+    return MEDIA_TYPES[fmt], {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 19:40
+# @Description   : 在线程池/进程池中执行密码哈希
+import os
+import time
+import asyncio
+from typing import AsyncIterator, Iterable, List, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from stardew.common.utils import SecurityUtil
+from stardew.core.metrics import record_hash
+
+
+class PasswordHasher:
+    """
+    bcrypt每次计算需要上百毫秒的cpu时间，直接在协程中调用会阻塞整个事件循环。
+    此类将计算提交到执行器中，并限制等待中的任务数量: 超出时调用方排队，排队超时返回503。
+    """
+
+    def __init__(self, executor: Executor, max_pending: int = 64, timeout: Optional[float] = 10) -> None:
+        """
+        :param executor: 执行哈希计算的线程池或进程池
+        :param max_pending: 同时提交到执行器的最大任务数
+        :param timeout: 排队等待的最长秒数，为None时一直等待
+        """
+        self.executor = executor
+        self.max_pending = max_pending
+        self.timeout = timeout
+        # 当前已提交到执行器的任务数
+        self.pending: int = 0
+        # 信号量需要在事件循环中创建
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def hash(self, password: str) -> str:
+        """ 生成哈希密码 """
+        return await self._submit(SecurityUtil.generate_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """ 校验密码 """
+        return await self._submit(SecurityUtil.verify_password, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: Iterable[str], concurrency: Optional[int] = None) -> List[str]:
+        """
+        并行生成多个哈希密码，结果顺序与输入一致
+        :param passwords: 明文密码
+        :param concurrency: 同时提交的任务数，默认为 max_pending 的一半，批量任务不会占满名额导致登录等请求排队超时
+        :return:
+        """
+        passwords = list(passwords)
+        size: int = concurrency or max(1, self.max_pending // 2)
+        hashed: List[str] = []
+        for start in range(0, len(passwords), size):
+            hashed.extend(await asyncio.gather(*[self.hash(password) for password in passwords[start:start + size]]))
+        return hashed
+
+    async def _submit(self, func, *args):
+        # 排队及计算的时间都计入当前请求的指标
+        start: float = time.perf_counter()
+        try:
+            return await self._run(func, *args)
+        finally:
+            record_hash(time.perf_counter() - start)
+
+    async def _run(self, func, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="系统繁忙，请稍后重试")
+        self.pending += 1
+        try:
+            return await asyncio.get_event_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            self._semaphore.release()
+
+
+async def init_password_hasher(
+        executor_type: str = "thread",
+        workers: Optional[int] = None,
+        max_pending: int = 64,
+        timeout: Optional[float] = 10
+) -> AsyncIterator[PasswordHasher]:
+    """
+    创建密码哈希执行器
+    :param executor_type: thread 或 process。bcrypt计算时会释放GIL，线程池即可利用多核
+    :param workers: 工作线程/进程数，为空时使用cpu核数
+    :param max_pending: 同时提交到执行器的最大任务数
+    :param timeout: 排队等待的最长秒数
+    :return:
+    """
+    workers = workers or os.cpu_count() or 1
+    executor: Executor = ProcessPoolExecutor(max_workers=workers) if executor_type == "process" \
+        else ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+    try:
+        yield PasswordHasher(executor, max_pending=max_pending, timeout=timeout)
+    finally:
+        executor.shutdown(wait=True)
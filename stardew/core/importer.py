@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 23:20
+# @Description   : 批量导入数据的流式解析
+"""
+请求体按块读取，逐行解析为记录，不需要将整个文件读入内存。支持两种格式:
+    jsonl: 每行一个json对象
+    csv  : 第一行为表头，多值字段(如角色id列表)以 ; 分隔
+
+解析失败的行不会中断导入，以 error 的形式出现在结果中，由调用方写入导入报告。
+"""
+import csv
+import codecs
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import orjson
+
+FORMAT_JSONL: str = "jsonl"
+FORMAT_CSV: str = "csv"
+FORMATS: Tuple[str, ...] = (FORMAT_JSONL, FORMAT_CSV)
+
+# csv中以分隔符拆分为列表的字段
+CSV_LIST_SEPARATOR: str = ";"
+
+
+class ImportRecord(NamedTuple):
+    """ 一条待导入的记录 """
+    # 记录在文件中的行号(csv表头为第1行)
+    line: int
+    # 解析后的数据，解析失败时为None
+    data: Optional[Dict[str, Any]]
+    # 解析失败的原因
+    error: Optional[str] = None
+
+
+class RecordParser:
+    """
+    增量解析器，每次喂入一块数据，返回其中已完整的记录。
+    csv中带引号的字段可以包含换行，引号未闭合时会等待后续数据。
+    """
+
+    def __init__(self, fmt: str, list_fields: Iterable[str] = ()) -> None:
+        """
+        :param fmt: jsonl 或 csv
+        :param list_fields: csv中需要拆分为列表的字段
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"unsupported format: {fmt}")
+        self.fmt = fmt
+        self.list_fields = frozenset(list_fields)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer: str = ""
+        # 当前行号，以及csv中跨行记录的起始行号
+        self._line: int = 0
+        self._pending: List[str] = []
+        self._pending_line: int = 0
+        self._header: Optional[List[str]] = None
+
+    def feed(self, chunk: bytes) -> List[ImportRecord]:
+        """ 喂入一块数据 """
+        self._buffer += self._decoder.decode(chunk)
+        *lines, self._buffer = self._buffer.split("\n")
+        return self._parse_lines(lines)
+
+    def close(self) -> List[ImportRecord]:
+        """ 数据结束，解析剩余内容 """
+        self._buffer += self._decoder.decode(b"", final=True)
+        lines: List[str] = [self._buffer] if self._buffer else []
+        self._buffer = ""
+        records: List[ImportRecord] = self._parse_lines(lines)
+        if self._pending:
+            records.append(ImportRecord(self._pending_line, None, "引号未闭合"))
+            self._pending = []
+        return records
+
+    def _parse_lines(self, lines: List[str]) -> List[ImportRecord]:
+        records: List[ImportRecord] = []
+        for line in lines:
+            self._line += 1
+            record: Optional[ImportRecord] = (
+                self._parse_json(line.rstrip("\r")) if self.fmt == FORMAT_JSONL else self._parse_csv(line)
+            )
+            if record is not None:
+                records.append(record)
+        return records
+
+    def _parse_json(self, line: str) -> Optional[ImportRecord]:
+        if not line.strip():
+            return None
+        try:
+            data: Any = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            return ImportRecord(self._line, None, "json格式错误")
+        if not isinstance(data, dict):
+            return ImportRecord(self._line, None, "每行应为一个json对象")
+        return ImportRecord(self._line, data)
+
+    def _parse_csv(self, line: str) -> Optional[ImportRecord]:
+        if not self._pending:
+            if not line.strip():
+                return None
+            self._pending_line = self._line
+        self._pending.append(line)
+        text: str = "\n".join(self._pending)
+        # 引号数为奇数说明某个字段中包含换行，记录尚未结束
+        if text.count('"') % 2:
+            return None
+        self._pending = []
+        try:
+            values: List[str] = next(csv.reader([text]))
+        except csv.Error:
+            return ImportRecord(self._pending_line, None, "csv格式错误")
+        values = [value.rstrip("\r") for value in values]
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self._header):
+            return ImportRecord(self._pending_line, None, "字段数与表头不一致")
+        data: Dict[str, Any] = {}
+        for name, value in zip(self._header, values):
+            # 空字段视为未填写，使用默认值
+            if value == "":
+                continue
+            if name in self.list_fields:
+                data[name] = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+            else:
+                data[name] = value
+        return ImportRecord(self._pending_line, data)
+
+
+async def parse_records(
+        stream: AsyncIterable[bytes],
+        fmt: str,
+        list_fields: Iterable[str] = ()
+) -> AsyncIterator[ImportRecord]:
+    """
+    流式解析请求体
+    :param stream: 数据块，如 request.stream()
+    :param fmt: jsonl 或 csv
+    :param list_fields: csv中需要拆分为列表的字段
+    :return:
+    """
+    parser = RecordParser(fmt, list_fields)
+    async for chunk in stream:
+        for record in parser.feed(chunk):
+            yield record
+    for record in parser.close():
+        yield record
+
+
+def guess_format(content_type: Optional[str]) -> str:
+    """ 根据Content-Type判断格式，默认为jsonl """
+    if content_type and "csv" in content_type.lower():
+        return FORMAT_CSV
+    return FORMAT_JSONL
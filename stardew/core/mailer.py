@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 03:50
+# @Description   : 后台邮件发送队列
+import time
+import random
+import asyncio
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Set
+
+from stardew.common.utils import logger, EmailUtil
+
+
+class MailJob:
+
+    """ 一次SMTP事务: 一封邮件及一批收件人 """
+
+    __slots__ = ("sender", "receivers", "message", "attempts")
+
+    def __init__(self, sender: str, receivers: List[str], message: str) -> None:
+        self.sender = sender
+        self.receivers = receivers
+        self.message = message
+        self.attempts: int = 0
+
+
+def _is_transient(e: Exception) -> bool:
+    """ 断线、网络错误及4xx响应可以重试，5xx(如收件人不存在、认证失败)重试也不会成功 """
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in e.recipients.values())
+    if isinstance(e, smtplib.SMTPResponseException) and not isinstance(e, smtplib.SMTPConnectError):
+        return 400 <= e.smtp_code < 500
+    return isinstance(e, (smtplib.SMTPException, OSError))
+
+
+class Mailer:
+    """
+    邮件发送队列。
+    请求只负责入队，后台的 connections 个发送任务各自持有一个已登录的SMTP连接，在多封邮件间复用，
+    连接断开时自动重连，空闲超过 idle_timeout 后断开。smtplib是阻塞的，连接上的操作都在线程池中执行，
+    每个连接同一时刻只被一个发送任务使用。
+    临时性失败按指数退避重试，重试期间不占用发送任务。
+    """
+
+    def __init__(
+            self,
+            connect: Callable[[], smtplib.SMTP],
+            sender: str,
+            connections: int = 2,
+            queue_size: int = 10000,
+            batch_size: int = 50,
+            max_retries: int = 3,
+            retry_backoff: float = 1.0,
+            idle_timeout: float = 60
+    ) -> None:
+        """
+        :param connect: 创建并登录SMTP连接，在线程池中调用
+        :param sender: 发件人地址(MAIL FROM)
+        :param connections: 连接数，即并行的发送任务数
+        :param queue_size: 队列容量
+        :param batch_size: 每次SMTP事务的最大收件人数
+        :param max_retries: 临时性失败的最大重试次数
+        :param retry_backoff: 首次重试的等待秒数，之后每次翻倍
+        :param idle_timeout: 连接空闲超过此秒数后断开
+        """
+        self.connect = connect
+        self.sender = sender
+        self.connections = connections
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        # 发送成功、最终失败、重试的次数，建立连接的次数
+        self.sent: int = 0
+        self.failed: int = 0
+        self.retried: int = 0
+        self.connects: int = 0
+        # 成功发送的累计耗时及最大耗时(秒)，从入队开始计算的累计等待时间
+        self.send_seconds: float = 0.0
+        self.send_max_seconds: float = 0.0
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="mailer")
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: Set[asyncio.Task] = set()
+        self._busy: int = 0
+        # 各发送任务当前持有的连接
+        self._smtps: List[Optional[smtplib.SMTP]] = [None] * connections
+
+    def start(self) -> None:
+        """ 启动发送任务 """
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.ensure_future(self._work(index)) for index in range(self.connections)]
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        停止发送任务，关闭所有连接
+        :param timeout: 等待队列中剩余邮件及退避中的重试发送完毕的秒数，为None时不等待。
+            超时后仍在等待重试的邮件记为失败
+        :return:
+        """
+        if timeout and self._queue is not None:
+            try:
+                await asyncio.wait_for(self._drain(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Mailer stopped with {self._queue.qsize()} mails unsent and {len(self._retries)} pending retry"
+                )
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        self.executor.shutdown(wait=True)
+
+    async def send(
+            self,
+            *,
+            subject: str,
+            html_content: str,
+            receivers: Sequence[str],
+            sender_alias: Optional[str] = None
+    ) -> int:
+        """
+        邮件入队，不等待发送。收件人按 batch_size 拆分，每批单独成为一封邮件
+        :param subject: 邮件主题
+        :param html_content: 已经渲染好的html文本
+        :param receivers: 接收者
+        :param sender_alias: 发送者昵称
+        :return: 入队的邮件数
+        """
+        receivers = list(receivers)
+        batches: List[List[str]] = [
+            receivers[i:i + self.batch_size] for i in range(0, len(receivers), self.batch_size)
+        ]
+        for batch in batches:
+            message: str = EmailUtil.build_message(
+                subject=subject, html_content=html_content, receivers=batch, sender_alias=sender_alias
+            ).as_string()
+            await self._queue.put((time.perf_counter(), MailJob(self.sender, batch, message)))
+        return len(batches)
+
+    def stats(self) -> Dict[str, float]:
+        """ 队列深度、连接数及发送耗时 """
+        return {
+            "queue_depth": 0 if self._queue is None else self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "sending": self._busy,
+            "retrying": len(self._retries),
+            "connections": sum(smtp is not None for smtp in self._smtps),
+            "connects": self.connects,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "send_avg_ms": round(self.send_seconds / self.sent * 1000, 2) if self.sent else 0.0,
+            "send_max_ms": round(self.send_max_seconds * 1000, 2),
+        }
+
+    async def _work(self, index: int) -> None:
+        """
+        发送任务，持有一个SMTP连接
+        :param index: 任务序号，对应 _smtps 中的连接
+        :return:
+        """
+        loop = asyncio.get_event_loop()
+        try:
+            while True:
+                smtp: Optional[smtplib.SMTP] = self._smtps[index]
+                try:
+                    enqueued_at, job = await asyncio.wait_for(
+                        self._queue.get(), None if smtp is None else self.idle_timeout
+                    )
+                except asyncio.TimeoutError:
+                    self._smtps[index] = None
+                    await loop.run_in_executor(self.executor, self._close, smtp)
+                    continue
+                self._busy += 1
+                try:
+                    self._smtps[index] = await loop.run_in_executor(self.executor, self._deliver, smtp, job)
+                except Exception as e:
+                    self._smtps[index] = None
+                    self._handle_failure(job, e)
+                else:
+                    if self._smtps[index] is not smtp:
+                        self.connects += 1
+                    elapsed: float = time.perf_counter() - enqueued_at
+                    self.sent += 1
+                    self.send_seconds += elapsed
+                    self.send_max_seconds = max(self.send_max_seconds, elapsed)
+                finally:
+                    self._busy -= 1
+                    self._queue.task_done()
+        finally:
+            smtp = self._smtps[index]
+            if smtp is not None:
+                self._smtps[index] = None
+                await loop.run_in_executor(self.executor, self._close, smtp)
+
+    def _deliver(self, smtp: Optional[smtplib.SMTP], job: MailJob) -> smtplib.SMTP:
+        """
+        在线程池中发送一封邮件。复用的连接已被服务器断开时重连一次，不计入重试
+        :param smtp: 当前持有的连接
+        :param job: 待发送的邮件
+        :return: 发送后可继续使用的连接
+        """
+        if smtp is not None:
+            try:
+                self._sendmail(smtp, job)
+                return smtp
+            except smtplib.SMTPServerDisconnected:
+                self._close(smtp)
+            except Exception:
+                self._close(smtp)
+                raise
+        smtp = self.connect()
+        try:
+            self._sendmail(smtp, job)
+        except Exception:
+            self._close(smtp)
+            raise
+        return smtp
+
+    @staticmethod
+    def _sendmail(smtp: smtplib.SMTP, job: MailJob) -> None:
+        refused: Dict = smtp.sendmail(job.sender, job.receivers, job.message)
+        if refused:
+            logger.warning(f"Mail refused by some recipients: {refused}")
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _handle_failure(self, job: MailJob, e: Exception) -> None:
+        """ 临时性失败按指数退避(带随机抖动)重新入队，否则记为失败 """
+        job.attempts += 1
+        if not _is_transient(e) or job.attempts > self.max_retries:
+            self.failed += 1
+            logger.error(f"Failed to send mail to {job.receivers} after {job.attempts} attempts: {e!r}")
+            return
+        self.retried += 1
+        delay: float = self.retry_backoff * 2 ** (job.attempts - 1) * random.uniform(0.5, 1.5)
+        task: asyncio.Task = asyncio.ensure_future(self._retry(job, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _retry(self, job: MailJob, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+            await self._queue.put((time.perf_counter(), job))
+        except asyncio.CancelledError:
+            # 停止时仍在等待重试
+            self.failed += 1
+            logger.error(f"Dropped mail to {job.receivers} pending retry after {job.attempts} attempts")
+            raise
+
+    async def _drain(self) -> None:
+        """ 等待队列及退避中的重试全部完成。重试重新入队，再次失败时又会产生新的重试 """
+        while True:
+            await self._queue.join()
+            if not self._retries:
+                return
+            await asyncio.gather(*self._retries, return_exceptions=True)
+
+
+async def init_mailer(
+        sender: str,
+        connections: int = 2,
+        queue_size: int = 10000,
+        batch_size: int = 50,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        idle_timeout: float = 60,
+        drain_timeout: float = 10
+) -> AsyncIterator[Mailer]:
+    """
+    创建邮件发送队列，连接在第一封邮件发送时才建立
+    :param sender: 发件人地址
+    :param connections: 连接数
+    :param queue_size: 队列容量
+    :param batch_size: 每次SMTP事务的最大收件人数
+    :param max_retries: 最大重试次数
+    :param retry_backoff: 首次重试的等待秒数
+    :param idle_timeout: 连接空闲超时秒数
+    :param drain_timeout: 关闭时等待剩余邮件发送的秒数
+    :return:
+    """
+    mailer: Mailer = Mailer(
+        EmailUtil.connect, sender, connections=connections, queue_size=queue_size, batch_size=batch_size,
+        max_retries=max_retries, retry_backoff=retry_backoff, idle_timeout=idle_timeout
+    )
+    mailer.start()
+    try:
+        yield mailer
+    finally:
+        await mailer.stop(timeout=drain_timeout)
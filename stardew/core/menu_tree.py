@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 22:00
+# @Description   : 菜单树的进程内缓存
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+# (id, 名称, 父菜单id, 显示顺序)
+MenuRow = Tuple[str, str, Optional[str], int]
+
+
+class MenuTree:
+    """
+    菜单树缓存。
+    通过 父菜单id -> 子菜单id列表 的索引在O(n)时间内由全表数据构建，序列化后的结果缓存到下一次变更。
+    菜单增删改时直接修改索引，不必重新查询数据库。
+    version 与redis中的版本号对应，其他进程修改菜单后版本号不一致，读取时会重新加载。
+    """
+
+    def __init__(self, root: str = "0") -> None:
+        """
+        :param root: 顶级菜单的父菜单id
+        """
+        self.root = root
+        # 尚未加载时为-1
+        self.version: int = -1
+        self._nodes: Dict[str, Tuple[str, Optional[str], int]] = {}
+        self._children: Dict[str, List[str]] = {}
+        self._dumped: Optional[bytes] = None
+        # 锁需要在事件循环中创建
+        self._lock: Optional[asyncio.Lock] = None
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """ 重新加载时使用，避免并发请求同时查询数据库 """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def load(self, rows: Iterable[MenuRow], version: int) -> None:
+        """
+        以全表数据重建索引
+        :param rows: 菜单数据
+        :param version: 数据对应的版本号
+        :return:
+        """
+        self._nodes = {}
+        self._children = {}
+        for identity, name, parent_id, order_num in rows:
+            self._nodes[identity] = (name, parent_id, order_num)
+            self._children.setdefault(parent_id, []).append(identity)
+        for siblings in self._children.values():
+            siblings.sort(key=self._sort_key)
+        self._dumped = None
+        self.version = version
+
+    def put(self, identity: str, name: str, parent_id: Optional[str], order_num: int) -> None:
+        """ 新增或修改一个菜单 """
+        if identity in self._nodes:
+            self._detach(identity)
+        self._nodes[identity] = (name, parent_id, order_num)
+        siblings: List[str] = self._children.setdefault(parent_id, [])
+        siblings.append(identity)
+        siblings.sort(key=self._sort_key)
+        self._dumped = None
+
+    def remove(self, identity: str) -> None:
+        """ 删除一个菜单及其所有子菜单(与数据库的级联删除一致) """
+        if identity not in self._nodes:
+            return
+        self._detach(identity)
+        stack: List[str] = [identity]
+        while stack:
+            current: str = stack.pop()
+            self._nodes.pop(current, None)
+            stack.extend(self._children.pop(current, []))
+        self._dumped = None
+
+    def tree(self) -> List[Dict[str, Any]]:
+        """ 树结构，字段与 TreeNode 按别名序列化后一致 """
+        return [self._build(identity) for identity in self._children.get(self.root, [])]
+
+    def dumps(self) -> bytes:
+        """ 序列化后的树结构，结果缓存到下一次变更 """
+        if self._dumped is None:
+            self._dumped = orjson.dumps(self.tree())
+        return self._dumped
+
+    def _build(self, identity: str) -> Dict[str, Any]:
+        return {
+            "id": identity,
+            "name": self._nodes[identity][0],
+            "children": [self._build(child) for child in self._children.get(identity, [])],
+        }
+
+    def _detach(self, identity: str) -> None:
+        """ 从原父菜单的子菜单列表中移除 """
+        siblings: List[str] = self._children.get(self._nodes[identity][1], [])
+        if identity in siblings:
+            siblings.remove(identity)
+
+    def _sort_key(self, identity: str) -> Tuple[int, str]:
+        return self._nodes[identity][2], identity
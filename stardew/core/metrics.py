@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 06:10
+# @Description   : 请求级别的性能指标
+"""
+每个请求开始时从对象池中取出一个 RequestSample 放入上下文变量，数据库、redis、密码哈希、验证码渲染
+在执行时把耗时/次数累加到当前请求的 RequestSample 上(不在请求中时直接忽略)，请求结束后汇总到路由的
+RouteMetrics 并放回对象池。路由的计数器和直方图在启动时按路由表预先创建，请求过程中不创建新的指标对象。
+导出时生成Prometheus文本格式。
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from stardew.settings import settings
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestSample:
+
+    """ 一个请求执行期间的累计值，对象在请求间复用 """
+
+    __slots__ = (
+        "status", "db_statements", "db_seconds", "redis_round_trips", "hash_seconds", "captcha_seconds",
+        "send", "forward"
+    )
+
+    def __init__(self) -> None:
+        self.reset()
+        self.send: Optional[Send] = None
+        # 预先绑定，每个请求不需要再创建包装send的闭包
+        self.forward: Callable[[Message], Any] = self._forward
+
+    def reset(self) -> None:
+        self.status: int = 500
+        self.db_statements: int = 0
+        self.db_seconds: float = 0.0
+        self.redis_round_trips: int = 0
+        self.hash_seconds: float = 0.0
+        self.captcha_seconds: float = 0.0
+
+    async def _forward(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        await self.send(message)
+
+
+_current_sample: ContextVar[Optional[RequestSample]] = ContextVar("request_sample", default=None)
+
+
+def record_db(seconds: float) -> None:
+    """ 当前请求执行了一条sql语句 """
+    sample: Optional[RequestSample] = _current_sample.get()
+    if sample is not None:
+        sample.db_statements += 1
+        sample.db_seconds += seconds
+
+
+def record_redis() -> None:
+    """ 当前请求与redis进行了一次往返 """
+    sample: Optional[RequestSample] = _current_sample.get()
+    if sample is not None:
+        sample.redis_round_trips += 1
+
+
+def record_hash(seconds: float) -> None:
+    """ 当前请求等待密码哈希的时间 """
+    sample: Optional[RequestSample] = _current_sample.get()
+    if sample is not None:
+        sample.hash_seconds += seconds
+
+
+def record_captcha(seconds: float) -> None:
+    """ 当前请求等待验证码渲染的时间(未命中预渲染池) """
+    sample: Optional[RequestSample] = _current_sample.get()
+    if sample is not None:
+        sample.captcha_seconds += seconds
+
+
+class RouteMetrics:
+
+    """ 单个路由的指标 """
+
+    __slots__ = (
+        "method", "path", "count", "bucket_counts", "latency_sum", "statuses",
+        "db_statements", "db_seconds", "redis_round_trips", "hash_seconds", "captcha_seconds"
+    )
+
+    def __init__(self, method: str, path: str, buckets: int) -> None:
+        self.method = method
+        self.path = path
+        self.count: int = 0
+        # 每个桶单独计数(最后一个为 +Inf)，导出时再累加
+        self.bucket_counts: List[int] = [0] * (buckets + 1)
+        self.latency_sum: float = 0.0
+        self.statuses: Dict[int, int] = {}
+        self.db_statements: int = 0
+        self.db_seconds: float = 0.0
+        self.redis_round_trips: int = 0
+        self.hash_seconds: float = 0.0
+        self.captcha_seconds: float = 0.0
+
+
+class RequestMetrics:
+
+    """ 所有路由的指标 """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self.in_flight: int = 0
+        # endpoint -> RouteMetrics，未匹配任何路由的请求(404等)计入 unmatched
+        self._routes: Dict[Callable, RouteMetrics] = {}
+        self.unmatched: RouteMetrics = RouteMetrics("", "<unmatched>", len(self.buckets))
+        self._samples: List[RequestSample] = []
+
+    def register_routes(self, routes: Iterable[Any]) -> None:
+        """ 按路由表创建各路由的指标 """
+        for route in routes:
+            endpoint: Optional[Callable] = getattr(route, "endpoint", None)
+            methods = getattr(route, "methods", None)
+            if endpoint is None or endpoint in self._routes:
+                continue
+            method: str = ",".join(sorted(methods)) if methods else ""
+            self._routes[endpoint] = RouteMetrics(method, route.path, len(self.buckets))
+
+    def acquire(self) -> RequestSample:
+        return self._samples.pop() if self._samples else RequestSample()
+
+    def release(self, sample: RequestSample) -> None:
+        # 请求中创建且未等待完成的后台任务会继承该对象，请求结束后的开销可能计入复用该对象的请求
+        sample.reset()
+        sample.send = None
+        self._samples.append(sample)
+
+    def observe(self, endpoint: Optional[Callable], sample: RequestSample, elapsed: float) -> None:
+        """
+        汇总一个请求
+        :param endpoint: 匹配到的路由处理函数
+        :param sample: 请求的累计值
+        :param elapsed: 请求耗时(秒)
+        :return:
+        """
+        route: RouteMetrics = self._routes.get(endpoint, self.unmatched) if endpoint is not None else self.unmatched
+        route.count += 1
+        route.bucket_counts[bisect_left(self.buckets, elapsed)] += 1
+        route.latency_sum += elapsed
+        route.statuses[sample.status] = route.statuses.get(sample.status, 0) + 1
+        route.db_statements += sample.db_statements
+        route.db_seconds += sample.db_seconds
+        route.redis_round_trips += sample.redis_round_trips
+        route.hash_seconds += sample.hash_seconds
+        route.captcha_seconds += sample.captcha_seconds
+
+    def routes(self) -> List[RouteMetrics]:
+        return [*self._routes.values(), self.unmatched]
+
+    def render(self, gauges: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """
+        生成Prometheus文本格式
+        :param gauges: 其他组件的状态，{组件名: {指标名: 数值}}，值为字典时作为一个标签展开
+        :return:
+        """
+        lines: List[str] = []
+        routes: List[RouteMetrics] = [route for route in self.routes() if route.count]
+
+        def labels(route: RouteMetrics) -> str:
+            return f'method="{route.method}",route="{route.path}"'
+
+        lines += [
+            "# HELP stardew_http_requests_in_flight Requests being processed.",
+            "# TYPE stardew_http_requests_in_flight gauge",
+            f"stardew_http_requests_in_flight {self.in_flight}",
+            "# HELP stardew_http_request_duration_seconds Request latency.",
+            "# TYPE stardew_http_request_duration_seconds histogram",
+        ]
+        for route in routes:
+            cumulative: int = 0
+            for bound, count in zip((*self.buckets, "+Inf"), route.bucket_counts):
+                cumulative += count
+                lines.append(f'stardew_http_request_duration_seconds_bucket{{{labels(route)},le="{bound}"}} {cumulative}')
+            lines.append(f"stardew_http_request_duration_seconds_sum{{{labels(route)}}} {route.latency_sum}")
+            lines.append(f"stardew_http_request_duration_seconds_count{{{labels(route)}}} {route.count}")
+
+        lines += [
+            "# HELP stardew_http_requests_total Requests by response status.",
+            "# TYPE stardew_http_requests_total counter",
+        ]
+        for route in routes:
+            for status, count in sorted(route.statuses.items()):
+                lines.append(f'stardew_http_requests_total{{{labels(route)},status="{status}"}} {count}')
+
+        for name, attr, description in (
+                ("db_statements", "db_statements", "SQL statements executed while handling requests."),
+                ("db_seconds", "db_seconds", "Time spent executing SQL statements."),
+                ("redis_round_trips", "redis_round_trips", "Redis round trips (a pipeline counts once)."),
+                ("password_hash_seconds", "hash_seconds", "Time spent waiting for password hashing."),
+                ("captcha_render_seconds", "captcha_seconds", "Time spent rendering captchas on demand."),
+        ):
+            metric: str = f"stardew_http_request_{name}_total"
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} counter"]
+            for route in routes:
+                lines.append(f"{metric}{{{labels(route)}}} {getattr(route, attr)}")
+
+        # 同名的样本需要连续输出
+        samples: Dict[str, List[str]] = {}
+        for component, values in (gauges or {}).items():
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    for name, inner in value.items():
+                        if isinstance(inner, (int, float)):
+                            samples.setdefault(f"stardew_{component}_{name}", []).append(
+                                f'stardew_{component}_{name}{{{component}="{key}"}} {float(inner)}'
+                            )
+                elif isinstance(value, (int, float)):
+                    samples.setdefault(f"stardew_{component}_{key}", []).append(
+                        f"stardew_{component}_{key} {float(value)}"
+                    )
+        for metric, values in samples.items():
+            lines.append(f"# TYPE {metric} gauge")
+            lines += values
+        lines.append("")
+        return "\n".join(lines)
+
+
+request_metrics: RequestMetrics = RequestMetrics(settings.METRICS_BUCKETS)
+
+
+class MetricsMiddleware:
+    """
+    统计每个请求的耗时、状态码及执行期间的数据库、redis等开销。
+    纯ASGI中间件，不经过 BaseHTTPMiddleware 的请求/响应包装
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        metrics: RequestMetrics = self.metrics
+        sample: RequestSample = metrics.acquire()
+        sample.send = send
+        token = _current_sample.set(sample)
+        metrics.in_flight += 1
+        start: float = time.perf_counter()
+        try:
+            await self.app(scope, receive, sample.forward)
+        finally:
+            elapsed: float = time.perf_counter() - start
+            metrics.in_flight -= 1
+            _current_sample.reset(token)
+            # 路由匹配后 starlette 会将处理函数写入 scope
+            metrics.observe(scope.get("endpoint"), sample, elapsed)
+            metrics.release(sample)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 18:30
+# @Description   : 权限字符串注册表及位图权限计算
+import re
+import time
+from typing import AsyncIterator, Callable, AsyncContextManager, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from aioredis import Redis
+from sqlalchemy.sql import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from stardew.models.system import SysMenu
+from stardew.common.constants import Constant
+from stardew.core.redis import Script
+
+# 注册表hash中保存世代的字段。注册表被淘汰或清空后以新的世代重新编号，登录信息中记录世代，不一致时视为失效
+_GENERATION_FIELD: str = "#generation"
+
+# 原子地为权限字符串分配id: 已存在则返回原id，否则以当前权限数量作为新id，保证id连续且各进程一致
+# ARGV[1]: 注册表不存在时使用的新世代  返回: [世代, id...]
+_INTERN_SCRIPT = Script("""
+local generation = redis.call('HGET', KEYS[1], '%s')
+if not generation then
+    generation = ARGV[1]
+    redis.call('HSET', KEYS[1], '%s', generation)
+end
+local ids = {tonumber(generation)}
+for i = 2, #ARGV do
+    local id = redis.call('HGET', KEYS[1], ARGV[i])
+    if not id then
+        id = redis.call('HLEN', KEYS[1]) - 1
+        redis.call('HSET', KEYS[1], ARGV[i], id)
+    end
+    ids[i] = tonumber(id)
+end
+return ids
+""" % (_GENERATION_FIELD, _GENERATION_FIELD))
+
+
+class PermissionRegistry:
+    """
+    权限注册表。
+    每个权限字符串(SysMenu.perm)对应一个整数id，用户的权限集合保存为以id为位序号的位图，
+    校验权限只需一次按位与。id分配保存在redis中，所有进程共享同一套编号。
+    通配符(如 sys:user:* 、 *:*:*)在计算位图时展开，每个通配符只编译一次。
+    """
+
+    def __init__(self) -> None:
+        # 当前编号所属的世代，尚未加载时为0
+        self.generation: int = 0
+        self._ids: Dict[str, int] = {}
+        self._masks: Dict[str, int] = {}
+        # 路由中声明的权限，启动时统一注册
+        self._required: Set[str] = set()
+        # 通配符 -> (编译后的正则, 计算时已知的权限数量, 位图)
+        self._patterns: Dict[str, Tuple[Pattern, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def required(self) -> Set[str]:
+        return self._required
+
+    def require(self, perm: str) -> None:
+        """ 声明某个权限会被校验，该权限会在启动时完成注册 """
+        self._required.add(perm)
+
+    def mask_of(self, perm: str) -> int:
+        """ 获取某权限对应的位掩码，未注册的权限返回0 """
+        return self._masks.get(perm, 0)
+
+    async def intern(self, redis: Redis, perms: Iterable[str]) -> None:
+        """
+        注册权限字符串，同时检查redis中注册表的世代
+        :param redis: redis客户端
+        :param perms: 权限字符串
+        :return:
+        """
+        perms = [perm for perm in set(perms) if perm not in self._ids]
+        generation, *ids = await _INTERN_SCRIPT(
+            redis, keys=[Constant.PERMISSION_REGISTRY_REDIS_KEY], args=[time.time_ns() // 1000, *perms]
+        )
+        if generation != self.generation:
+            # 注册表已在redis中重建，本地编号作废。重新加载后补充注册本进程已知的权限
+            known: Set[str] = set(self._ids) | self._required
+            await self.load(redis)
+            await self.intern(redis, known)
+            return
+        for perm, identity in zip(perms, ids):
+            self._add(perm, identity)
+
+    async def load(self, redis: Redis) -> None:
+        """ 从redis加载所有已注册的权限，世代变化时丢弃本地的编号 """
+        mapping: Dict[str, str] = await redis.hgetall(Constant.PERMISSION_REGISTRY_REDIS_KEY, encoding=Constant.UTF8)
+        generation: int = int(mapping.pop(_GENERATION_FIELD, 0))
+        if generation != self.generation:
+            self.generation = generation
+            self._ids, self._masks, self._patterns = {}, {}, {}
+        for perm, identity in mapping.items():
+            self._add(perm, int(identity))
+
+    async def refresh(self, redis: Redis) -> None:
+        """
+        遇到世代与本地不一致的登录信息时调用: redis中的世代已变化(或注册表已丢失)时重新加载
+        :param redis: redis客户端
+        :return:
+        """
+        generation: Optional[str] = await redis.hget(
+            Constant.PERMISSION_REGISTRY_REDIS_KEY, _GENERATION_FIELD, encoding=Constant.UTF8
+        )
+        if int(generation or 0) != self.generation:
+            await self.intern(redis, ())
+
+    async def sync(self, redis: Redis, perms: Iterable[str] = ()) -> None:
+        """
+        加载redis中已注册的权限，并注册 perms 及路由中声明的权限
+        :param redis: redis客户端
+        :param perms: 需要注册的其他权限
+        :return:
+        """
+        await self.load(redis)
+        await self.intern(redis, set(perms) | self._required)
+
+    async def compile(self, redis: Redis, perms: Iterable[str]) -> int:
+        """
+        将权限集合转换为位图
+        :param redis: redis客户端，用于注册尚未出现过的权限
+        :param perms: 权限字符串，可以包含通配符
+        :return: 位图
+        """
+        exact: List[str] = [perm for perm in perms if "*" not in perm]
+        patterns: List[str] = [perm for perm in perms if "*" in perm]
+        await self.intern(redis, exact)
+        mask: int = 0
+        for perm in exact:
+            mask |= self._masks[perm]
+        for pattern in patterns:
+            mask |= self._pattern_mask(pattern)
+        return mask
+
+    def _pattern_mask(self, pattern: str) -> int:
+        """ 通配符对应的位图，注册表有新增权限时才重新计算 """
+        compiled, size, mask = self._patterns.get(pattern, (None, -1, 0))
+        if size == len(self._ids):
+            return mask
+        if compiled is None:
+            # * 匹配一段(不跨越冒号)
+            compiled = re.compile("[^:]*".join(re.escape(part) for part in pattern.split("*")) + "$")
+        mask = 0
+        for perm, perm_mask in self._masks.items():
+            if compiled.match(perm):
+                mask |= perm_mask
+        self._patterns[pattern] = (compiled, len(self._ids), mask)
+        return mask
+
+    def _add(self, perm: str, identity: int) -> None:
+        self._ids[perm] = identity
+        self._masks[perm] = 1 << identity
+
+
+permission_registry = PermissionRegistry()
+
+
+async def init_permission_registry(
+        registry: PermissionRegistry,
+        redis: Redis,
+        session_factory: Callable[..., AsyncContextManager[AsyncSession]]
+) -> AsyncIterator[PermissionRegistry]:
+    """
+    启动时注册菜单表中的权限以及路由中声明的权限
+    :param registry: 权限注册表
+    :param redis: redis客户端
+    :param session_factory: 异步数据库会话
+    :return:
+    """
+    async with session_factory() as session:
+        result = await session.execute(select(SysMenu.perm).where(SysMenu.perm != "").distinct())
+        perms: Set[str] = {perm for perm in result.scalars().all() if "*" not in perm}
+    await registry.sync(redis, perms)
+    yield registry
@@ -2,15 +2,139 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/2/26 15:38
 # @Description   :
-from typing import AsyncIterator
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional, Sequence, Union
 
-from aioredis import create_redis_pool, Redis
+from aioredis import create_redis_pool, Redis, ReplyError
+from aioredis.commands import Pipeline, MultiExec
+
+from stardew.core.metrics import record_redis
+
+# 比较后删除: 值一致时删除并返回1，不一致返回0，键不存在返回-1
+_COMPARE_AND_DELETE = """
+local value = redis.call('GET', KEYS[1])
+if not value then
+    return -1
+end
+if value ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+
+class MeteredPipeline(Pipeline):
+
+    """ 整个pipeline只计一次往返 """
+
+    async def execute(self, *, return_exceptions: bool = False) -> Any:
+        if self._pipeline:
+            record_redis()
+        return await super().execute(return_exceptions=return_exceptions)
+
+
+class MeteredMultiExec(MultiExec):
+
+    """ 整个事务只计一次往返 """
+
+    async def execute(self, *, return_exceptions: bool = False) -> Any:
+        if self._pipeline:
+            record_redis()
+        return await super().execute(return_exceptions=return_exceptions)
+
+
+class MeteredRedis(Redis):
+    """
+    统计当前请求与redis的往返次数。
+    pipeline/事务中的命令只是写入缓冲，使用未计数的 Redis 生成，发送时整体计一次
+    """
+
+    def execute(self, command, *args, **kwargs):
+        record_redis()
+        return self._pool_or_conn.execute(command, *args, **kwargs)
+
+    def pipeline(self) -> MeteredPipeline:
+        return MeteredPipeline(self._pool_or_conn, Redis)
+
+    def multi_exec(self) -> MeteredMultiExec:
+        return MeteredMultiExec(self._pool_or_conn, Redis)
 
 
 async def init_redis_pool(redis_dsn: str) -> AsyncIterator[Redis]:
-    pool = await create_redis_pool(redis_dsn)
+    pool = await create_redis_pool(redis_dsn, commands_factory=MeteredRedis)
     try:
         yield pool
     finally:
         pool.close()
-        await pool.wait_closed()
\ No newline at end of file
+        await pool.wait_closed()
+
+
+class Script:
+    """
+    lua脚本。
+    直接执行时优先使用 EVALSHA 只发送脚本的sha1，redis中没有缓存该脚本(重启、SCRIPT FLUSH)时退回 EVAL，
+    EVAL 同时会把脚本加载到缓存中。加入pipeline/事务时无法在出错后重试，使用 EVAL
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+
+    async def __call__(self, redis: Redis, keys: Sequence[Any] = (), args: Sequence[Any] = ()) -> Any:
+        """
+        执行脚本
+        :param redis: redis客户端
+        :param keys: KEYS
+        :param args: ARGV
+        :return: 脚本的返回值
+        """
+        try:
+            return await redis.evalsha(self.sha, keys=list(keys), args=list(args))
+        except ReplyError as e:
+            if not str(e).startswith("NOSCRIPT"):
+                raise
+        return await redis.eval(self.source, keys=list(keys), args=list(args))
+
+    def queue(self, pipeline: Pipeline, keys: Sequence[Any] = (), args: Sequence[Any] = ()) -> asyncio.Future:
+        """
+        将脚本加入pipeline或事务
+        :param pipeline: redis.pipeline() 或 redis.multi_exec()
+        :param keys: KEYS
+        :param args: ARGV
+        :return: 执行后可获取脚本返回值的future
+        """
+        return pipeline.eval(self.source, keys=list(keys), args=list(args))
+
+
+compare_and_delete_script = Script(_COMPARE_AND_DELETE)
+
+
+@asynccontextmanager
+async def pipeline(redis: Redis, transaction: bool = False) -> AsyncIterator[Pipeline]:
+    """
+    在一次往返中执行多条命令，退出时统一发送。with块中抛出异常时不会发送任何命令。
+        async with pipeline(redis) as pipe:
+            future = pipe.get(key)
+        value = await future
+    :param redis: redis客户端
+    :param transaction: 为True时包装为 MULTI/EXEC 事务
+    :return:
+    """
+    pipe: Pipeline = redis.multi_exec() if transaction else redis.pipeline()
+    yield pipe
+    await pipe.execute()
+
+
+async def compare_and_delete(redis: Redis, key: str, value: Union[str, bytes]) -> Optional[bool]:
+    """
+    原子地比较键的值，一致时删除该键，一次往返完成。并发的多个请求中最多只有一个能匹配成功
+    :param redis: redis客户端
+    :param key: 键
+    :param value: 期望的值
+    :return: 键不存在返回None，值一致(已删除)返回True，不一致返回False
+    """
+    result: int = await compare_and_delete_script(redis, keys=[key], args=[value])
+    return None if result < 0 else bool(result)
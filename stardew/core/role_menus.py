@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 22:40
+# @Description   : 角色已分配菜单的共享缓存及增量
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+from aioredis import Redis
+
+from stardew.common.constants import Constant
+from stardew.core.redis import Script, pipeline
+
+# 原子地替换角色的菜单集合。集合有变化时递增版本号，并在变更日志中记录 [版本号, 新增, 移除]。
+# 版本号不存在(首次缓存或被淘汰、清空)时以当前毫秒时间戳为起点并清空日志，新的版本号不会与客户端持有的旧版本号重复
+# KEYS: 集合, 版本号, 变更日志  ARGV: 日志长度, 版本号起点, 菜单id...
+_REPLACE_SCRIPT = Script("""
+local new = {}
+for i = 3, #ARGV do new[ARGV[i]] = true end
+local added, removed = {}, {}
+for _, id in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    if new[id] then new[id] = nil else removed[#removed + 1] = id end
+end
+for id in pairs(new) do added[#added + 1] = id end
+if redis.call('EXISTS', KEYS[2]) == 1 and #added == 0 and #removed == 0 then
+    return tonumber(redis.call('GET', KEYS[2]))
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    redis.call('SET', KEYS[2], ARGV[2])
+    redis.call('DEL', KEYS[3])
+end
+local version = redis.call('INCR', KEYS[2])
+redis.call('DEL', KEYS[1])
+if #ARGV > 2 then redis.call('SADD', KEYS[1], unpack(ARGV, 3)) end
+redis.call('RPUSH', KEYS[3], cjson.encode({version, added, removed}))
+redis.call('LTRIM', KEYS[3], -tonumber(ARGV[1]), -1)
+return version
+""")
+
+
+class RoleMenuCache:
+    """
+    角色 -> 已分配菜单id 的共享缓存。
+    每个角色有一个递增的版本号(以首次缓存时的毫秒时间戳为起点)及最近若干次变更的日志，客户端携带上次获取的版本号时只返回差异，
+    版本号一致时只需一次GET。
+    """
+
+    def __init__(self, redis: Redis, log_size: int = 100) -> None:
+        """
+        :param redis: redis客户端
+        :param log_size: 每个角色保留的变更记录数，客户端版本早于此范围时返回全量数据
+        """
+        self.redis = redis
+        self.log_size = log_size
+
+    @staticmethod
+    def _keys(role_id: str) -> Tuple[str, str, str]:
+        prefix: str = Constant.ROLE_MENUS_REDIS_KEY + role_id
+        return prefix, prefix + ":version", prefix + ":log"
+
+    async def version(self, role_id: str) -> Optional[int]:
+        """ 当前版本号，未缓存时返回None """
+        version: Optional[bytes] = await self.redis.get(self._keys(role_id)[1])
+        return None if version is None else int(version)
+
+    async def replace(self, role_id: str, menu_ids: Iterable[str]) -> int:
+        """
+        替换角色的菜单集合
+        :param role_id: 角色id
+        :param menu_ids: 菜单id
+        :return: 替换后的版本号
+        """
+        return await _REPLACE_SCRIPT(
+            self.redis, keys=list(self._keys(role_id)), args=[self.log_size, int(time.time() * 1000), *set(menu_ids)]
+        )
+
+    async def remove(self, role_id: str) -> None:
+        """ 删除角色的缓存 """
+        await self.redis.delete(*self._keys(role_id))
+
+    async def get(self, role_id: str) -> Optional[Tuple[int, List[str]]]:
+        """
+        获取全量数据
+        :param role_id: 角色id
+        :return: (版本号, 菜单id列表)，未缓存时返回None
+        """
+        members_key, version_key, _ = self._keys(role_id)
+        async with pipeline(self.redis, transaction=True) as transaction:
+            version_future = transaction.get(version_key)
+            members_future = transaction.smembers(members_key, encoding=Constant.UTF8)
+        version: Optional[bytes] = await version_future
+        if version is None:
+            return None
+        return int(version), sorted(await members_future)
+
+    async def delta(self, role_id: str, since: int) -> Optional[Dict]:
+        """
+        获取某版本之后的变更
+        :param role_id: 角色id
+        :param since: 客户端持有的版本号
+        :return: 未缓存时返回None。
+                 变更日志覆盖该版本时返回 {"version", "added", "removed"}，否则返回 {"version", "checked_keys"}
+        """
+        members_key, version_key, log_key = self._keys(role_id)
+        async with pipeline(self.redis, transaction=True) as transaction:
+            version_future = transaction.get(version_key)
+            log_future = transaction.lrange(log_key, 0, -1)
+            members_future = transaction.smembers(members_key, encoding=Constant.UTF8)
+        version: Optional[bytes] = await version_future
+        if version is None:
+            return None
+        current: int = int(version)
+        entries: List = [orjson.loads(entry) for entry in await log_future]
+        if 0 < since <= current and entries and entries[0][0] <= since + 1:
+            added: Set[str] = set()
+            removed: Set[str] = set()
+            for entry_version, entry_added, entry_removed in entries:
+                if entry_version <= since:
+                    continue
+                # cjson将空列表编码为 {}
+                for menu_id in entry_added or ():
+                    if menu_id in removed:
+                        removed.discard(menu_id)
+                    else:
+                        added.add(menu_id)
+                for menu_id in entry_removed or ():
+                    if menu_id in added:
+                        added.discard(menu_id)
+                    else:
+                        removed.add(menu_id)
+            return {"version": current, "added": sorted(added), "removed": sorted(removed)}
+        return {"version": current, "checked_keys": sorted(await members_future)}
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 17:40
+# @Description   : 登录会话的进程内缓存及其失效通知
+import time
+import zlib
+import struct
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Hashable, Optional, Set, Tuple
+
+import orjson
+from aioredis import Redis, ReplyError
+from aioredis.pubsub import Receiver
+
+from stardew.settings import settings
+from stardew.common.utils import LRUCache, logger
+from stardew.common.constants import Constant
+from stardew.core.redis import Script, pipeline
+from stardew.core.permission import permission_registry
+from stardew.core.web.schemas import LoginUser
+from stardew.schemas.system import UserSimpleSchema
+
+# keyspace通知中不需要使缓存失效的事件(滑动续期)
+_KEEP_EVENTS = {"expire"}
+
+# 二进制登录信息格式:
+#   头部: 版本号 | 用户字段指纹 | 登录时间戳 | 权限注册表世代 | 用户状态 | 是否超级管理员 | 用户id长度 | 权限位图长度
+#   用户id | 权限位图(大端序) | orjson数组 [角色列表, 其余用户字段的值(按 _PAYLOAD_FIELDS 顺序)]
+# json以 { 开头，首字节即可区分两种格式
+_SESSION_VERSION: int = 2
+_HEADER = struct.Struct("!BIdQBBBH")
+# 头部中单独保存的用户字段，每次请求都会用到，不需要解析其余部分
+_HEADER_FIELDS: Tuple[str, ...] = ("id", "status", "is_super")
+_PAYLOAD_FIELDS: Tuple[str, ...] = tuple(name for name in UserSimpleSchema.__fields__ if name not in _HEADER_FIELDS)
+# 用户字段变化(如新增列)后指纹不一致，旧的登录信息视为失效
+_FIELDS_CRC: int = zlib.crc32(",".join(UserSimpleSchema.__fields__).encode())
+
+# 删除某用户的所有登录会话
+# KEYS: 用户的会话索引  ARGV: 登录信息键名前缀
+_REVOKE_SCRIPT = Script("""
+local subs = redis.call('SMEMBERS', KEYS[1])
+for _, sub in ipairs(subs) do
+    redis.call('DEL', ARGV[1] .. sub)
+end
+redis.call('DEL', KEYS[1])
+return #subs
+""")
+
+
+class SessionUser:
+    """
+    从redis中读取的登录信息。
+    用户id、状态、权限位图等每次请求都会用到的字段在头部中，读取时直接解包；
+    角色及完整的用户信息在首次访问时才解析。接口与 LoginUser 一致
+    """
+
+    __slots__ = (
+        "user_id", "status", "is_super", "login_time", "perm_generation", "sub", "refreshed_at",
+        "_perm_bits", "_payload", "_roles", "_sys_user"
+    )
+
+    def __init__(
+            self,
+            user_id: str,
+            status: int,
+            is_super: bool,
+            login_time: datetime,
+            perm_bits: int,
+            perm_generation: int = 0,
+            payload: Optional[bytes] = None,
+            roles: Optional[Set[str]] = None,
+            sys_user: Optional[UserSimpleSchema] = None
+    ) -> None:
+        self.user_id = user_id
+        self.status = status
+        self.is_super = is_super
+        self.login_time = login_time
+        # 权限位图所属的权限注册表世代
+        self.perm_generation = perm_generation
+        # 由 read_session 设置
+        self.sub: Optional[str] = None
+        # 最近一次滑动续期的时间(time.monotonic)，仅在本进程内有效
+        self.refreshed_at: float = 0.0
+        self._perm_bits = perm_bits
+        self._payload = payload
+        self._roles = roles
+        self._sys_user = sys_user
+
+    @property
+    def perm_mask(self) -> str:
+        return format(self._perm_bits, "x")
+
+    @property
+    def roles(self) -> Set[str]:
+        if self._roles is None:
+            self._parse_payload()
+        return self._roles
+
+    @property
+    def sys_user(self) -> UserSimpleSchema:
+        if self._sys_user is None:
+            self._parse_payload()
+        return self._sys_user
+
+    def has_perm(self, mask: int) -> bool:
+        """ 是否拥有某权限，mask通过 PermissionRegistry.mask_of 获取 """
+        return self._perm_bits & mask != 0
+
+    def _parse_payload(self) -> None:
+        roles, values = orjson.loads(self._payload)
+        user: Dict[str, Any] = dict(zip(_PAYLOAD_FIELDS, values))
+        user.update(id=self.user_id, status=self.status, is_super=self.is_super)
+        self._roles = set(roles)
+        # 数据由 encode_session 写入，不需要再次校验
+        self._sys_user = UserSimpleSchema.construct(**user)
+        self._payload = None
+
+
+def encode_session(login_user: LoginUser) -> bytes:
+    """
+    将登录信息编码为二进制
+    :param login_user: 登录信息
+    :return:
+    """
+    user: UserSimpleSchema = login_user.sys_user
+    user_id: bytes = user.id.encode()
+    perm_bits: int = int(login_user.perm_mask, 16)
+    mask: bytes = perm_bits.to_bytes((perm_bits.bit_length() + 7) // 8, "big")
+    login_time: datetime = login_user.login_time
+    if login_time.tzinfo is None:
+        login_time = login_time.replace(tzinfo=timezone.utc)
+    header: bytes = _HEADER.pack(
+        _SESSION_VERSION, _FIELDS_CRC, login_time.timestamp(), login_user.perm_generation, user.status, user.is_super, len(user_id), len(mask)
+    )
+    payload: bytes = orjson.dumps([sorted(login_user.roles), [getattr(user, name) for name in _PAYLOAD_FIELDS]])
+    return header + user_id + mask + payload
+
+
+def decode_session(raw: bytes) -> Optional[SessionUser]:
+    """
+    解码登录信息，兼容json格式
+    :param raw: redis中保存的值
+    :return: 格式无法识别或用户字段已变化时返回None
+    """
+    if raw[:1] == b"{":
+        return _from_login_user(LoginUser(**orjson.loads(raw)))
+    if len(raw) < _HEADER.size or raw[0] != _SESSION_VERSION:
+        return None
+    _, crc, timestamp, perm_generation, status, is_super, id_length, mask_length = _HEADER.unpack_from(raw)
+    if crc != _FIELDS_CRC:
+        return None
+    offset: int = _HEADER.size
+    user_id: str = raw[offset:offset + id_length].decode()
+    offset += id_length
+    perm_bits: int = int.from_bytes(raw[offset:offset + mask_length], "big")
+    return SessionUser(
+        user_id=user_id,
+        status=status,
+        is_super=bool(is_super),
+        login_time=datetime.utcfromtimestamp(timestamp),
+        perm_bits=perm_bits,
+        perm_generation=perm_generation,
+        payload=raw[offset + mask_length:]
+    )
+
+
+def _from_login_user(login_user: LoginUser) -> SessionUser:
+    """ 改为二进制格式前以 LoginUser.json() 保存的登录信息 """
+    user: UserSimpleSchema = login_user.sys_user
+    return SessionUser(
+        user_id=user.id,
+        status=user.status,
+        is_super=user.is_super,
+        login_time=login_user.login_time,
+        perm_bits=int(login_user.perm_mask, 16),
+        perm_generation=login_user.perm_generation,
+        roles=set(login_user.roles),
+        sys_user=user
+    )
+
+
+def session_ttl() -> int:
+    """ 登录信息的存活秒数 """
+    token_ttl: int = settings.JWT_EXPIRED_MINUTES * 60
+    return min(settings.SESSION_TTL, token_ttl) if settings.SESSION_TTL else token_ttl
+
+
+async def write_session(redis: Redis, sub: str, login_user: LoginUser) -> None:
+    """
+    保存登录信息并加入该用户的会话索引，在一个事务中完成
+    :param redis: redis客户端
+    :param sub: token中的sub
+    :param login_user: 登录信息
+    :return:
+    """
+    index_key: str = Constant.USER_SESSIONS_REDIS_KEY + login_user.sys_user.id
+    async with pipeline(redis, transaction=True) as transaction:
+        transaction.set(Constant.LOGIN_REDIS_KEY + sub, encode_session(login_user), expire=session_ttl())
+        transaction.sadd(index_key, sub)
+        # 索引中的会话都不会晚于最新签发的token过期
+        transaction.expire(index_key, settings.JWT_EXPIRED_MINUTES * 60)
+
+
+async def refresh_session(redis: Redis, session_user: SessionUser, token_expire: float) -> None:
+    """
+    滑动续期。同一进程内每个会话每 SESSION_REFRESH_INTERVAL 秒最多写一次；
+    续期后的过期时间不会晚于token的过期时间，存活时间与token有效期一致时不需要续期
+    :param redis: redis客户端
+    :param session_user: 登录信息
+    :param token_expire: token的过期时间戳
+    :return:
+    """
+    ttl: int = session_ttl()
+    if ttl >= settings.JWT_EXPIRED_MINUTES * 60:
+        return
+    now: float = time.monotonic()
+    if now - session_user.refreshed_at < settings.SESSION_REFRESH_INTERVAL:
+        return
+    session_user.refreshed_at = now
+    ttl = min(ttl, int(token_expire - time.time()))
+    if ttl > 0:
+        await redis.expire(Constant.LOGIN_REDIS_KEY + session_user.sub, ttl)
+
+
+async def revoke_session(redis: Redis, session_user: SessionUser) -> None:
+    """
+    注销一个登录会话
+    :param redis: redis客户端
+    :param session_user: 登录信息
+    :return:
+    """
+    async with pipeline(redis) as pipe:
+        pipe.delete(Constant.LOGIN_REDIS_KEY + session_user.sub)
+        pipe.srem(Constant.USER_SESSIONS_REDIS_KEY + session_user.user_id, session_user.sub)
+        pipe.publish(Constant.SESSION_INVALIDATE_CHANNEL, f"session:{session_user.sub}")
+
+
+async def revoke_user_sessions(redis: Redis, user_id: str) -> int:
+    """
+    注销某用户的所有登录会话(退出所有设备、禁用或删除用户)，并广播使各进程的缓存失效，一次往返完成
+    :param redis: redis客户端
+    :param user_id: 用户id
+    :return: 注销的会话数
+    """
+    async with pipeline(redis) as pipe:
+        revoked = _REVOKE_SCRIPT.queue(
+            pipe, keys=[Constant.USER_SESSIONS_REDIS_KEY + user_id], args=[Constant.LOGIN_REDIS_KEY]
+        )
+        pipe.publish(Constant.SESSION_INVALIDATE_CHANNEL, f"user:{user_id}")
+    return await revoked
+
+
+async def read_session(redis: Redis, sub: str) -> Optional[SessionUser]:
+    """
+    读取登录信息
+    :param redis: redis客户端
+    :param sub: token中的sub
+    :return: 不存在或无法解码时返回None
+    """
+    raw: Optional[bytes] = await redis.get(Constant.LOGIN_REDIS_KEY + sub)
+    if not raw:
+        return None
+    session_user: Optional[SessionUser]
+    if raw[:1] == b"{":
+        info: Dict[str, Any] = orjson.loads(raw)
+        if "perm_mask" not in info and info.get("perms"):
+            # 兼容以权限字符串集合保存的旧登录信息
+            info["perm_mask"] = format(await permission_registry.compile(redis, info["perms"]), "x")
+            info["perm_generation"] = permission_registry.generation
+        login_user: LoginUser = LoginUser(**info)
+        # 旧的登录信息没有过期时间，也不在用户的会话索引中，读取时转换为当前格式重新写入
+        await write_session(redis, sub, login_user)
+        session_user = _from_login_user(login_user)
+    else:
+        session_user = decode_session(raw)
+    if session_user is not None:
+        session_user.sub = sub
+    return session_user
+
+
+class SessionCache(LRUCache):
+
+    """ 缓存 token sub -> SessionUser, 额外维护 用户id -> sub 的索引以便按用户失效 """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._user_index: Dict[str, Set[str]] = {}
+
+    def set(self, key: str, value: SessionUser, ttl: float = None) -> None:
+        super().set(key, value, ttl)
+        self._user_index.setdefault(value.user_id, set()).add(key)
+
+    def invalidate_session(self, sub: str) -> None:
+        """ 使某个登录会话失效 """
+        self.pop(sub)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """ 使某用户的所有登录会话失效 """
+        for sub in list(self._user_index.get(user_id, ())):
+            self.pop(sub)
+
+    def _discard(self, key: Hashable) -> None:
+        _, login_user = self._data[key]
+        super()._discard(key)
+        subs: Set[str] = self._user_index.get(login_user.user_id)
+        if subs is not None:
+            subs.discard(key)
+            if not subs:
+                del self._user_index[login_user.user_id]
+
+
+async def init_session_listener(redis: Redis, cache: SessionCache) -> AsyncIterator[asyncio.Task]:
+    """
+    订阅失效通知并清除本地缓存。
+    失效来源有两个: 业务代码主动发布到 SESSION_INVALIDATE_CHANNEL 的消息;
+    登录信息键被删除/过期时redis产生的keyspace通知。
+    :param redis: redis客户端
+    :param cache: 登录会话缓存
+    :return: 后台消费任务
+    """
+    keyspace_prefix: str = f"__keyspace@{settings.REDIS_NAME}__:"
+    keyspace_pattern: str = keyspace_prefix + Constant.LOGIN_REDIS_KEY + "*"
+    if settings.SESSION_KEYSPACE_NOTIFY:
+        await _enable_keyspace_events(redis)
+
+    receiver = Receiver()
+    await redis.subscribe(receiver.channel(Constant.SESSION_INVALIDATE_CHANNEL))
+    await redis.psubscribe(receiver.pattern(keyspace_pattern))
+
+    async def consume() -> None:
+        async for sender, message in receiver.iter(encoding=Constant.UTF8):
+            try:
+                if sender.is_pattern:
+                    channel, event = message
+                    if event not in _KEEP_EVENTS:
+                        cache.invalidate_session(channel.decode()[len(keyspace_prefix + Constant.LOGIN_REDIS_KEY):])
+                    continue
+                kind, _, identity = message.partition(":")
+                if kind == "user":
+                    cache.invalidate_user(identity)
+                elif kind == "session":
+                    cache.invalidate_session(identity)
+            except Exception:
+                logger.exception("Failed to handle session invalidation message")
+
+    task: asyncio.Task = asyncio.ensure_future(consume())
+    try:
+        yield task
+    finally:
+        receiver.stop()
+        await redis.unsubscribe(Constant.SESSION_INVALIDATE_CHANNEL)
+        await redis.punsubscribe(keyspace_pattern)
+        task.cancel()
+
+
+async def _enable_keyspace_events(redis: Redis) -> None:
+    """ 在现有配置上追加keyspace通知所需的事件类型(K:keyspace g:通用命令 $:字符串命令 x:过期 e:淘汰) """
+    try:
+        config: Dict = await redis.config_get("notify-keyspace-events")
+        current: str = config.get("notify-keyspace-events", "")
+        # A 是 g$lshzxet 的别名
+        covered: str = current + ("g$lshzxet" if "A" in current else "")
+        required: str = "".join(flag for flag in "Kg$xe" if flag not in covered)
+        if required:
+            await redis.config_set("notify-keyspace-events", current + required)
+    except ReplyError:
+        # 云服务商的redis通常禁用CONFIG命令，此时只能依赖主动发布的失效消息和缓存过期时间
+        logger.warning("Unable to enable redis keyspace notifications, session cache relies on TTL")
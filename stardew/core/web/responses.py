@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 00:50
+# @Description   : 响应类
+import asyncio
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from starlette.types import Receive, Scope, Send
+from starlette.responses import StreamingResponse as _StreamingResponse
+
+
+@lru_cache(maxsize=None)
+def _schema_getter(schema: Type[BaseModel]) -> Tuple[Tuple[str, ...], Callable[[Any], Tuple]]:
+    """ schema的字段名，以及一次取出对象上所有同名属性的函数，按schema缓存 """
+    names: Tuple[str, ...] = tuple(schema.__fields__)
+    if len(names) == 1:
+        getter: Callable = attrgetter(names[0])
+        return names, lambda obj: (getter(obj),)
+    return names, attrgetter(*names)
+
+
+def orm_to_dict(obj: Any, schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    按schema的字段从orm对象中取值，结果与 jsonable_encoder(schema.from_orm(obj)) 一致。
+    仅用于由 sqlalchemy_to_pydantic 生成、字段与列一一对应的schema: 数据来自数据库，不需要再次校验，
+    也不需要 jsonable_encoder 逐层遍历，配合 ORJSONResponse 直接序列化为字节
+    :param obj: orm对象
+    :param schema: 如 UserSimpleSchema
+    :return:
+    """
+    names, getter = _schema_getter(schema)
+    return dict(zip(names, getter(obj)))
+
+
+def orm_to_dicts(objs: Iterable[Any], schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """ 批量转换，参考 orm_to_dict """
+    names, getter = _schema_getter(schema)
+    return [dict(zip(names, getter(obj))) for obj in objs]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match 是否匹配ETag(RFC 7232 弱比较)。请求头可以是 * 或逗号分隔的多个ETag，忽略 W/ 前缀
+    :param if_none_match: If-None-Match 请求头
+    :param etag: 当前资源的ETag
+    :return: 匹配时应返回304
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque: str = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+class StreamingResponse(_StreamingResponse):
+    """
+    当前依赖的starlette版本将协程直接传给asyncio.wait，python3.11起会抛出TypeError。
+    此处先包装为task，行为与原实现一致: 客户端断开时取消输出，不再继续读取数据库
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        tasks = [
+            asyncio.ensure_future(self.stream_response(send)),
+            asyncio.ensure_future(self.listen_for_disconnect(receive)),
+        ]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.result()
+
+        if self.background is not None:
+            await self.background()
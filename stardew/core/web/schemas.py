@@ -3,9 +3,10 @@
 # @CreatedTime   : 2021/2/4 15:56
 # @Description   :
 from datetime import datetime
-from typing import Optional, List, Any, Set
+from typing import Optional, List, Any, Set, Generic, TypeVar
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+from pydantic.generics import GenericModel
 from stardew.schemas.system import UserSimpleSchema
 
 
@@ -18,16 +19,30 @@ class LoginUser(BaseModel):
 	# 数据库中的用户信息
 	sys_user: UserSimpleSchema
 
-	# 该用户所有可用的按钮树结构
-	perms: Set[str]
+	# 该用户所有权限的位图(十六进制)，位序号即 PermissionRegistry 中的权限id。
+	# 使用字符串保存，避免json解析超过64位的整数时丢失精度
+	perm_mask: str = "0"
+
+	# 权限位图所属的权限注册表世代，与当前世代不一致时登录信息失效
+	perm_generation: int = 0
 
 	roles: Set[str]
 
+	_perm_bits: int = PrivateAttr(0)
+
+	def __init__(self, **data: Any) -> None:
+		super().__init__(**data)
+		self._perm_bits = int(self.perm_mask, 16)
+
+	def has_perm(self, mask: int) -> bool:
+		""" 是否拥有某权限，mask通过 PermissionRegistry.mask_of 获取 """
+		return self._perm_bits & mask != 0
+
 
 class TreeNode(BaseModel):
 	""" 前端树结构 """
 	# 节点id
-	id: int
+	id: str
 	# 节点标签
 	label: str = Field(alias="name")
 	# 子节点
@@ -51,4 +66,16 @@ class CaptchaInfo(BaseModel):
 	image: str
 
 
+ItemType = TypeVar("ItemType")
+
+
+class CursorPage(GenericModel, Generic[ItemType]):
+	""" 游标分页结果 """
+
+	items: List[ItemType]
+
+	# 下一页游标，为None时表示没有下一页
+	next_cursor: Optional[str] = None
+
+
 TreeNode.update_forward_refs()
@@ -2,10 +2,12 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/3/3 10:15
 # @Description   :
-from .user import UserRepository
-from .role import RoleRepository
+from .user import UserRepository, AsyncUserRepository
+from .role import RoleRepository, AsyncRoleRepository
 
 __all__ = {
     "UserRepository",
-    "RoleRepository"
+    "AsyncUserRepository",
+    "RoleRepository",
+    "AsyncRoleRepository",
 }
\ No newline at end of file
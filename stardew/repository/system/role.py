@@ -2,12 +2,20 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/3/3 10:46
 # @Description   :
-from typing import Callable, ContextManager, Optional, List, Union, Dict, Any
+from typing import Callable, ContextManager, AsyncContextManager, Optional, List, Union, Dict, Any, Sequence, \
+    AsyncIterator
 
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import Column
+from sqlalchemy.engine.result import Result, Row
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.sql import select, Select, insert, Insert, delete, Delete, update, Update, text, Executable
-from stardew.models.system import SysRole
+from sqlalchemy.ext.asyncio import AsyncResult
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql import select, Select, insert, Insert, delete, Delete, update, Update, Executable
+from stardew.core.db.filters import apply_filters
+from stardew.core.db.pagination import keyset
+from stardew.models.system import SysRole, SysMenu, role_menu
 from stardew.schemas.system import RoleCreateSchema, RoleUpdateSchema
 
 
@@ -25,7 +33,7 @@ class RoleRepository:
         """
         offset: int = page_no * page_size
         with self.session_factory() as session:
-            return session.query(SysRole).offset(offset).limit(page_size).all()
+            return session.query(SysRole).order_by(SysRole.id).offset(offset).limit(page_size).all()
 
     def get_by_ids(self, identities: List[str]) -> List[SysRole]:
         """
@@ -93,6 +101,172 @@ class RoleRepository:
         :return:
         """
         with self.session_factory() as session:
+            # sys_role_menu 没有级联删除，先在同一事务中删除角色的菜单关联
+            session.execute(delete(role_menu).where(role_menu.c.role_id == identity))
             stmt: Delete = delete(SysRole).where(SysRole.id == identity)
-            session.execute(text(stmt))
-            session.commit()
\ No newline at end of file
+            session.execute(stmt)
+            session.commit()
+
+    def get_menu_ids(self, identity: str) -> List[str]:
+        """
+        查询角色已分配的菜单id
+        :param identity: 角色id
+        :return:
+        """
+        with self.session_factory() as session:
+            stmt: Select = select(role_menu.c.menu_id).where(role_menu.c.role_id == identity)
+            return session.execute(stmt).scalars().all()
+
+
+class AsyncRoleRepository:
+
+    def __init__(self, session_factory: Callable[..., AsyncContextManager[AsyncSession]]) -> None:
+        self.session_factory = session_factory
+
+    async def get_multi(self, page_no: Optional[int] = 0, page_size: Optional[int] = 100) -> List[SysRole]:
+        """
+        查询role列表
+        :param page_no: 页码
+        :param page_size: 每页数据
+        :return: 分页后的数据
+        """
+        offset: int = page_no * page_size
+        async with self.session_factory() as session:
+            stmt: Select = select(SysRole).order_by(SysRole.id).offset(offset).limit(page_size)
+            result: Result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def get_after(self, after: Optional[str] = None, page_size: Optional[int] = 100) -> List[SysRole]:
+        """
+        按id顺序查询角色列表(keyset分页)，多返回一条用于判断是否还有下一页
+        :param after: 上一页最后一条数据的id，为None时从头开始
+        :param page_size: 每页数据
+        :return:
+        """
+        async with self.session_factory() as session:
+            result: Result = await session.execute(keyset(select(SysRole), SysRole.id, after, page_size))
+            return result.scalars().all()
+
+    async def filter(self, where_clause: Dict[str, Any], order_by: Optional[Sequence[str]] = None) -> List[SysRole]:
+        """
+        按条件查询角色，格式参考 stardew.core.db.filters
+        :param where_clause: 查询条件，如 {"status": 0, "id__in": [...]}
+        :param order_by: 排序列，列名前加 - 表示降序
+        :return:
+        """
+        stmt: Select = apply_filters(select(SysRole), SysRole, where_clause, order_by)
+        async with self.session_factory() as session:
+            result: Result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def get_by_ids(self, identities: List[str]) -> List[SysRole]:
+        """
+        通过id列表查询对应的角色列表
+        :param identities: id列表
+        :return: 角色列表
+        """
+        async with self.session_factory() as session:
+            stmt: Select = select(SysRole).where(SysRole.id.in_(identities))
+            result: Result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def stream(self, columns: Sequence[Column], chunk_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+        """
+        使用服务端游标按id顺序分批读取角色，用于导出
+        :param columns: 读取的列
+        :param chunk_size: 每批的行数
+        :return: 每次返回一批数据
+        """
+        stmt: Select = select(*columns).order_by(SysRole.id)
+        async with self.session_factory() as session:
+            result: AsyncResult = await session.stream(stmt)
+            async for rows in result.partitions(chunk_size):
+                yield rows
+
+    async def get_by_id(self, identity: str) -> Optional[SysRole]:
+        """
+        通过id查询role
+        :param identity: role id
+        :return: 对应的role
+        """
+        async with self.session_factory() as session:
+            return await session.get(SysRole, ident=identity)
+
+    async def add(self, create_schema: Union[RoleCreateSchema, Dict[str, Any]]) -> None:
+        """
+        创建role
+        :param create_schema: 创建角色所需的数据
+        :return:
+        """
+        async with self.session_factory() as session:
+            input_data: Dict
+            if isinstance(create_schema, dict):
+                input_data = create_schema
+            else:
+                input_data = create_schema.dict(exclude_unset=True)
+            # 处理权限信息，perms为菜单id列表
+            menu_ids: List[str] = input_data.pop("perms", None)
+            role = SysRole(**input_data)
+            role.perms = await self._get_menus(session, menu_ids) if menu_ids else []
+            session.add(role)
+            await session.commit()
+
+    async def update(self, identity: str, update_schema: Union[RoleUpdateSchema, Dict[str, Any]]) -> SysRole:
+        """
+        更新role
+        :param identity: 待更新的role的id
+        :param update_schema: 更新所需的数据
+        :return: 更新后的role
+        """
+        async with self.session_factory() as session:
+            # 异步会话中不能懒加载，修改权限前需要预先加载原有的权限集合
+            role: SysRole = await session.get(SysRole, ident=identity, options=[selectinload(SysRole.perms)])
+            if role is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="未找到相关角色")
+            if isinstance(update_schema, dict):
+                update_data = update_schema
+            else:
+                update_data = update_schema.dict(exclude_unset=True)
+
+            menu_ids: List[str] = update_data.pop("perms", None)
+            if menu_ids is not None:
+                role.perms = await self._get_menus(session, menu_ids)
+
+            for field in SysRole.__table__.columns.keys():
+                if field in update_data:
+                    setattr(role, field, update_data[field])
+
+            session.add(role)
+            await session.commit()
+            return role
+
+    async def delete(self, identity: str) -> None:
+        """
+        通过id删除角色
+        :param identity: 待删除角色的id
+        :return:
+        """
+        async with self.session_factory() as session:
+            # sys_role_menu 没有级联删除，先在同一事务中删除角色的菜单关联
+            await session.execute(delete(role_menu).where(role_menu.c.role_id == identity))
+            stmt: Delete = delete(SysRole).where(SysRole.id == identity)
+            await session.execute(stmt)
+            await session.commit()
+
+    async def get_menu_ids(self, identity: str) -> List[str]:
+        """
+        查询角色已分配的菜单id
+        :param identity: 角色id
+        :return:
+        """
+        async with self.session_factory() as session:
+            stmt: Select = select(role_menu.c.menu_id).where(role_menu.c.role_id == identity)
+            result: Result = await session.execute(stmt)
+            return result.scalars().all()
+
+    @staticmethod
+    async def _get_menus(session: AsyncSession, menu_ids: List[str]) -> List[SysMenu]:
+        """ 通过id列表查询菜单 """
+        stmt: Select = select(SysMenu).where(SysMenu.id.in_(menu_ids))
+        result: Result = await session.execute(stmt)
+        return result.scalars().all()
@@ -2,16 +2,51 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/3/3 10:16
 # @Description   :
-from typing import Callable, ContextManager, Optional, List, Union, Dict, Any
+from typing import Callable, ContextManager, AsyncContextManager, Optional, List, Union, Dict, Any, Set, Tuple, \
+    Sequence, AsyncIterator
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from fastapi import HTTPException, status
+from sqlalchemy import Column
+from sqlalchemy.engine.result import Result, Row
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy.sql import select, Select, delete, Delete, insert
+from sqlalchemy.ext.asyncio import AsyncResult
+from sqlalchemy.ext.asyncio.session import AsyncSession
 
-from stardew.models.system import SysUser, SysRole
+from stardew.core.db.filters import apply_filters
+from stardew.core.db.pagination import keyset
+from stardew.common.utils import StringUtil
+from stardew.models.system import SysUser, SysRole, SysMenu, user_role, role_menu
 from stardew.schemas.system import UserCreateSchema, UserUpdateSchema
 
 
+def _build_bulk_rows(
+        users: Sequence[Dict[str, Any]],
+        role_ids: Set[str]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """
+    构造批量插入的数据
+    多行insert要求每行的字段一致，未填写的字段使用列的默认值；不存在的角色id直接忽略，与单个创建时一致
+    :param users: 用户数据，id需已生成，roles为角色id列表
+    :param role_ids: 存在的角色id
+    :return: (sys_user的行, sys_user_role的行)
+    """
+    user_rows: List[Dict[str, Any]] = []
+    user_role_rows: List[Dict[str, str]] = []
+    for user in users:
+        row: Dict[str, Any] = {}
+        for column in SysUser.__table__.columns:
+            if column.key in user:
+                row[column.key] = user[column.key]
+            elif column.default is not None and column.default.is_scalar:
+                row[column.key] = column.default.arg
+        user_rows.append(row)
+        for role_id in set(user.get("roles") or ()) & role_ids:
+            user_role_rows.append({"user_id": row["id"], "role_id": role_id})
+    return user_rows, user_role_rows
+
+
 class UserRepository:
 
     def __init__(self, session_factory: Callable[..., ContextManager[Session]]) -> None:
@@ -26,7 +61,7 @@ class UserRepository:
         """
         offset: int = page_no * page_size
         with self.session_factory() as session:
-            return session.query(SysUser).offset(offset).limit(page_size).all()
+            return session.query(SysUser).order_by(SysUser.id).offset(offset).limit(page_size).all()
 
     def get_by_id(self, identity: str) -> Optional[SysUser]:
         with self.session_factory() as session:
@@ -106,3 +141,203 @@ class UserRepository:
             user: SysUser = session.query(SysUser).get(ident=identity)
             session.delete(user)
             session.commit()
+
+
+class AsyncUserRepository:
+
+    def __init__(self, session_factory: Callable[..., AsyncContextManager[AsyncSession]]) -> None:
+        self.session_factory = session_factory
+
+    async def get_multi(self, page_no: Optional[int] = 0, page_size: Optional[int] = 100) -> List[SysUser]:
+        """
+        查询用户列表
+        :param page_no: 页码
+        :param page_size: 每页数据
+        :return: 分页后的数据
+        """
+        offset: int = page_no * page_size
+        async with self.session_factory() as session:
+            stmt: Select = select(SysUser).order_by(SysUser.id).offset(offset).limit(page_size)
+            result: Result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def get_after(self, after: Optional[str] = None, page_size: Optional[int] = 100) -> List[SysUser]:
+        """
+        按id顺序查询用户列表(keyset分页)，多返回一条用于判断是否还有下一页
+        :param after: 上一页最后一条数据的id，为None时从头开始
+        :param page_size: 每页数据
+        :return:
+        """
+        async with self.session_factory() as session:
+            result: Result = await session.execute(keyset(select(SysUser), SysUser.id, after, page_size))
+            return result.scalars().all()
+
+    async def filter(self, where_clause: Dict[str, Any], order_by: Optional[Sequence[str]] = None) -> List[SysUser]:
+        """
+        按条件查询用户，格式参考 stardew.core.db.filters
+        :param where_clause: 查询条件，如 {"status": 0, "id__in": [...]}
+        :param order_by: 排序列，列名前加 - 表示降序
+        :return:
+        """
+        stmt: Select = apply_filters(select(SysUser), SysUser, where_clause, order_by)
+        async with self.session_factory() as session:
+            result: Result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def stream(self, columns: Sequence[Column], chunk_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+        """
+        使用服务端游标按id顺序分批读取用户，用于导出
+        :param columns: 读取的列
+        :param chunk_size: 每批的行数
+        :return: 每次返回一批数据
+        """
+        stmt: Select = select(*columns).order_by(SysUser.id)
+        async with self.session_factory() as session:
+            result: AsyncResult = await session.stream(stmt)
+            async for rows in result.partitions(chunk_size):
+                yield rows
+
+    async def get_by_id(self, identity: str) -> Optional[SysUser]:
+        async with self.session_factory() as session:
+            return await session.get(SysUser, ident=identity)
+
+    async def get_by_email(self, email: str) -> Optional[SysUser]:
+        """
+        通过邮箱查找用户
+        :param email: 用户邮箱
+        :return:
+        """
+        async with self.session_factory() as session:
+            stmt: Select = select(SysUser).where(SysUser.email == email).limit(1)
+            result: Result = await session.execute(stmt)
+            return result.scalars().first()
+
+    async def get_login_info(self, email: str) -> Optional[Tuple[SysUser, Set[str], Set[str]]]:
+        """
+        登录时使用: 一次查询获取用户、其所有角色名以及去重后的权限字符串
+        :param email: 用户邮箱
+        :return: (用户, 角色名集合, 权限集合)，用户不存在时返回None
+        """
+        stmt: Select = (
+            select(SysUser, SysRole.name, SysMenu.perm)
+            .outerjoin(user_role, user_role.c.user_id == SysUser.id)
+            .outerjoin(SysRole, SysRole.id == user_role.c.role_id)
+            .outerjoin(role_menu, role_menu.c.role_id == SysRole.id)
+            .outerjoin(SysMenu, SysMenu.id == role_menu.c.menu_id)
+            .where(SysUser.email == email)
+        )
+        async with self.session_factory() as session:
+            result: Result = await session.execute(stmt)
+            rows: List = result.all()
+        if not rows:
+            return None
+        roles: Set[str] = {role_name for _, role_name, _ in rows if role_name is not None}
+        perms: Set[str] = {perm for _, _, perm in rows if perm}
+        return rows[0][0], roles, perms
+
+    async def add(self, create_schema: Union[UserCreateSchema, Dict[str, Any]]) -> None:
+        """
+        创建user
+        :param create_schema: 创建用户所需的数据
+        :return:
+        """
+        async with self.session_factory() as session:
+            input_data: Dict
+            if isinstance(create_schema, dict):
+                input_data = create_schema
+            else:
+                input_data = create_schema.dict(exclude_unset=True)
+
+            # 处理角色信息 直接操作关联表
+            role_ids: List[str] = input_data.pop("roles", None)
+            user = SysUser(**input_data)
+            # 新建对象的关系集合为空，赋值时不会触发懒加载
+            user.roles = await self._get_roles(session, role_ids) if role_ids else []
+            session.add(user)
+            await session.commit()
+
+    async def update(self, identity: str, update_schema: Union[UserUpdateSchema, Dict[str, Any]]) -> SysUser:
+        """
+        更新user
+        :param identity: 待更新的user对象的id
+        :param update_schema: 更新所需的数据
+        :return: 更新后的user
+        """
+        async with self.session_factory() as session:
+            # 异步会话中不能懒加载，修改角色前需要预先加载原有的角色集合
+            user: SysUser = await session.get(SysUser, ident=identity, options=[selectinload(SysUser.roles)])
+            if user is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="未找到相关用户")
+            if isinstance(update_schema, dict):
+                update_data = update_schema
+            else:
+                update_data = update_schema.dict(exclude_unset=True)
+
+            # 处理角色信息
+            role_ids: List[str] = update_data.pop("roles", None)
+            if role_ids is not None:
+                user.roles = await self._get_roles(session, role_ids)
+
+            for field in SysUser.__table__.columns.keys():
+                if field in update_data:
+                    setattr(user, field, update_data[field])
+
+            session.add(user)
+            await session.commit()
+            return user
+
+    async def get_existing_emails(self, emails: Sequence[str]) -> Set[str]:
+        """
+        批量校验邮箱，一次查询返回其中已被使用的邮箱
+        :param emails: 待校验的邮箱
+        :return:
+        """
+        if not emails:
+            return set()
+        async with self.session_factory() as session:
+            stmt: Select = select(SysUser.email).where(SysUser.email.in_(emails))
+            result: Result = await session.execute(stmt)
+            return set(result.scalars().all())
+
+    async def add_many(self, users: Sequence[Dict[str, Any]]) -> List[str]:
+        """
+        批量创建用户，用户及用户角色各使用一条多行insert，在同一事务中提交
+        :param users: 用户数据，字段同 UserCreateSchema，密码需已加密
+        :return: 新用户的id，与传入顺序一致
+        """
+        if not users:
+            return []
+        users = [{**user, "id": StringUtil.get_unique_key()} for user in users]
+        wanted: Set[str] = {role_id for user in users for role_id in user.get("roles") or ()}
+        async with self.session_factory() as session:
+            role_ids: Set[str] = set()
+            if wanted:
+                stmt: Select = select(SysRole.id).where(SysRole.id.in_(wanted))
+                result: Result = await session.execute(stmt)
+                role_ids = set(result.scalars().all())
+            user_rows, user_role_rows = _build_bulk_rows(users, role_ids)
+            await session.execute(insert(SysUser).values(user_rows))
+            if user_role_rows:
+                await session.execute(insert(user_role).values(user_role_rows))
+            await session.commit()
+        return [user["id"] for user in users]
+
+    async def delete(self, identity: str) -> None:
+        """
+        通过删除用户
+        :param identity: 待删除用户的id
+        :return:
+        """
+        async with self.session_factory() as session:
+            # 数据库中的 sys_user_role 未必有级联删除，先在同一事务中删除用户的角色关联
+            await session.execute(delete(user_role).where(user_role.c.user_id == identity))
+            stmt: Delete = delete(SysUser).where(SysUser.id == identity)
+            await session.execute(stmt)
+            await session.commit()
+
+    @staticmethod
+    async def _get_roles(session: AsyncSession, role_ids: List[str]) -> List[SysRole]:
+        """ 通过id列表查询角色 """
+        stmt: Select = select(SysRole).where(SysRole.id.in_(role_ids))
+        result: Result = await session.execute(stmt)
+        return result.scalars().all()
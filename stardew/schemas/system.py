@@ -4,7 +4,7 @@
 # @Description   :
 from typing import Optional, Set, List
 
-from pydantic import EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field
 from pydantic_sqlalchemy import sqlalchemy_to_pydantic
 
 from stardew.models.system import SysUser, SysRole, SysMenu
@@ -65,6 +65,23 @@ class UserUpdateSchema(_UserValidationSchema):
     remark: Optional[str] = Field(None, max_length=100, description="账号备注")
 
 
+class UserImportRowSchema(BaseModel):
+    """ 批量导入中单行的结果 """
+    line: int = Field(..., description="行号")
+    status: str = Field(..., description="created:已创建 skipped:邮箱已存在，跳过 failed:数据有误")
+    email: Optional[str] = Field(None, description="用户邮箱")
+    id: Optional[str] = Field(None, description="新用户的id")
+    detail: Optional[str] = Field(None, description="跳过或失败的原因")
+
+
+class UserImportReportSchema(BaseModel):
+    """ 批量导入结果 """
+    created: int = Field(0, description="创建数")
+    skipped: int = Field(0, description="跳过数")
+    failed: int = Field(0, description="失败数")
+    rows: List[UserImportRowSchema] = Field([], description="每行的结果，按行号排序")
+
+
 class _RoleValidationSchema(BaseValidationSchema):
     status: Optional[StatusEnum] = Field(StatusEnum.enable, description="角色状态，0正常，1停用")
     perms: Optional[List[str]] = Field(None, description="菜单权限id列表")
@@ -90,7 +107,7 @@ class _MenuValidationSchema(BaseValidationSchema):
 
 class MenuCreateSchema(_MenuValidationSchema):
     name: str = Field(..., description="菜单、按钮名称")
-    parent_id: int = Field(..., ge=0, description=">=0，表示最高层级菜单")
+    parent_id: str = Field(..., max_length=32, description="父菜单id，'0'表示最高层级菜单")
     order_num: int = Field(..., description="显示顺序")
     path: str = Field(None, description="对应路由地址")
     component: str = Field(None, description="组件路径")
@@ -100,7 +117,7 @@ class MenuCreateSchema(_MenuValidationSchema):
 
 class MenuUpdateSchema(_MenuValidationSchema):
     name: Optional[str] = Field(None, description="菜单、按钮名称")
-    parent_id: Optional[int] = Field(None, ge=0, description=">=0，表示最高层级菜单")
+    parent_id: Optional[str] = Field(None, max_length=32, description="父菜单id，'0'表示最高层级菜单")
     order_num: Optional[int] = Field(None, description="显示顺序")
     path: Optional[str] = Field(None, description="对应路由地址")
     component: Optional[str] = Field(None, description="组件路径")
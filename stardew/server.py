@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 08:00
+# @Description   : 多进程启动入口
+"""
+生产环境的启动入口，开发环境仍使用 python -m stardew.runserver。
+主进程只负责创建、监控及停止工作进程，不导入应用:
+    - 工作进程fork之后才导入应用，redis连接池、数据库引擎、执行器及日志线程都在各工作进程内创建，
+      进程间不会共享连接，也不会因fork丢失后台线程
+    - 每个工作进程各自监听同一端口(SO_REUSEPORT)，由内核分配新连接
+    - 安装了uvloop及httptools时分别用作事件循环及http解析器，否则使用asyncio及h11
+    - 启动时预先建立数据库连接(DB_POOL_WARMUP)
+    - 收到SIGTERM/SIGINT时通知所有工作进程停止接受新连接，等待进行中的请求完成(最长 --graceful-timeout 秒)
+      后释放资源退出，超时仍未退出的工作进程被强制结束
+    - 工作进程异常退出时重新创建。启动阶段即退出(如数据库不可用)时停止所有工作进程，主进程以非0状态退出
+
+运行方式:
+    python -m stardew.server --workers 4 --port 8000 --limit-concurrency 1000
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import traceback
+from importlib.util import find_spec
+from types import FrameType
+from typing import Dict, Optional, Tuple
+
+import uvicorn
+from loguru import logger
+
+from stardew.settings import settings
+
+# 工作进程存活不足该秒数就退出时视为启动失败，此外应用startup失败时退出码为3
+_BOOT_SECONDS: float = 5
+# 除等待进行中的请求外，留给工作进程释放资源的秒数
+_SHUTDOWN_SECONDS: float = 10
+
+
+def bind_socket(host: str, port: int, backlog: Optional[int] = None) -> socket.socket:
+    """
+    创建设置了 SO_REUSEPORT 的socket，多个进程可以同时监听同一端口
+    :param host: 监听地址
+    :param port: 端口，为0时由系统分配
+    :param backlog: 监听队列长度，为空时只绑定不监听
+    :return:
+    """
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    if backlog is not None:
+        sock.listen(backlog)
+    return sock
+
+
+class WorkerServer(uvicorn.Server):
+    """ 主进程已退出(如被SIGKILL)时自行退出，避免遗留孤儿进程 """
+
+    def __init__(self, config: uvicorn.Config, master: int) -> None:
+        super().__init__(config)
+        self.master = master
+
+    async def on_tick(self, counter: int) -> bool:
+        if os.getppid() != self.master:
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+
+def serve(index: int, args: argparse.Namespace, master: int) -> int:
+    """
+    工作进程
+    :param index: 工作进程序号，从1开始
+    :param args: 命令行参数
+    :param master: 主进程pid
+    :return: 退出码
+    """
+    # fork时继承了主进程的信号处理函数，恢复默认处理，导入应用期间收到信号直接退出
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+    if args.workers > 1:
+        root, ext = os.path.splitext(settings.LOG_FILENAME)
+        settings.LOG_FILENAME = f"{root}.{index}{ext}"
+    # 密码哈希及验证码执行器的线程/进程数默认为cpu核数，由各工作进程均分
+    share: int = max(1, (os.cpu_count() or 1) // args.workers)
+    for name in ("PASSWORD_HASH_WORKERS", "CAPTCHA_WORKERS"):
+        if getattr(settings, name) is None:
+            setattr(settings, name, share)
+
+    from stardew.runserver import app
+
+    config = uvicorn.Config(
+        app,
+        loop="uvloop" if find_spec("uvloop") else "asyncio",
+        http="httptools" if find_spec("httptools") else "h11",
+        lifespan="on",
+        limit_concurrency=args.limit_concurrency,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=args.access_log,
+    )
+    server = WorkerServer(config, master)
+    sock: socket.socket = bind_socket(args.host, args.port, args.backlog)
+    # 验证码等进程池由工作进程fork创建，关闭它们继承的监听socket。
+    # 否则工作进程退出时socket仍在监听，内核继续向其分配连接，却没有进程accept
+    os.register_at_fork(after_in_child=sock.close)
+    logger.info(f"Worker {index} [{os.getpid()}] serving with loop={config.loop} http={config.http}")
+    # uvicorn正常退出后会重新发出收到的信号，忽略它以便写完日志
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_IGN)
+    try:
+        server.run(sockets=[sock])
+    finally:
+        # 移除输出时写完日志队列。工作进程以 os._exit 退出，不会执行atexit
+        logger.remove()
+    return 0 if server.started else 3
+
+
+class Supervisor:
+    """
+    主进程: 创建、监控及停止工作进程
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        # pid -> (序号, 启动时间)
+        self.workers: Dict[int, Tuple[int, float]] = {}
+        # 停止时强制结束工作进程的时间
+        self.deadline: Optional[float] = None
+        self.exit_code: int = 0
+
+    def spawn(self, index: int) -> None:
+        """ fork一个工作进程 """
+        master: int = os.getpid()
+        pid: int = os.fork()
+        if pid == 0:
+            code: int = 1
+            try:
+                code = serve(index, self.args, master)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        self.workers[pid] = (index, time.monotonic())
+
+    def stop(self, signum: Optional[int] = None, frame: Optional[FrameType] = None) -> None:
+        """ 通知所有工作进程优雅退出 """
+        if self.deadline is not None:
+            return
+        logger.info(f"Stopping {len(self.workers)} workers")
+        self.deadline = time.monotonic() + self.args.graceful_timeout + _SHUTDOWN_SECONDS
+        self.kill(signal.SIGTERM)
+
+    def kill(self, signum: int) -> None:
+        for pid in self.workers:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reap(self) -> None:
+        """ 回收已退出的工作进程，未在停止时退出的重新创建 """
+        while self.workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            index, started = self.workers.pop(pid)
+            code: int = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+            if self.deadline is not None:
+                continue
+            if code == 3 or time.monotonic() - started < _BOOT_SECONDS:
+                logger.error(f"Worker {index} [{pid}] failed to boot with status {code}")
+                self.exit_code = 1
+                self.stop()
+                continue
+            logger.warning(f"Worker {index} [{pid}] exited with status {code}, restarting")
+            self.spawn(index)
+
+    def run(self) -> int:
+        """
+        启动工作进程并等待其全部退出
+        :return: 退出码
+        """
+        # 主进程先绑定(不监听)端口: 端口被占用时立即失败，端口为0时确定各工作进程使用的端口
+        reservation: socket.socket = bind_socket(self.args.host, self.args.port)
+        self.args.port = reservation.getsockname()[1]
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"Starting {self.args.workers} workers on {self.args.host}:{self.args.port}")
+        for index in range(1, self.args.workers + 1):
+            self.spawn(index)
+        while self.workers:
+            self.reap()
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                logger.error(f"Killing {len(self.workers)} workers after graceful timeout")
+                self.kill(signal.SIGKILL)
+                self.deadline = float("inf")
+            time.sleep(0.1)
+        reservation.close()
+        return self.exit_code
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVER_HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT, help="端口")
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS or os.cpu_count() or 1,
+                        help="工作进程数")
+    parser.add_argument("--limit-concurrency", type=int, default=settings.SERVER_LIMIT_CONCURRENCY,
+                        help="每个工作进程同时处理的最大连接数，超过时返回503")
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG, help="每个工作进程监听队列的长度")
+    parser.add_argument("--keep-alive", type=int, default=settings.SERVER_KEEP_ALIVE,
+                        help="keep-alive连接的空闲超时秒数")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT,
+                        help="停止时等待进行中的请求完成的最长秒数")
+    parser.add_argument("--access-log", action="store_true", help="输出uvicorn的访问日志")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    sys.exit(Supervisor(parse_args()).run())
@@ -3,22 +3,23 @@
 # @CreatedTime   : 2021/2/25 18:22
 # @Description   :
 import base64
-from io import BytesIO
-from random import randint
 from datetime import datetime
 from datetime import timedelta
-from typing import Set, Optional
-from string import ascii_letters, digits
+from typing import Set, Optional, Tuple
 
 from aioredis import Redis
 from fastapi import HTTPException, status
-from captcha.image import ImageCaptcha, Image
 
 from stardew.settings import settings
 from stardew.models.system import SysUser
-from stardew.core.db.crud import CRUDService
+from stardew.repository.system import AsyncUserRepository
 from stardew.common.constants import Constant
 from stardew.core.web.schemas import CaptchaInfo
+from stardew.core.hasher import PasswordHasher
+from stardew.core.captcha import CaptchaEngine
+from stardew.core.redis import compare_and_delete
+from stardew.core.session import SessionUser, write_session, revoke_session, revoke_user_sessions
+from stardew.core.permission import PermissionRegistry
 from stardew.schemas.system import UserSimpleSchema
 from stardew.services.common.login import LoginService
 from stardew.common.utils import StringUtil, SecurityUtil
@@ -30,11 +31,17 @@ class LoginServiceImpl(LoginService):
 
     def __init__(
             self,
-            crud: CRUDService,
-            redis: Redis
+            repository: AsyncUserRepository,
+            redis: Redis,
+            registry: PermissionRegistry,
+            hasher: PasswordHasher,
+            captcha_engine: CaptchaEngine
     ) -> None:
-        self.crud = crud
+        self.repository = repository
         self.redis = redis
+        self.registry = registry
+        self.hasher = hasher
+        self.captcha_engine = captcha_engine
 
     async def login(
             self,
@@ -42,64 +49,79 @@ class LoginServiceImpl(LoginService):
             password: str
     ) -> BearerToken:
         """ 登录逻辑 """
-        query_set = self.crud.filter(where_clause={"email": email})
-        if len(query_set) == 0:
+        # 用户、角色、权限在一次查询中全部获取
+        login_info: Optional[Tuple[SysUser, Set[str], Set[str]]] = await self.repository.get_login_info(email=email)
+        if login_info is None:
             raise HTTPException(status.HTTP_404_NOT_FOUND, "用户不存在")
-        user: SysUser = query_set[0]
-        if not SecurityUtil.verify_password(password, user.password):
+        user, roles, perms = login_info
+        if not await self.hasher.verify(password, user.password):
             raise HTTPException(status.HTTP_400_BAD_REQUEST, "用户名或密码错误")
-        roles: Set[str] = {role.name for role in user.roles}
-        perms: Set[str] = {"*:*:*"} if user.is_super else {
-            menu.perm for role in user.roles for menu in role.perms if menu.perm != ""
-        }
+        if user.is_super:
+            perms = {"*:*:*"}
+
+        perm_mask: int = await self.registry.compile(self.redis, perms)
 
         schema: UserSimpleSchema = UserSimpleSchema.from_orm(user)
         login_user: LoginUser = LoginUser(
             login_time=datetime.utcnow(),
             sys_user=schema,
             roles=roles,
-            perms=perms
+            perm_mask=format(perm_mask, "x"),
+            perm_generation=self.registry.generation
         )
         uid: str = StringUtil.get_unique_key()
-        await self.redis.set(key=Constant.LOGIN_REDIS_KEY + uid, value=login_user.json())
+        await write_session(self.redis, uid, login_user)
         token: str = SecurityUtil.create_token(subject=uid)
         return BearerToken(access_token=token, token_type=settings.JWT_PREFIX)
 
+    async def logout(
+            self,
+            session_user: SessionUser,
+            everywhere: bool = False
+    ) -> None:
+        """ 注销登录 """
+        if everywhere:
+            await revoke_user_sessions(self.redis, session_user.user_id)
+        else:
+            await revoke_session(self.redis, session_user)
+
     async def create_captcha(
             self,
-            width: Optional[int] = 160,
-            height: Optional[int] = 60,
+            width: Optional[int] = None,
+            height: Optional[int] = None,
     ) -> CaptchaInfo:
         """ 创建验证码 """
-        width = width
-        height = height
-        char: str = ""
-        allowed_letters: str = digits + ascii_letters
-        for i in range(settings.CAPTCHA_CHAR_LENGTH):
-            index: int = randint(0, len(allowed_letters) - 1)
-            char += allowed_letters[index]
-        image_captcha: ImageCaptcha = ImageCaptcha(width, height)
-        image: Image = image_captcha.generate_image(char)
-        f: BytesIO = BytesIO()
-        image.save(f, format='png')
-        base64_str: str = base64.b64encode(f.getvalue()).decode(Constant.UTF8)
-        f.close()
+        key, image = await self.create_captcha_image(width, height)
+        return CaptchaInfo(uid=key, image=base64.b64encode(image).decode(Constant.UTF8))
+
+    async def create_captcha_image(
+            self,
+            width: Optional[int] = None,
+            height: Optional[int] = None,
+    ) -> Tuple[str, bytes]:
+        """ 创建验证码，默认尺寸的验证码取自预渲染池 """
+        if (width or settings.CAPTCHA_WIDTH, height or settings.CAPTCHA_HEIGHT) == \
+                (settings.CAPTCHA_WIDTH, settings.CAPTCHA_HEIGHT):
+            char, image = await self.captcha_engine.get()
+        else:
+            char, image = await self.captcha_engine.render(width, height)
         key: str = StringUtil.get_unique_key()
         expired_minutes: timedelta = timedelta(minutes=settings.CAPTCHA_EXPIRED_MINUTES)
-        await self.redis.set(key=Constant.CAPTCHA_REDIS_KEY + key, value=char, expire=expired_minutes.seconds)
-
-        return CaptchaInfo(uid=key, image=base64_str)
+        # 不区分大小写，统一保存为小写，校验时在redis中直接比较
+        await self.redis.set(key=Constant.CAPTCHA_REDIS_KEY + key, value=char.lower(), expire=expired_minutes.seconds)
+        return key, image
 
     async def verify_captcha(
             self,
             uid: str,
             code: str
     ) -> None:
-        """ 校验验证码, 不存在或不一致时抛出错误,否则删除该键 """
-        redis_key: str = Constant.CAPTCHA_REDIS_KEY + uid
-        redis_code = await self.redis.get(redis_key, encoding=Constant.UTF8)
-        if redis_code is None:
+        """
+        校验验证码, 不存在或不一致时抛出错误,否则删除该键。
+        比较和删除在redis中原子地完成，同一个验证码并发提交时只有一个请求能通过
+        """
+        matched: Optional[bool] = await compare_and_delete(self.redis, Constant.CAPTCHA_REDIS_KEY + uid, code.lower())
+        if matched is None:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="验证码已失效")
-        if not redis_code.lower() == code.lower():
+        if not matched:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="验证码错误")
-        await self.redis.delete(redis_key)
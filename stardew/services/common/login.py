@@ -2,9 +2,10 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/2/25 14:49
 # @Description   :
-from typing import Optional
+from typing import Optional, Tuple
 from abc import ABC, abstractmethod
 
+from stardew.core.session import SessionUser
 from stardew.core.web.schemas import BearerToken
 from stardew.core.web.schemas import CaptchaInfo
 
@@ -19,6 +20,19 @@ class LoginService(ABC):
     ) -> BearerToken:
         """ 登录逻辑 """
 
+    @abstractmethod
+    async def logout(
+            self,
+            session_user: SessionUser,
+            everywhere: bool = False
+    ) -> None:
+        """
+        注销登录
+        :param session_user: 当前登录信息
+        :param everywhere: 是否注销该用户在所有设备上的登录
+        :return:
+        """
+
     @abstractmethod
     async def create_captcha(
             self,
@@ -32,6 +46,19 @@ class LoginService(ABC):
         :return:
         """
 
+    @abstractmethod
+    async def create_captcha_image(
+            self,
+            width: Optional[int] = None,
+            height: Optional[int] = None,
+    ) -> Tuple[str, bytes]:
+        """
+        创建验证码，返回png原始字节，不做base64编码
+        :param width: 验证码宽度
+        :param height: 验证码高度
+        :return: (redis中的键名, png图片)
+        """
+
     @abstractmethod
     async def verify_captcha(
             self,
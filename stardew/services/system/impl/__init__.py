@@ -3,13 +3,15 @@
 # @CreatedTime   : 2021/2/26 12:58
 # @Description   :
 
-from .user import UserServiceImpl
-from .role import RoleServiceImpl
-from .menu import MenuServiceImpl
+from .user import UserServiceImpl, AsyncUserServiceImpl
+from .role import RoleServiceImpl, AsyncRoleServiceImpl
+from .menu import MenuServiceImpl, AsyncMenuServiceImpl
 
 __all__ = {
     "UserServiceImpl",
-    # "AsyncUserServiceImpl",
+    "AsyncUserServiceImpl",
     "RoleServiceImpl",
-    "MenuServiceImpl"
+    "AsyncRoleServiceImpl",
+    "MenuServiceImpl",
+    "AsyncMenuServiceImpl",
 }
\ No newline at end of file
@@ -2,20 +2,34 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/3/2 14:59
 # @Description   :
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, AsyncIterator, Sequence
 
+from aioredis import Redis
+from pydantic import parse_obj_as
 from fastapi import HTTPException, status
+from sqlalchemy.sql import select, Select, delete, Delete
+from sqlalchemy.engine.result import Result, Row
 
-from stardew.core.db.crud import CRUDService
+from stardew.common.utils import StringUtil
+from stardew.common.constants import Constant
 from stardew.core.web.schemas import TreeNode
-from stardew.models.system import SysMenu
-from stardew.schemas.system import MenuCreateSchema, MenuUpdateSchema
+from stardew.core.menu_tree import MenuTree, MenuRow
+from stardew.core.exporter import schema_columns
+from stardew.core.db.pagination import decode_cursor, split_page
+from stardew.models.system import SysMenu, role_menu
+from stardew.core.db.crud import CRUDService, AsyncCRUDService
+from stardew.schemas.system import MenuCreateSchema, MenuUpdateSchema, MenuSimpleSchema
 from stardew.services.system.menu import MenuService
 
 
-class MenuServiceImpl(MenuService):
+# 构建菜单树所需的列
+_TREE_COLUMNS: Tuple = (SysMenu.id, SysMenu.name, SysMenu.parent_id, SysMenu.order_num)
+
+# 导出的列，与列表接口的字段一致
+_EXPORT_COLUMNS = schema_columns(SysMenu, MenuSimpleSchema)
 
 
+class MenuServiceImpl(MenuService):
 
     def __init__(self, crud: CRUDService):
         self.crud = crud
@@ -41,12 +55,123 @@ class MenuServiceImpl(MenuService):
         return self.crud.delete_by_id(identity=menu_id)
 
     def build_menu_tree(self) -> List[TreeNode]:
-        # 查询最顶级menu即可，其他所有menu会包括与其上级menu
-        menus: List[SysMenu] = self.crud.filter(where_clause={"parent_id": 0})
-        menu_tree: List[TreeNode] = [TreeNode.from_orm(menu) for menu in menus]
-        return menu_tree
+        return parse_obj_as(List[TreeNode], self._load_tree().tree())
+
+    def dump_menu_tree(self) -> Tuple[int, bytes]:
+        tree: MenuTree = self._load_tree()
+        return tree.version, tree.dumps()
+
+    def _load_tree(self) -> MenuTree:
+        """ 一次查询全表构建菜单树 """
+        with self.crud.session_factory() as session:
+            rows: List[MenuRow] = session.execute(select(*_TREE_COLUMNS)).all()
+        tree: MenuTree = MenuTree()
+        tree.load(rows, version=0)
+        return tree
 
     def _check_perm_available(self, perm: str) -> None:
         """ 检测权限字符串是否可用 """
         if len(self.crud.filter(where_clause={"perm": perm})) > 0:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该权限字符串已被占用")
+
+
+class AsyncMenuServiceImpl(MenuService):
+
+    def __init__(self, crud: AsyncCRUDService, tree: MenuTree, redis: Redis):
+        self.crud = crud
+        self.tree = tree
+        self.redis = redis
+
+    async def get_menu_list(self, page_no: Optional[int] = 0, page_size: Optional[int] = 100) -> List[SysMenu]:
+        return await self.crud.get_multi(page_no=page_no, page_size=page_size)
+
+    async def get_menu_page(
+            self,
+            cursor: Optional[str] = None,
+            page_size: Optional[int] = 100
+    ) -> Tuple[List[SysMenu], Optional[str]]:
+        after: Optional[str] = decode_cursor(cursor) if cursor else None
+        return split_page(await self.crud.get_after(after=after, page_size=page_size), page_size)
+
+    async def export_menus(
+            self,
+            chunk_size: Optional[int] = 1000
+    ) -> Tuple[List[str], AsyncIterator[Sequence[Row]]]:
+        return [column.key for column in _EXPORT_COLUMNS], self.crud.stream(columns=_EXPORT_COLUMNS, chunk_size=chunk_size)
+
+    async def get_menu(self, menu_id: str) -> SysMenu:
+        menu: Optional[SysMenu] = await self.crud.get_by_id(identity=menu_id)
+        if menu is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="未能找到相关按钮/菜单")
+        return menu
+
+    async def update_menu(self, menu_id: str, update_schema: MenuUpdateSchema) -> None:
+        # TODO 菜单字段之间的约束
+        await self.crud.update(identity=menu_id, update_schema=update_schema)
+        if update_schema.dict(exclude_unset=True).keys() & {"name", "parent_id", "order_num"}:
+            menu: Optional[SysMenu] = await self.crud.get_by_id(identity=menu_id)
+            if menu is not None:
+                await self._patch_tree(lambda tree: tree.put(menu.id, menu.name, menu.parent_id, menu.order_num))
+
+    async def add_menu(self, create_schema: MenuCreateSchema) -> None:
+        await self._check_perm_available(create_schema.perm)
+        # 提前生成id，以便直接修改菜单树
+        input_data: Dict[str, Any] = create_schema.dict(exclude_unset=True)
+        input_data["id"] = StringUtil.get_unique_key()
+        await self.crud.add(create_schema=input_data)
+        await self._patch_tree(
+            lambda tree: tree.put(input_data["id"], create_schema.name, create_schema.parent_id, create_schema.order_num)
+        )
+
+    async def delete_menu(self, menu_id: str) -> None:
+        # 子菜单由外键级联删除，但 sys_role_menu 没有级联，需要在同一事务中先删除整棵子树的角色关联
+        subtree = select(SysMenu.id).where(SysMenu.id == menu_id).cte(recursive=True)
+        subtree = subtree.union_all(select(SysMenu.id).where(SysMenu.parent_id == subtree.c.id))
+        async with self.crud.session_factory() as session:
+            stmt: Delete = delete(role_menu).where(role_menu.c.menu_id.in_(select(subtree.c.id)))
+            await session.execute(stmt)
+            await session.execute(delete(SysMenu).where(SysMenu.id == menu_id))
+            await session.commit()
+        await self._patch_tree(lambda tree: tree.remove(menu_id))
+
+    async def build_menu_tree(self) -> List[TreeNode]:
+        tree: MenuTree = await self._ensure_tree()
+        return parse_obj_as(List[TreeNode], tree.tree())
+
+    async def dump_menu_tree(self) -> Tuple[int, bytes]:
+        tree: MenuTree = await self._ensure_tree()
+        return tree.version, tree.dumps()
+
+    async def get_role_menus(self, role_id: str) -> List[str]:
+        async with self.crud.session_factory() as session:
+            stmt: Select = select(role_menu.c.menu_id).where(role_menu.c.role_id == role_id)
+            result: Result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def _ensure_tree(self) -> MenuTree:
+        """ 本地菜单树的版本与redis中的不一致时，一次查询全表重新构建 """
+        version: int = int(await self.redis.get(Constant.MENU_TREE_VERSION_REDIS_KEY) or 0)
+        if self.tree.version == version:
+            return self.tree
+        async with self.tree.lock:
+            if self.tree.version != version:
+                async with self.crud.session_factory() as session:
+                    result: Result = await session.execute(select(*_TREE_COLUMNS))
+                    self.tree.load(result.all(), version)
+        return self.tree
+
+    async def _patch_tree(self, patch: Callable[[MenuTree], None]) -> None:
+        """
+        菜单变更后递增版本号。本地菜单树恰好是上一版本时直接修改，否则等待下次读取时重新加载
+        :param patch: 对菜单树的修改
+        :return:
+        """
+        version: int = await self.redis.incr(Constant.MENU_TREE_VERSION_REDIS_KEY)
+        if self.tree.version == version - 1:
+            patch(self.tree)
+            self.tree.version = version
+
+    async def _check_perm_available(self, perm: str) -> None:
+        """ 检测权限字符串是否可用 """
+        if len(await self.crud.filter(where_clause={"perm": perm})) > 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该权限字符串已被占用")
@@ -2,14 +2,21 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/3/2 11:52
 # @Description   :
-from typing import Optional, List
+from typing import Optional, List, Tuple, Dict, AsyncIterator, Sequence
 
 from fastapi import HTTPException, status
+from sqlalchemy.engine.result import Row
 
+from stardew.core.role_menus import RoleMenuCache
+from stardew.core.exporter import schema_columns
+from stardew.core.db.pagination import decode_cursor, split_page
 from stardew.models.system import SysRole
-from stardew.repository.system import RoleRepository
+from stardew.repository.system import RoleRepository, AsyncRoleRepository
 from stardew.services.system.role import RoleService
-from stardew.schemas.system import RoleCreateSchema, RoleUpdateSchema
+from stardew.schemas.system import RoleCreateSchema, RoleUpdateSchema, RoleSimpleSchema
+
+# 导出的列，与列表接口的字段一致
+_EXPORT_COLUMNS = schema_columns(SysRole, RoleSimpleSchema)
 
 
 class RoleServiceImpl(RoleService):
@@ -23,6 +30,15 @@ class RoleServiceImpl(RoleService):
     def get_roles_by_ids(self, identities: List[str]) -> List[SysRole]:
         return self.repository.get_by_ids(identities=identities)
 
+    def get_checked_keys(self, role_id: str) -> Tuple[int, List[str]]:
+        # 同步实现不做缓存，版本号恒为0
+        self.get_role(role_id)
+        return 0, sorted(set(self.repository.get_menu_ids(identity=role_id)))
+
+    def get_checked_keys_delta(self, role_id: str, version: Optional[int] = None) -> Optional[Dict]:
+        current, menu_ids = self.get_checked_keys(role_id)
+        return {"version": current, "checked_keys": menu_ids}
+
     def get_role(self, role_id: str) -> SysRole:
         role: Optional[SysRole] = self.repository.get_by_id(identity=role_id)
         if role is None:
@@ -37,3 +53,74 @@ class RoleServiceImpl(RoleService):
 
     def delete_role(self, identity: str) -> None:
         return self.repository.delete(identity=identity)
+
+
+class AsyncRoleServiceImpl(RoleService):
+
+    def __init__(self, repository: AsyncRoleRepository, cache: RoleMenuCache):
+        self.repository = repository
+        self.cache = cache
+
+    async def get_role_list(self, page_no: Optional[int] = 0, page_size: Optional[int] = 100) -> List[SysRole]:
+        return await self.repository.get_multi(page_no=page_no, page_size=page_size)
+
+    async def get_role_page(
+            self,
+            cursor: Optional[str] = None,
+            page_size: Optional[int] = 100
+    ) -> Tuple[List[SysRole], Optional[str]]:
+        after: Optional[str] = decode_cursor(cursor) if cursor else None
+        return split_page(await self.repository.get_after(after=after, page_size=page_size), page_size)
+
+    async def get_roles_by_ids(self, identities: List[str]) -> List[SysRole]:
+        return await self.repository.get_by_ids(identities=identities)
+
+    async def export_roles(
+            self,
+            chunk_size: Optional[int] = 1000
+    ) -> Tuple[List[str], AsyncIterator[Sequence[Row]]]:
+        return [column.key for column in _EXPORT_COLUMNS], self.repository.stream(columns=_EXPORT_COLUMNS, chunk_size=chunk_size)
+
+    async def get_checked_keys(self, role_id: str) -> Tuple[int, List[str]]:
+        cached: Optional[Tuple[int, List[str]]] = await self.cache.get(role_id)
+        if cached is None:
+            cached = await self._load_checked_keys(role_id)
+        return cached
+
+    async def get_checked_keys_delta(self, role_id: str, version: Optional[int] = None) -> Optional[Dict]:
+        # 轮询时版本号通常不变，只需一次GET
+        current: Optional[int] = await self.cache.version(role_id)
+        if current is not None and current == version:
+            return None
+        delta: Optional[Dict] = await self.cache.delta(role_id, version or 0) if current is not None else None
+        if delta is None:
+            current, menu_ids = await self._load_checked_keys(role_id)
+            if current == version:
+                return None
+            delta = {"version": current, "checked_keys": menu_ids}
+        return delta
+
+    async def _load_checked_keys(self, role_id: str) -> Tuple[int, List[str]]:
+        """ 从数据库加载角色已分配的菜单并写入缓存 """
+        await self.get_role(role_id)
+        menu_ids: List[str] = await self.repository.get_menu_ids(identity=role_id)
+        version: int = await self.cache.replace(role_id, menu_ids)
+        return version, sorted(set(menu_ids))
+
+    async def get_role(self, role_id: str) -> SysRole:
+        role: Optional[SysRole] = await self.repository.get_by_id(identity=role_id)
+        if role is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="未找到相关角色")
+        return role
+
+    async def add_role(self, create_schema: RoleCreateSchema) -> None:
+        return await self.repository.add(create_schema=create_schema)
+
+    async def update_role(self, identity: str, update_schema: RoleUpdateSchema) -> None:
+        role: SysRole = await self.repository.update(identity=identity, update_schema=update_schema)
+        if update_schema.perms is not None:
+            await self.cache.replace(identity, [menu.id for menu in role.perms])
+
+    async def delete_role(self, identity: str) -> None:
+        await self.repository.delete(identity=identity)
+        await self.cache.remove(identity)
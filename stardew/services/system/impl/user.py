@@ -2,15 +2,95 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/2/26 12:58
 # @Description   :
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Union, Tuple, Set, AsyncIterable, AsyncIterator, \
+    Sequence
 
+from aioredis import Redis
 from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine.result import Row
 
+from stardew.common.enums import StatusEnum
+from stardew.core.db.pagination import decode_cursor, split_page
 from stardew.models.system import SysUser, SysRole
-from stardew.common.utils import SecurityUtil
-from stardew.repository.system import UserRepository
+from stardew.common.utils import SecurityUtil, logger
+from stardew.core.hasher import PasswordHasher
+from stardew.core.importer import ImportRecord
+from stardew.core.exporter import schema_columns
+from stardew.core.session import revoke_user_sessions
+from stardew.repository.system import UserRepository, AsyncUserRepository
 from stardew.services.system.user import UserService
-from stardew.schemas.system import UserCreateSchema, UserUpdateSchema
+from stardew.schemas.system import UserCreateSchema, UserUpdateSchema, UserImportRowSchema, UserImportReportSchema, \
+    UserSimpleSchema
+
+# 导出的列，与列表接口的字段一致(不包含密码)
+_EXPORT_COLUMNS = schema_columns(SysUser, UserSimpleSchema)
+
+
+def _add_import_row(report: UserImportReportSchema, line: int, row_status: str, **kwargs: Any) -> None:
+    """ 记录一行的导入结果 """
+    report.rows.append(UserImportRowSchema(line=line, status=row_status, **kwargs))
+    setattr(report, row_status, getattr(report, row_status) + 1)
+
+
+def _validate_import_batch(
+        batch: List[ImportRecord],
+        seen: Set[str],
+        report: UserImportReportSchema
+) -> List[Tuple[int, UserCreateSchema]]:
+    """
+    校验一批记录，解析失败、数据有误及文件内邮箱重复的行直接写入报告
+    :param batch: 记录
+    :param seen: 文件中已出现的邮箱
+    :param report: 导入结果
+    :return: 校验通过的 (行号, 数据)
+    """
+    valid: List[Tuple[int, UserCreateSchema]] = []
+    for record in batch:
+        if record.error is not None:
+            _add_import_row(report, record.line, "failed", detail=record.error)
+            continue
+        try:
+            schema: UserCreateSchema = UserCreateSchema(**record.data)
+        except ValidationError as e:
+            detail: str = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            _add_import_row(report, record.line, "failed", email=record.data.get("email"), detail=detail)
+            continue
+        if schema.email in seen:
+            _add_import_row(report, record.line, "skipped", email=schema.email, detail="文件中邮箱重复")
+            continue
+        seen.add(schema.email)
+        valid.append((record.line, schema))
+    return valid
+
+
+def _exclude_existing(
+        valid: List[Tuple[int, UserCreateSchema]],
+        existing: Set[str],
+        report: UserImportReportSchema
+) -> List[Tuple[int, UserCreateSchema]]:
+    """ 跳过邮箱已注册的行 """
+    remaining: List[Tuple[int, UserCreateSchema]] = []
+    for line, schema in valid:
+        if schema.email in existing:
+            _add_import_row(report, line, "skipped", email=schema.email, detail="该邮箱已注册")
+        else:
+            remaining.append((line, schema))
+    return remaining
+
+
+def _report_inserted(
+        rows: List[Tuple[int, UserCreateSchema]],
+        ids: Optional[List[str]],
+        report: UserImportReportSchema
+) -> None:
+    """ 记录写入结果，ids为None表示整批写入失败 """
+    for index, (line, schema) in enumerate(rows):
+        if ids is None:
+            _add_import_row(report, line, "failed", email=schema.email, detail="写入失败，邮箱可能已被同时注册，请重试")
+        else:
+            _add_import_row(report, line, "created", email=schema.email, id=ids[index])
 
 
 class UserServiceImpl(UserService):
@@ -51,24 +131,96 @@ class UserServiceImpl(UserService):
         if self.repository.get_by_email(email=email) is not None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该邮箱已注册")
 
-#
-# class AsyncUserServiceImpl(UserService):
-#
-#     def __init__(self, crud: AsyncCRUDService):
-#         self.crud = crud
-#
-#     async def get_user_list(self, page_no: Optional[int] = 0, page_size: Optional[int] = 100) -> List[SysUser]:
-#         return await self.crud.get_multi(page_no=page_no, page_size=page_size)
-#
-#     async def get_user(self, identity: str) -> Optional[SysUser]:
-#         return await self.crud.get_by_id(identify=identity)
-#
-#     async def add_user(self, create_schema: UserCreateSchema) -> None:
-#         create_schema.password = SecurityUtil.generate_password(create_schema.password)
-#         return await self.crud.add(create_schema=create_schema)
-#
-#     async def update_user(self, identity, update_schema: UserUpdateSchema) -> None:
-#         return await self.crud.update(identity=identity, update_schema=update_schema)
-#
-#     async def delete_user(self, identity: str) -> None:
-#         return await self.crud.delete_by_id(identity=identity)
+
+class AsyncUserServiceImpl(UserService):
+
+    def __init__(self, repository: AsyncUserRepository, redis: Redis, hasher: PasswordHasher):
+        self.repository = repository
+        self.redis = redis
+        self.hasher = hasher
+
+    async def get_user_list(self, page_no: Optional[int] = 0, page_size: Optional[int] = 100) -> List[SysUser]:
+        return await self.repository.get_multi(page_no=page_no, page_size=page_size)
+
+    async def get_user_page(
+            self,
+            cursor: Optional[str] = None,
+            page_size: Optional[int] = 100
+    ) -> Tuple[List[SysUser], Optional[str]]:
+        after: Optional[str] = decode_cursor(cursor) if cursor else None
+        return split_page(await self.repository.get_after(after=after, page_size=page_size), page_size)
+
+    async def export_users(
+            self,
+            chunk_size: Optional[int] = 1000
+    ) -> Tuple[List[str], AsyncIterator[Sequence[Row]]]:
+        return [column.key for column in _EXPORT_COLUMNS], self.repository.stream(columns=_EXPORT_COLUMNS, chunk_size=chunk_size)
+
+    async def get_user(self, identity: str) -> SysUser:
+        user: Optional[SysUser] = await self.repository.get_by_id(identity=identity)
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="未找到相关用户")
+        return user
+
+    async def add_user(self, create_schema: Union[UserCreateSchema, Dict[str, Any]]) -> None:
+        await self._check_email_available(create_schema.email)
+        create_schema.password = await self.hasher.hash(create_schema.password)
+        return await self.repository.add(create_schema=create_schema)
+
+    async def import_users(
+            self,
+            records: AsyncIterable[ImportRecord],
+            batch_size: Optional[int] = 500
+    ) -> UserImportReportSchema:
+        report: UserImportReportSchema = UserImportReportSchema()
+        seen: Set[str] = set()
+        batch: List[ImportRecord] = []
+        async for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                await self._import_batch(batch, seen, report)
+                batch = []
+        if batch:
+            await self._import_batch(batch, seen, report)
+        report.rows.sort(key=lambda row: row.line)
+        return report
+
+    async def _import_batch(self, batch: List[ImportRecord], seen: Set[str], report: UserImportReportSchema) -> None:
+        valid: List[Tuple[int, UserCreateSchema]] = _validate_import_batch(batch, seen, report)
+        existing: Set[str] = await self.repository.get_existing_emails([schema.email for _, schema in valid])
+        rows: List[Tuple[int, UserCreateSchema]] = _exclude_existing(valid, existing, report)
+        passwords: List[str] = await self.hasher.hash_many(schema.password for _, schema in rows)
+        users: List[Dict[str, Any]] = [
+            {**schema.dict(exclude_unset=True), "password": password}
+            for (_, schema), password in zip(rows, passwords)
+        ]
+        ids: Optional[List[str]] = None
+        try:
+            ids = await self.repository.add_many(users)
+        except IntegrityError as e:
+            logger.warning(f"Batch user import failed: {e.orig}")
+        _report_inserted(rows, ids, report)
+
+    async def update_user(
+            self,
+            identity: str,
+            update_schema: Union[UserUpdateSchema, Dict[str, Any]],
+    ) -> SysUser:
+        user: SysUser = await self.repository.update(identity=identity, update_schema=update_schema)
+        if user.status != StatusEnum.enable:
+            # 用户被禁用后注销其所有登录，各进程缓存的登录信息也立即失效
+            await revoke_user_sessions(self.redis, user.id)
+        return user
+
+    async def delete_user(self, identity: str) -> None:
+        await self.repository.delete(identity=identity)
+        await revoke_user_sessions(self.redis, identity)
+
+    async def _check_email_available(self, email: str):
+        """
+        校验email是否可用
+        :param email: 目标email
+        :return:
+        """
+        if await self.repository.get_by_email(email=email) is not None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该邮箱已注册")
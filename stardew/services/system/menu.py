@@ -2,9 +2,11 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/3/2 14:32
 # @Description   :
-from typing import List, Optional
+from typing import List, Optional, Tuple, AsyncIterator, Sequence
 from abc import ABC, abstractmethod
 
+from sqlalchemy.engine.result import Row
+
 from stardew.models.system import SysMenu
 from stardew.schemas.system import MenuCreateSchema, MenuUpdateSchema
 from stardew.core.web.schemas import TreeNode
@@ -26,6 +28,30 @@ class MenuService(ABC):
         """
         pass
 
+    async def get_menu_page(
+            self,
+            cursor: Optional[str] = None,
+            page_size: Optional[int] = 100
+    ) -> Tuple[List[SysMenu], Optional[str]]:
+        """
+        获取菜单列表(游标分页)。页码较大时耗时不随页码增长。只有异步实现
+        :param cursor: 上一次返回的游标，为空时从第一页开始
+        :param page_size: 每页数量
+        :return: (分页数据, 下一页游标，没有下一页时为None)
+        """
+        raise NotImplementedError
+
+    async def export_menus(
+            self,
+            chunk_size: Optional[int] = 1000
+    ) -> Tuple[List[str], AsyncIterator[Sequence[Row]]]:
+        """
+        分批读取全部菜单，用于流式导出。只有异步实现
+        :param chunk_size: 每批的行数
+        :return: (字段名, 分批读取的数据)
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def get_menu(self, menu_id: str) -> SysMenu:
         """
@@ -69,6 +95,13 @@ class MenuService(ABC):
         :return:
         """
 
+    @abstractmethod
+    def dump_menu_tree(self) -> Tuple[int, bytes]:
+        """
+        获取序列化后的菜单树，可直接作为响应内容
+        :return: (版本号, json)
+        """
+
     @abstractmethod
     def get_role_menus(self, role_id: str) -> List[str]:
         """
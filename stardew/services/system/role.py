@@ -2,9 +2,11 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/3/2 11:32
 # @Description   :
-from typing import Optional, List
+from typing import Optional, List, Tuple, Dict, AsyncIterator, Sequence
 from abc import ABC, abstractmethod
 
+from sqlalchemy.engine.result import Row
+
 from stardew.models.system import SysRole
 from stardew.schemas.system import RoleCreateSchema, RoleUpdateSchema
 
@@ -25,6 +27,47 @@ class RoleService(ABC):
         """
         pass
 
+    async def get_role_page(
+            self,
+            cursor: Optional[str] = None,
+            page_size: Optional[int] = 100
+    ) -> Tuple[List[SysRole], Optional[str]]:
+        """
+        获取角色列表(游标分页)。页码较大时耗时不随页码增长。只有异步实现
+        :param cursor: 上一次返回的游标，为空时从第一页开始
+        :param page_size: 每页数量
+        :return: (分页数据, 下一页游标，没有下一页时为None)
+        """
+        raise NotImplementedError
+
+    async def export_roles(
+            self,
+            chunk_size: Optional[int] = 1000
+    ) -> Tuple[List[str], AsyncIterator[Sequence[Row]]]:
+        """
+        分批读取全部角色，用于流式导出。只有异步实现
+        :param chunk_size: 每批的行数
+        :return: (字段名, 分批读取的数据)
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_checked_keys(self, role_id: str) -> Tuple[int, List[str]]:
+        """
+        获取角色已分配的菜单id。角色不存在时抛出HttpException
+        :param role_id: 角色id
+        :return: (版本号, 菜单id列表)
+        """
+
+    @abstractmethod
+    def get_checked_keys_delta(self, role_id: str, version: Optional[int] = None) -> Optional[Dict]:
+        """
+        获取角色已分配菜单自某版本以来的变更。角色不存在时抛出HttpException
+        :param role_id: 角色id
+        :param version: 客户端持有的版本号，为空时返回全量数据
+        :return: 没有变化时返回None; 否则返回 {"version", "added", "removed"} 或全量的 {"version", "checked_keys"}
+        """
+
     @abstractmethod
     def get_roles_by_ids(self, identities: List[str]) -> List[SysRole]:
         """
@@ -2,11 +2,14 @@
 # @Author        : Yao YuHang
 # @CreatedTime   : 2021/2/26 12:52
 # @Description   :
-from typing import List, Optional, Union, Any, Dict
+from typing import List, Optional, Union, Any, Dict, Tuple, AsyncIterable, AsyncIterator, Sequence
 from abc import ABC, abstractmethod
 
+from sqlalchemy.engine.result import Row
+
 from stardew.models.system import SysUser, SysRole
-from stardew.schemas.system import UserCreateSchema, UserUpdateSchema
+from stardew.core.importer import ImportRecord
+from stardew.schemas.system import UserCreateSchema, UserUpdateSchema, UserImportReportSchema
 
 
 class UserService(ABC):
@@ -28,6 +31,30 @@ class UserService(ABC):
         """
         pass
 
+    async def get_user_page(
+            self,
+            cursor: Optional[str] = None,
+            page_size: Optional[int] = 100
+    ) -> Tuple[List[SysUser], Optional[str]]:
+        """
+        获取用户列表(游标分页)。页码较大时耗时不随页码增长。只有异步实现
+        :param cursor: 上一次返回的游标，为空时从第一页开始
+        :param page_size: 每页数量
+        :return: (分页数据, 下一页游标，没有下一页时为None)
+        """
+        raise NotImplementedError
+
+    async def export_users(
+            self,
+            chunk_size: Optional[int] = 1000
+    ) -> Tuple[List[str], AsyncIterator[Sequence[Row]]]:
+        """
+        分批读取全部用户，用于流式导出。只有异步实现
+        :param chunk_size: 每批的行数
+        :return: (字段名, 分批读取的数据)
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def get_user(self, identity: str) -> SysUser:
         """
@@ -46,6 +73,19 @@ class UserService(ABC):
         """
         pass
 
+    async def import_users(
+            self,
+            records: AsyncIterable[ImportRecord],
+            batch_size: Optional[int] = 500
+    ) -> UserImportReportSchema:
+        """
+        批量导入用户，邮箱已存在的行跳过，数据有误的行不影响其他行。只有异步实现
+        :param records: 解析后的记录，参考 stardew.core.importer
+        :param batch_size: 每批处理的行数，每批只查询一次邮箱、执行一次多行insert
+        :return: 导入结果
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def update_user(
             self,
@@ -4,7 +4,7 @@
 # @Description   :
 import os
 import secrets
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseSettings, EmailStr, PostgresDsn, RedisDsn, validator
 
@@ -27,7 +27,8 @@ class Settings(BaseSettings):
     POSTGRES_NAME: str
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
-    SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
+    # 为空时由以上配置拼接为postgresql的URI，也可以直接指定其他数据库(如 sqlite:///stardew.db)
+    SQLALCHEMY_DATABASE_URI: Optional[str] = None
 
     @validator("SQLALCHEMY_DATABASE_URI", pre=True)
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
@@ -42,6 +43,22 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_NAME') or ''}",
         )
 
+    # 异步引擎使用的连接URI，需要异步驱动(asyncpg)
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[str] = None
+
+    @validator("SQLALCHEMY_ASYNC_DATABASE_URI", pre=True)
+    def assemble_async_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
+        if isinstance(v, str):
+            return v
+        return PostgresDsn.build(
+            scheme="postgresql+asyncpg",
+            host=values.get("POSTGRES_HOST"),
+            port=f"{values.get('POSTGRES_PORT')}",
+            user=values.get("POSTGRES_USER"),
+            password=values.get("POSTGRES_PASSWORD"),
+            path=f"/{values.get('POSTGRES_NAME') or ''}",
+        )
+
     # email配置
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = None
@@ -50,6 +67,25 @@ class Settings(BaseSettings):
     SMTP_LICENCE: Optional[str] = None
     EMAIL_SENDER: Optional[EmailStr] = None
     EMAIL_FROM_NAME: Optional[str] = None
+    SMTP_TIMEOUT: Optional[float] = 10
+    # 后台发送邮件的配置。每个连接由一个发送任务持有，登录后在多封邮件间复用
+    MAIL_CONNECTIONS: Optional[int] = 2
+    # 待发送邮件队列容量，队列满时入队会等待
+    MAIL_QUEUE_SIZE: Optional[int] = 10000
+    # 收件人较多时按此数量拆分，每批一次SMTP事务
+    MAIL_BATCH_SIZE: Optional[int] = 50
+    # 临时性失败(断线、4xx)的重试次数及首次重试的等待秒数，之后每次翻倍
+    MAIL_MAX_RETRIES: Optional[int] = 3
+    MAIL_RETRY_BACKOFF: Optional[float] = 1.0
+    # 连接空闲超过此秒数后断开，下次发送时重新登录
+    MAIL_IDLE_TIMEOUT: Optional[float] = 60
+    # 邮件模板配置。编译后的模板缓存到磁盘，目录为空时使用系统临时目录
+    TEMPLATE_BYTECODE_CACHE: Optional[bool] = True
+    TEMPLATE_CACHE_DIR: Optional[str] = None
+    # 获取模板时检查文件是否修改，开发时开启
+    TEMPLATE_AUTO_RELOAD: Optional[bool] = False
+    # 群发邮件渲染结果的缓存条目数，为0时不缓存
+    TEMPLATE_RENDER_CACHE_SIZE: Optional[int] = 256
 
     # redis配置
     REDIS_HOST: str
@@ -57,7 +93,8 @@ class Settings(BaseSettings):
     REDIS_PORT: Optional[int] = 6379
     REDIS_PASSWORD: Optional[str] = None
     REDIS_MAX_CONNECTIONS: Optional[int] = 2000
-    REDIS_DSN: Optional[RedisDsn] = None
+    # 不使用RedisDsn校验: pydantic首次校验url时编译的正则耗时近百毫秒，拖慢启动
+    REDIS_DSN: Optional[str] = None
 
     @validator("REDIS_DSN", pre=True)
     def assemble_redis_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
@@ -74,15 +111,107 @@ class Settings(BaseSettings):
     # jwt配置
     JWT_PREFIX: Optional[str] = "Bearer"
     JWT_EXPIRED_MINUTES: Optional[int] = 60
+    # token签名的实现: hmac 使用标准库直接计算HS256，jose 使用python-jose
+    JWT_BACKEND: Optional[str] = "hmac"
+    # 已校验token的缓存条目数，为0时不缓存
+    JWT_CACHE_SIZE: Optional[int] = 10000
+
+    # 登录会话进程内缓存配置
+    SESSION_CACHE_MAXSIZE: Optional[int] = 10000
+    # 缓存条目的最长存活秒数，失效通知丢失时以此兜底
+    SESSION_CACHE_TTL: Optional[int] = 60
+    # 启动时尝试开启redis的keyspace通知，用于感知登录信息的删除和过期
+    SESSION_KEYSPACE_NOTIFY: Optional[bool] = True
+    # 登录信息在redis中的存活秒数，为空时与token有效期一致。
+    # 小于token有效期时作为空闲超时: 每次访问滑动续期，但不会超过token本身的过期时间
+    SESSION_TTL: Optional[int] = None
+    # 滑动续期的最小间隔秒数，同一进程内每个登录会话在此间隔内最多写一次redis
+    SESSION_REFRESH_INTERVAL: Optional[int] = 60
+
+    # 数据库连接池配置，同步引擎和异步引擎各自使用一个连接池
+    DB_POOL_SIZE: Optional[int] = 5
+    DB_MAX_OVERFLOW: Optional[int] = 10
+    # 连接最长存活秒数，应小于数据库或中间代理的空闲断开时间，-1表示不限制
+    DB_POOL_RECYCLE: Optional[int] = 1800
+    DB_POOL_PRE_PING: Optional[bool] = True
+    # 等待可用连接的最长秒数
+    DB_POOL_TIMEOUT: Optional[float] = 30
+    # 输出所有sql语句，仅用于调试
+    DB_ECHO: Optional[bool] = False
+    # 慢查询阈值(毫秒)，为空时不记录
+    DB_SLOW_QUERY_MS: Optional[float] = None
+    # 启动时预先建立 DB_POOL_SIZE 个异步引擎的连接，避免首批请求等待建立连接
+    DB_POOL_WARMUP: Optional[bool] = True
+
+    # 密码哈希配置
+    BCRYPT_ROUNDS: Optional[int] = 12
+    # 执行哈希计算的方式: thread 或 process
+    PASSWORD_HASH_EXECUTOR: Optional[str] = "thread"
+    # 工作线程/进程数，为空时使用cpu核数
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    # 同时提交的最大哈希任务数，超出后排队
+    PASSWORD_HASH_MAX_PENDING: Optional[int] = 64
+    # 排队等待的最长秒数，超时返回503
+    PASSWORD_HASH_TIMEOUT: Optional[float] = 10
+
+    # 批量导入用户时每批处理的行数，每批执行一次邮箱查询及一次多行insert
+    USER_IMPORT_BATCH_SIZE: Optional[int] = 500
+    # 流式导出时每批读取的行数
+    EXPORT_CHUNK_SIZE: Optional[int] = 1000
+
+    # 角色已分配菜单的缓存中，每个角色保留的变更记录数
+    ROLE_MENUS_LOG_SIZE: Optional[int] = 100
 
     # 日志配置
     LOG_LEVEL: Optional[int] = 0
     LOG_FORMAT: Optional[str] = None
     LOG_ROTATION: Optional[str] = "1 week"
+    # logs目录下的文件名。多进程启动时每个工作进程写入各自的文件(stardew.1.log ...)，避免同时轮转同一个文件
+    LOG_FILENAME: Optional[str] = "stardew.log"
+    # 每行输出一个json对象，为False时输出按 LOG_FORMAT 格式化的文本
+    LOG_SERIALIZE: Optional[bool] = True
+    # 日志在后台线程中写入文件。队列满时丢弃ERROR以下级别的日志
+    LOG_QUEUE_SIZE: Optional[int] = 10000
+    # 每次写入的最大条数，以及没有新日志时刷新缓冲的间隔秒数
+    LOG_BATCH_SIZE: Optional[int] = 256
+    LOG_FLUSH_INTERVAL: Optional[float] = 0.5
+
+    # 延迟初始化: 启动时只建立redis连接并加载权限注册表，数据库引擎、密码哈希及验证码的执行器、邮件队列、
+    # 邮件模板等在首次使用时创建。用于按需扩缩容的实例，缩短冷启动时间，代价是首批请求变慢
+    LAZY_STARTUP: Optional[bool] = False
+
+    # 生产环境启动(python -m stardew.server)配置，均可由命令行参数覆盖
+    SERVER_HOST: Optional[str] = "0.0.0.0"
+    SERVER_PORT: Optional[int] = 8000
+    # 工作进程数，为空时使用cpu核数
+    SERVER_WORKERS: Optional[int] = None
+    # 每个工作进程同时处理的最大连接数，超过时直接返回503，为空时不限制
+    SERVER_LIMIT_CONCURRENCY: Optional[int] = None
+    # 每个工作进程监听队列的长度
+    SERVER_BACKLOG: Optional[int] = 2048
+    # keep-alive连接的空闲超时秒数
+    SERVER_KEEP_ALIVE: Optional[int] = 5
+    # 收到SIGTERM后等待进行中的请求完成的最长秒数
+    SERVER_GRACEFUL_TIMEOUT: Optional[int] = 30
+
+    # 请求指标配置。记录各路由的耗时直方图及数据库、redis、密码哈希、验证码的开销，由 /metrics 导出
+    METRICS_ENABLED: Optional[bool] = True
+    # 耗时直方图的分桶上限(秒)
+    METRICS_BUCKETS: Optional[List[float]] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+    # 访问 /metrics 需要携带的 Bearer token，为空时不校验
+    METRICS_TOKEN: Optional[str] = None
 
     # 验证码配置
     CAPTCHA_CHAR_LENGTH: Optional[int] = 4
     CAPTCHA_EXPIRED_MINUTES: Optional[int] = 5
+    CAPTCHA_WIDTH: Optional[int] = 160
+    CAPTCHA_HEIGHT: Optional[int] = 60
+    # 预渲染池容量
+    CAPTCHA_POOL_SIZE: Optional[int] = 64
+    # 执行渲染的方式: process 或 thread
+    CAPTCHA_EXECUTOR: Optional[str] = "process"
+    # 渲染进程/线程数，为空时使用cpu核数
+    CAPTCHA_WORKERS: Optional[int] = None
 
     class Config:
         case_sensitive = True
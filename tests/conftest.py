@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 08:30
+# @Description   :
+import pytest
+
+from stardew.core.db.base import Base, Database
+
+
+@pytest.fixture
+def db(tmp_path):
+	""" 已建表的临时sqlite数据库，同步、异步引擎访问同一个文件。sqlite的异步引擎不使用连接池，不需要dispose """
+	db_file = tmp_path / "stardew.db"
+	database = Database(dsn=f"sqlite:///{db_file}", async_dsn=f"sqlite+aiosqlite:///{db_file}", echo=False)
+	Base.metadata.create_all(database.engine)
+	yield database
+	database.engine.dispose()
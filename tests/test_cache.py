@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 18:10
+# @Description   :
+from stardew.common.utils import cache
+from stardew.common.utils import LRUCache
+
+
+def test_lru_eviction():
+	lru = LRUCache(maxsize=2)
+	lru.set("a", 1)
+	lru.set("b", 2)
+	assert lru.get("a") == 1
+	lru.set("c", 3)
+	# b 最久未被使用，被淘汰
+	assert lru.get("b") is None
+	assert lru.get("a") == 1 and lru.get("c") == 3
+	assert lru.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1}
+
+
+def test_lru_ttl(monkeypatch):
+	now = [100.0]
+	monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+	lru = LRUCache(maxsize=10, ttl=5)
+	lru.set("a", 1)
+	lru.set("b", 2, ttl=20)
+	now[0] += 10
+	assert lru.get("a") is None
+	assert lru.get("b") == 2
+	assert len(lru) == 1
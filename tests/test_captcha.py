@@ -1,15 +1,32 @@
 # -*- coding: utf-8 -*-
 # @Author        : Yao YuHang
-# @CreatedTime   : 2021/2/4 17:32
+# @CreatedTime   : 2026/10/18 20:30
 # @Description   :
+import asyncio
+
 import pytest
-from httpx import AsyncClient
 
-from stardew.runserver import app
+from stardew.core.captcha import init_captcha_engine
 
 
 @pytest.mark.asyncio
-async def test_captcha():
-	async with AsyncClient(app=app, base_url="http://127.0.0.1:8000/") as client:
-		response = await client.get("/captcha")
-	assert response.status_code == 200
+async def test_captcha_pool():
+	resource = init_captcha_engine(executor_type="thread", workers=1, length=5, pool_size=2)
+	engine = await resource.__anext__()
+	while engine.stats()["pool_depth"] < 2:
+		await asyncio.sleep(0.01)
+
+	code, image = await engine.get()
+	assert len(code) == 5
+	assert image.startswith(b"\x89PNG")
+	assert engine.hits == 1 and engine.misses == 0
+
+	# 尺寸不同时绕过预渲染池
+	await engine.render(width=80, height=30)
+	stats = engine.stats()
+	# 后台预渲染单独计数，不计入请求中的渲染耗时
+	assert stats["rendered"] == 1
+	assert stats["render_avg_ms"] > 0
+	assert stats["prerendered"] >= 2
+	assert stats["prerender_avg_ms"] > 0
+	await resource.aclose()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 08:30
+# @Description   :
+import pytest
+from sqlalchemy import event, select, func
+
+from stardew.core.db.crud import AsyncCRUDService
+from stardew.core.menu_tree import MenuTree
+from stardew.models.system import SysUser, SysRole, SysMenu, role_menu, user_role
+from stardew.repository.system import AsyncRoleRepository, AsyncUserRepository
+from stardew.services.system.impl.menu import AsyncMenuServiceImpl
+
+
+class FakeRedis:
+
+	def __init__(self):
+		self.version = 0
+
+	async def incr(self, key):
+		self.version += 1
+		return self.version
+
+	async def get(self, key):
+		return self.version
+
+
+def _foreign_keys(dbapi_connection, connection_record):
+	cursor = dbapi_connection.cursor()
+	cursor.execute("PRAGMA foreign_keys=ON")
+	cursor.close()
+
+
+@pytest.fixture
+def linked_db(db):
+	# sqlite的连接不复用，之后建立的连接都会启用外键约束
+	event.listen(db.engine, "connect", _foreign_keys)
+	event.listen(db.async_engine.sync_engine, "connect", _foreign_keys)
+	with db.session() as session:
+		parent = SysMenu(id="parent", name="parent", path="/parent", perm="sys:parent")
+		child = SysMenu(id="child", name="child", path="/child", perm="sys:child", parent=parent)
+		other = SysMenu(id="other", name="other", path="/other", perm="sys:other")
+		role = SysRole(id="role", name="role", key="role", perms=[parent, child, other])
+		session.add(SysUser(id="user", username="stardew", email="stardew@example.com", password="x", roles=[role]))
+		session.commit()
+	return db
+
+
+async def _count(db, table, clause):
+	async with db.async_session() as session:
+		return (await session.execute(select(func.count()).select_from(table).where(clause))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_delete_linked_menu(linked_db):
+	service = AsyncMenuServiceImpl(
+		crud=AsyncCRUDService(model_class=SysMenu, session_factory=linked_db.async_session),
+		tree=MenuTree(),
+		redis=FakeRedis(),
+	)
+	await service.delete_menu("parent")
+	assert await _count(linked_db, SysMenu.__table__, SysMenu.id.in_(["parent", "child"])) == 0
+	assert await service.get_role_menus("role") == ["other"]
+
+
+@pytest.mark.asyncio
+async def test_delete_linked_role_and_user(linked_db):
+	await AsyncRoleRepository(session_factory=linked_db.async_session).delete("role")
+	assert await _count(linked_db, SysRole.__table__, SysRole.id == "role") == 0
+	assert await _count(linked_db, role_menu, role_menu.c.role_id == "role") == 0
+
+	with linked_db.session() as session:
+		session.add(SysRole(id="admin", name="admin", key="admin"))
+		session.flush()
+		session.execute(user_role.insert().values(user_id="user", role_id="admin"))
+		session.commit()
+	await AsyncUserRepository(session_factory=linked_db.async_session).delete("user")
+	assert await _count(linked_db, SysUser.__table__, SysUser.id == "user") == 0
+	assert await _count(linked_db, user_role, user_role.c.user_id == "user") == 0
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 00:30
+# @Description   :
+import csv
+import io
+
+import orjson
+import pytest
+
+from stardew.core.db.crud import AbstractCRUDService, AsyncCRUDService
+from stardew.core.exporter import schema_columns, encode_stream
+from stardew.models.system import SysUser
+from stardew.repository.system import AsyncUserRepository
+from stardew.schemas.system import UserSimpleSchema
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+async def test_export_users(db, fmt):
+	with db.session() as session:
+		session.add_all([
+			SysUser(email=f"user{i}@stardew.com", username=f"user{i}", password="secret", remark="a,\"b\"")
+			for i in range(5)
+		])
+		session.commit()
+
+	columns = schema_columns(SysUser, UserSimpleSchema)
+	names = [column.key for column in columns]
+	assert "password" not in names and "email" in names
+	repository = AsyncUserRepository(session_factory=db.async_session)
+	chunks = [chunk async for chunk in encode_stream(fmt, names, repository.stream(columns, chunk_size=2))]
+	payload = b"".join(chunks).decode("utf-8-sig")
+
+	if fmt == "ndjson":
+		# 每批数据对应一个数据块
+		assert len(chunks) == 3
+		rows = [orjson.loads(line) for line in payload.splitlines()]
+	else:
+		assert len(chunks) == 4
+		rows = list(csv.DictReader(io.StringIO(payload)))
+	assert {row["email"] for row in rows} == {f"user{i}@stardew.com" for i in range(5)}
+	assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+	assert {row["remark"] for row in rows} == {"a,\"b\""}
+	assert set(rows[0]) == set(names)
+
+
+@pytest.mark.asyncio
+async def test_crud_stream(db):
+	service = AsyncCRUDService(model_class=SysUser, session_factory=db.async_session)
+	for i in range(3):
+		await service.add(create_schema={"email": f"user{i}@stardew.com", "username": f"user{i}", "password": "secret"})
+
+	batches = [batch async for batch in service.stream(columns=[SysUser.id, SysUser.username], chunk_size=2)]
+	assert [len(batch) for batch in batches] == [2, 1]
+	rows = [row for batch in batches for row in batch]
+	assert {row.username for row in rows} == {"user0", "user1", "user2"}
+	assert [row.id for row in rows] == sorted(row.id for row in rows)
+	assert "add" in AbstractCRUDService.__abstractmethods__
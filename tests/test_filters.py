@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 21:45
+# @Description   :
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from stardew.core.db.filters import apply_filters
+from stardew.models.system import SysMenu
+
+
+def _compile(where_clause, order_by=None):
+	stmt = apply_filters(select(SysMenu), SysMenu, where_clause, order_by)
+	return stmt.compile(compile_kwargs={"render_postcompile": True})
+
+
+def test_bound_parameters():
+	compiled = _compile({"perm": "x' OR '1'='1", "order_num__between": (1, "5"), "id__in": ["a", "b"]}, ["-order_num"])
+	sql = str(compiled)
+	assert "'1'='1" not in sql
+	assert "ORDER BY sys_menu.order_num DESC" in sql
+	assert compiled.params["perm_1"] == "x' OR '1'='1"
+	# 值按列类型转换
+	assert compiled.params["order_num_2"] == 5
+
+
+def test_same_shape_same_statement():
+	assert str(_compile({"perm": "a", "status": 0})) == str(_compile({"perm": "b", "status": 1}))
+
+
+def test_boolean_values():
+	for value, expected in (("false", False), ("TRUE", True), ("0", False), (1, True), (False, False)):
+		assert str(_compile({"visible": value})).endswith(f"sys_menu.visible = {str(expected).lower()}")
+	assert "IS NOT NULL" in str(_compile({"parent_id__isnull": "false"}))
+
+
+@pytest.mark.parametrize("where_clause", [
+	{"password; drop table sys_menu": 1},
+	{"visible": "no"},
+	{"visible": 2},
+	{"parent_id__isnull": "maybe"},
+	{"perm__regex": "x"},
+	{"order_num": "abc"},
+	{"id__in": "abc"},
+	{"order_num__between": [1]},
+])
+def test_invalid_filters(where_clause):
+	with pytest.raises(HTTPException) as info:
+		_compile(where_clause)
+	assert info.value.status_code == 400
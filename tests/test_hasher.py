@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 20:00
+# @Description   :
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from stardew.common.utils import SecurityUtil
+from stardew.core.hasher import PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify():
+	with ThreadPoolExecutor(max_workers=2) as executor:
+		hasher = PasswordHasher(executor)
+		hashed = await hasher.hash("stardew")
+		assert await hasher.verify("stardew", hashed)
+		assert not await hasher.verify("valley", hashed)
+		assert hasher.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_busy_hasher_rejects():
+	hashed = SecurityUtil.generate_password("stardew")
+	with ThreadPoolExecutor(max_workers=1) as executor:
+		hasher = PasswordHasher(executor, max_pending=1, timeout=0.01)
+		results = await asyncio.gather(
+			hasher.verify("stardew", hashed), hasher.verify("stardew", hashed), return_exceptions=True
+		)
+	assert results[0] is True
+	assert isinstance(results[1], HTTPException) and results[1].status_code == 503
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 23:40
+# @Description   :
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import select, func
+
+from stardew.core.hasher import PasswordHasher
+from stardew.core.importer import RecordParser, parse_records
+from stardew.models.system import SysUser, SysRole, user_role
+from stardew.repository.system import AsyncUserRepository
+from stardew.services.system.impl.user import AsyncUserServiceImpl
+
+
+def _feed_bytewise(parser, payload):
+	records = []
+	for index in range(len(payload)):
+		records.extend(parser.feed(payload[index:index + 1]))
+	return records + parser.close()
+
+
+def test_parse_jsonl():
+	payload = '{"email": "a@stardew.com"}\n\n[1]\n{"email": "é@stardew.com"}'.encode()
+	records = _feed_bytewise(RecordParser("jsonl"), payload)
+	assert [record.line for record in records] == [1, 3, 4]
+	assert records[0].data == {"email": "a@stardew.com"}
+	assert records[1].data is None and records[1].error
+	assert records[2].data == {"email": "é@stardew.com"}
+
+
+def test_parse_csv():
+	payload = (
+		'﻿email,username,remark,roles\r\n'
+		'a@stardew.com,alice,"multi\nline",r1; r2\r\n'
+		'b@stardew.com,bob,,\r\n'
+		'c@stardew.com,carol\r\n'
+	).encode()
+	records = _feed_bytewise(RecordParser("csv", list_fields=("roles",)), payload)
+	assert [record.line for record in records] == [2, 4, 5]
+	assert records[0].data == {"email": "a@stardew.com", "username": "alice", "remark": "multi\nline", "roles": ["r1", "r2"]}
+	assert records[1].data == {"email": "b@stardew.com", "username": "bob"}
+	assert records[2].error
+
+
+@pytest.mark.asyncio
+async def test_import_users(db):
+	with db.session() as session:
+		role = SysRole(id="r1", name="role", key="role")
+		session.add_all([role, SysUser(email="old@stardew.com", username="old_user", password="x")])
+		session.commit()
+
+	async def stream():
+		yield b'{"email": "new1@stardew.com", "username": "new_user1", "password": "secret1", "roles": ["r1", "r9"]}\n'
+		yield b'{"email": "old@stardew.com", "username": "old_user", "password": "secret1"}\n'
+		yield b'{"email": "new1@stardew.com", "username": "new_user1", "password": "secret1"}\n'
+		yield b'{"email": "bad", "username": "bad", "password": "1"}\nnot json\n'
+		yield b'{"email": "new2@stardew.com", "username": "new_user2", "password": "secret2"}\n'
+
+	with ThreadPoolExecutor(max_workers=2) as executor:
+		service = AsyncUserServiceImpl(
+			repository=AsyncUserRepository(session_factory=db.async_session),
+			redis=None,
+			hasher=PasswordHasher(executor)
+		)
+		report = await service.import_users(records=parse_records(stream(), "jsonl"), batch_size=2)
+
+	assert (report.created, report.skipped, report.failed) == (2, 2, 2)
+	assert [row.status for row in report.rows] == ["created", "skipped", "skipped", "failed", "failed", "created"]
+	with db.session() as session:
+		assert session.execute(select(func.count()).select_from(SysUser)).scalar() == 3
+		assert session.execute(select(user_role.c.user_id, user_role.c.role_id)).all() == [(report.rows[0].id, "r1")]
+		assert session.get(SysUser, report.rows[-1].id).nickname == ""
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 05:50
+# @Description   :
+import os
+
+import orjson
+import pytest
+from loguru import logger
+
+from stardew.common.utils.log_sink import QueueFileSink, parse_rotation
+
+
+def test_parse_rotation():
+	assert parse_rotation("5 MB") == (5 << 20, None)
+	assert parse_rotation("1 week") == (None, 604800)
+	assert parse_rotation("12 hours") == (None, 43200)
+	with pytest.raises(ValueError):
+		parse_rotation("monday")
+
+
+def test_json_lines_and_rotation(tmp_path):
+	path = str(tmp_path / "app.log")
+	sink = QueueFileSink(path, rotation="1 KB", batch_size=8, flush_interval=0.01)
+	handler_id = logger.add(sink, format="{message}")
+	for i in range(100):
+		logger.bind(user_id="u1").info(f"message {i}")
+	# 移除时写完剩余日志
+	logger.remove(handler_id)
+
+	assert sink.stats()["written"] == 100 and sink.stats()["rotations"] > 0
+	files = os.listdir(tmp_path)
+	assert "app.log" in files and any(name.endswith(".log.zip") for name in files)
+	lines = [orjson.loads(line) for line in open(path, "rb")]
+	assert lines[-1]["message"] == "message 99" and lines[-1]["extra"] == {"user_id": "u1"}
+
+
+def test_drop_when_full(tmp_path):
+	# 批量较大且刷新间隔较长，测试期间后台线程不会写入
+	sink = QueueFileSink(str(tmp_path / "app.log"), queue_size=10, batch_size=100, flush_interval=60)
+	handler_id = logger.add(sink, format="{message}")
+	for i in range(20):
+		logger.info(f"message {i}")
+	logger.error("kept")
+	stats = sink.stats()
+	assert (stats["queue_depth"], stats["dropped"], stats["overflowed"]) == (11, 10, 1)
+	logger.remove(handler_id)
+	assert sink.stats()["written"] == 11
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 19:20
+# @Description   :
+import pytest
+
+from stardew.core.db.counter import assert_query_count
+from stardew.models.system import SysUser, SysRole, SysMenu
+from stardew.repository.system import AsyncUserRepository
+
+
+@pytest.mark.asyncio
+async def test_login_info_single_query(db):
+	with db.session() as session:
+		menus = [SysMenu(name=f"menu{i}", path=f"/menu{i}", perm=f"sys:menu{i}:query") for i in range(4)]
+		menus.append(SysMenu(name="category", path="/category", perm=""))
+		roles = [SysRole(name=f"role{i}", key=f"role{i}", perms=menus[i:]) for i in range(3)]
+		session.add(SysUser(username="stardew", email="stardew@example.com", password="x", roles=roles))
+		session.commit()
+
+	repository = AsyncUserRepository(session_factory=db.async_session)
+	with assert_query_count(db.async_engine, 1):
+		user, roles, perms = await repository.get_login_info(email="stardew@example.com")
+	assert user.username == "stardew"
+	assert roles == {"role0", "role1", "role2"}
+	assert perms == {f"sys:menu{i}:query" for i in range(4)}
+
+	with assert_query_count(db.async_engine, 1):
+		assert await repository.get_login_info(email="nobody@example.com") is None
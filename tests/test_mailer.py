@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 04:10
+# @Description   :
+import asyncio
+import smtplib
+
+import pytest
+
+from stardew.core.mailer import Mailer
+
+
+class _FakeSMTP:
+	""" 记录发送的邮件，可以预设每次发送的异常 """
+
+	def __init__(self, errors):
+		self.errors = errors
+		self.sent = []
+		self.closed = False
+
+	def sendmail(self, sender, receivers, message):
+		if self.errors:
+			error = self.errors.pop(0)
+			if error is not None:
+				raise error
+		self.sent.append(list(receivers))
+		return {}
+
+	def quit(self):
+		self.closed = True
+
+
+def _mailer(errors, **kwargs):
+	connections = []
+
+	def connect():
+		connections.append(_FakeSMTP(errors))
+		return connections[-1]
+
+	kwargs.setdefault("retry_backoff", 0.01)
+	mailer = Mailer(connect, "noreply@stardew.com", connections=1, **kwargs)
+	mailer.start()
+	return mailer, connections
+
+
+async def _drain(mailer):
+	while mailer.stats()["queue_depth"] or mailer.stats()["sending"] or mailer.stats()["retrying"]:
+		await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_connection_reused_and_batched():
+	mailer, connections = _mailer([], batch_size=2)
+	await mailer.send(subject="hi", html_content="<p>hi</p>", receivers=["a@s.com", "b@s.com", "c@s.com"])
+	await mailer.send(subject="hi", html_content="<p>hi</p>", receivers=["d@s.com"])
+	await _drain(mailer)
+	assert len(connections) == 1
+	assert connections[0].sent == [["a@s.com", "b@s.com"], ["c@s.com"], ["d@s.com"]]
+	assert mailer.stats()["sent"] == 3 and mailer.stats()["connections"] == 1
+	await mailer.stop()
+	assert connections[0].closed
+
+
+@pytest.mark.asyncio
+async def test_retry_and_failure():
+	mailer, connections = _mailer([
+		# 服务器断开连接: 立即重连，不计入重试
+		None, smtplib.SMTPServerDisconnected(), None,
+		# 4xx 退避后重试
+		smtplib.SMTPDataError(451, b"try later"),
+		# 5xx 直接失败
+		smtplib.SMTPRecipientsRefused({"x@s.com": (550, b"no such user")}),
+	])
+	for receiver in ("a@s.com", "b@s.com", "c@s.com", "x@s.com"):
+		await mailer.send(subject="hi", html_content="", receivers=[receiver])
+	await _drain(mailer)
+	stats = mailer.stats()
+	assert (stats["sent"], stats["retried"], stats["failed"]) == (3, 1, 1)
+	assert sorted(sum((c.sent for c in connections), [])) == [["a@s.com"], ["b@s.com"], ["c@s.com"]]
+	await mailer.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_retries():
+	mailer, connections = _mailer([smtplib.SMTPDataError(451, b"try later")], retry_backoff=0.05)
+	await mailer.send(subject="hi", html_content="", receivers=["a@s.com"])
+	await mailer.stop(timeout=5)
+	assert (mailer.sent, mailer.retried, mailer.failed) == (1, 1, 0)
+	assert sum((c.sent for c in connections), []) == [["a@s.com"]]
+
+
+@pytest.mark.asyncio
+async def test_stop_counts_dropped_retries():
+	mailer, connections = _mailer([smtplib.SMTPDataError(451, b"try later")], retry_backoff=60)
+	await mailer.send(subject="hi", html_content="", receivers=["a@s.com"])
+	await mailer.stop(timeout=0.1)
+	# 超时后等待重试的邮件记为失败
+	assert (mailer.sent, mailer.retried, mailer.failed) == (0, 1, 1)
+	assert mailer.stats()["retrying"] == 0
+
+
+@pytest.mark.asyncio
+async def test_send_with_aiosmtpd():
+	pytest.importorskip("aiosmtpd")
+	from aiosmtpd.controller import Controller
+	from aiosmtpd.handlers import Sink
+
+	class Handler(Sink):
+		def __init__(self):
+			self.envelopes = []
+
+		async def handle_DATA(self, server, session, envelope):
+			self.envelopes.append(envelope)
+			return "250 OK"
+
+	handler = Handler()
+	controller = Controller(handler, hostname="127.0.0.1", port=0)
+	controller.start()
+	try:
+		port = controller.server.sockets[0].getsockname()[1]
+		mailer = Mailer(lambda: smtplib.SMTP("127.0.0.1", port), "noreply@stardew.com", connections=2)
+		mailer.start()
+		for i in range(10):
+			await mailer.send(subject="hi", html_content="<p>hi</p>", receivers=[f"user{i}@s.com"])
+		await mailer.stop(timeout=5)
+		assert len(handler.envelopes) == 10
+		assert mailer.stats()["connects"] <= 2
+	finally:
+		controller.stop()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 22:20
+# @Description   :
+import orjson
+
+from stardew.core.menu_tree import MenuTree
+
+
+def _names(nodes):
+	return [(node["name"], _names(node["children"])) for node in nodes]
+
+
+def test_menu_tree():
+	tree = MenuTree()
+	tree.load([
+		("0", "root", None, 0),
+		("b", "system", "0", 2),
+		("a", "monitor", "0", 1),
+		("c", "user", "b", 0),
+		("d", "user:add", "c", 0),
+	], version=3)
+	assert tree.version == 3
+	assert _names(tree.tree()) == [("monitor", []), ("system", [("user", [("user:add", [])])])]
+
+	dumped = tree.dumps()
+	assert tree.dumps() is dumped
+	assert orjson.loads(dumped) == tree.tree()
+
+	# 移动节点后重新排序，缓存失效
+	tree.put("c", "user", "a", 0)
+	tree.put("e", "role", "a", -1)
+	assert tree.dumps() is not dumped
+	assert _names(tree.tree()) == [("monitor", [("role", []), ("user", [("user:add", [])])]), ("system", [])]
+
+	# 删除时连同子节点一起删除
+	tree.remove("c")
+	assert len(tree) == 4
+	assert _names(tree.tree()) == [("monitor", [("role", [])]), ("system", [])]
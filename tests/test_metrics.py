@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 06:30
+# @Description   :
+import asyncio
+from types import SimpleNamespace
+from contextlib import contextmanager
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import text
+
+from stardew.api.common.metrics_controller import get_metrics
+from stardew.core.metrics import MetricsMiddleware, RequestMetrics, record_db, record_redis
+from stardew.core.redis import MeteredRedis
+from stardew.core.session import SessionCache
+
+
+async def _request(app, method, path):
+	""" 直接调用ASGI应用，返回状态码 """
+	messages = []
+
+	async def receive():
+		return {"type": "http.request", "body": b"", "more_body": False}
+
+	async def send(message):
+		messages.append(message)
+
+	scope = {
+		"type": "http", "http_version": "1.1", "method": method, "scheme": "http", "path": path,
+		"raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+		"client": ("127.0.0.1", 1), "server": ("testserver", 80),
+	}
+	await app(scope, receive, send)
+	return messages[0]["status"]
+
+
+def _create_app(metrics):
+	app = FastAPI()
+
+	@app.get("/items/{item_id}")
+	async def get_item(item_id: int):
+		record_db(0.002)
+		record_db(0.001)
+		record_redis()
+		if item_id == 0:
+			raise HTTPException(status_code=404, detail="不存在")
+		return {"id": item_id}
+
+	metrics.register_routes(app.routes)
+	app.add_middleware(MetricsMiddleware, metrics=metrics)
+	return app
+
+
+@pytest.mark.asyncio
+async def test_route_metrics():
+	metrics = RequestMetrics(buckets=(0.5, 1.0))
+	app = _create_app(metrics)
+	assert await _request(app, "GET", "/items/1") == 200
+	assert await _request(app, "GET", "/items/0") == 404
+	assert await _request(app, "GET", "/missing") == 404
+
+	route = next(route for route in metrics.routes() if route.path == "/items/{item_id}")
+	assert route.count == 2
+	assert route.statuses == {200: 1, 404: 1}
+	assert route.db_statements == 4
+	assert route.redis_round_trips == 2
+	assert route.bucket_counts == [2, 0, 0]
+	assert metrics.unmatched.count == 1
+	assert metrics.in_flight == 0
+	# 请求结束后RequestSample被放回池中复用
+	assert len(metrics._samples) == 1
+
+	content = metrics.render({"db_pool": {"sync": {"pool": "QueuePool", "checked_out": 1}}, "mailer": {"sent": 3}})
+	assert 'stardew_http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="+Inf"} 2' in content
+	assert 'stardew_http_requests_total{method="GET",route="/items/{item_id}",status="404"} 1' in content
+	assert 'stardew_http_request_db_statements_total{method="GET",route="/items/{item_id}"} 4' in content
+	assert 'stardew_db_pool_checked_out{db_pool="sync"} 1.0' in content
+	assert "stardew_mailer_sent 3.0" in content
+
+
+def test_record_outside_request():
+	# 不在请求中(如后台任务)时不记录
+	record_db(0.1)
+	record_redis()
+
+
+class _Connection:
+
+	def __init__(self):
+		self.commands = []
+
+	def execute(self, command, *args, **kwargs):
+		self.commands.append(command)
+		future = asyncio.get_event_loop().create_future()
+		future.set_result(b"OK")
+		return future
+
+	@contextmanager
+	def _buffered(self):
+		yield
+
+
+@pytest.mark.asyncio
+async def test_redis_round_trips():
+	metrics = RequestMetrics()
+	redis = MeteredRedis(_Connection())
+	app = FastAPI()
+
+	@app.get("/")
+	async def index():
+		await redis.get("a")
+		pipe = redis.pipeline()
+		pipe.get("b")
+		pipe.get("c")
+		await pipe.execute()
+		return {}
+
+	metrics.register_routes(app.routes)
+	app.add_middleware(MetricsMiddleware, metrics=metrics)
+	assert await _request(app, "GET", "/") == 200
+	route = next(route for route in metrics.routes() if route.path == "/")
+	assert route.redis_round_trips == 2
+	assert redis._pool_or_conn.commands == [b"GET", b"GET", b"GET"]
+
+
+@pytest.mark.asyncio
+async def test_db_statements(db):
+	metrics = RequestMetrics()
+	app = FastAPI()
+
+	@app.get("/")
+	async def index():
+		async with db.async_session() as session:
+			await session.execute(text("SELECT 1"))
+			await session.execute(text("SELECT 2"))
+		return {}
+
+	metrics.register_routes(app.routes)
+	app.add_middleware(MetricsMiddleware, metrics=metrics)
+	assert await _request(app, "GET", "/") == 200
+	route = next(route for route in metrics.routes() if route.path == "/")
+	assert route.db_statements == 2
+	assert route.db_seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_component_gauges():
+	session_cache = SessionCache(maxsize=10)
+	session_cache.set("session:1", SimpleNamespace(user_id="1"))
+	session_cache.get("session:1")
+	session_cache.get("session:2")
+	response = await get_metrics(
+		db=SimpleNamespace(pool_stats=lambda: {"async": {"pool": "QueuePool", "checked_out": 0}}),
+		captcha_engine=SimpleNamespace(stats=lambda: {"hits": 1}),
+		password_hasher=SimpleNamespace(pending=0, max_pending=64),
+		mailer=SimpleNamespace(stats=lambda: {"sent": 0}),
+		session_cache=session_cache
+	)
+	content = response.body.decode()
+	assert "stardew_session_cache_hits 1.0" in content
+	assert "stardew_session_cache_misses 1.0" in content
+	assert "stardew_session_cache_size 1.0" in content
+	assert "# TYPE stardew_token_cache_hits gauge" in content
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 21:10
+# @Description   :
+import pytest
+from fastapi import HTTPException
+
+from stardew.core.db.pagination import encode_cursor, decode_cursor, split_page
+from stardew.models.system import SysRole
+from stardew.repository.system import AsyncRoleRepository
+
+
+def test_cursor_round_trip():
+	assert decode_cursor(encode_cursor("0a1b2c")) == "0a1b2c"
+	for cursor in ("", "!!", encode_cursor("x") + "x", encode_cursor(1), encode_cursor({"id": "x"}), encode_cursor(None)):
+		with pytest.raises(HTTPException):
+			decode_cursor(cursor)
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages(db):
+	with db.session() as session:
+		session.add_all([SysRole(name=f"role{i}", key=f"role{i}") for i in range(7)])
+		session.commit()
+
+	repository = AsyncRoleRepository(session_factory=db.async_session)
+	seen, after = [], None
+	while True:
+		roles, cursor = split_page(await repository.get_after(after=after, page_size=3), 3)
+		seen.extend(role.id for role in roles)
+		if cursor is None:
+			break
+		after = decode_cursor(cursor)
+	assert seen == sorted(seen) and len(set(seen)) == 7
+	assert [role.id for role in await repository.get_multi(page_no=1, page_size=3)] == seen[3:6]
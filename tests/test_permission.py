@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 18:50
+# @Description   :
+import pytest
+
+from stardew.core.permission import PermissionRegistry
+
+
+class _InternRedis:
+	""" 仅模拟权限注册所需的redis行为 """
+
+	def __init__(self):
+		self.generation = None
+		self.mapping = {}
+
+	async def evalsha(self, sha, keys, args):
+		if self.generation is None:
+			self.generation = args[0]
+		return [self.generation] + [self.mapping.setdefault(perm, len(self.mapping)) for perm in args[1:]]
+
+	async def hgetall(self, key, encoding=None):
+		mapping = {perm: str(identity) for perm, identity in self.mapping.items()}
+		if self.generation is not None:
+			mapping["#generation"] = str(self.generation)
+		return mapping
+
+	async def hget(self, key, field, encoding=None):
+		return None if self.generation is None else str(self.generation)
+
+	def flush(self):
+		self.generation = None
+		self.mapping = {}
+
+
+@pytest.mark.asyncio
+async def test_permission_mask():
+	redis = _InternRedis()
+	registry = PermissionRegistry()
+	await registry.intern(redis, ["sys:user:add", "sys:user:delete", "sys:role:add"])
+
+	mask = await registry.compile(redis, ["sys:user:*"])
+	assert mask & registry.mask_of("sys:user:add")
+	assert mask & registry.mask_of("sys:user:delete")
+	assert not mask & registry.mask_of("sys:role:add")
+
+	# 通配符只匹配一段，新增权限后重新展开
+	await registry.intern(redis, ["sys:user:export:excel"])
+	assert not await registry.compile(redis, ["sys:user:*"]) & registry.mask_of("sys:user:export:excel")
+	assert await registry.compile(redis, ["*:*:*"]) == 0b0111
+
+
+@pytest.mark.asyncio
+async def test_permission_ids_shared():
+	redis = _InternRedis()
+	first, second = PermissionRegistry(), PermissionRegistry()
+	await first.intern(redis, ["sys:user:add"])
+	await second.intern(redis, ["sys:role:add", "sys:user:add"])
+	assert first.mask_of("sys:user:add") == second.mask_of("sys:user:add")
+	assert second.mask_of("unknown") == 0
+
+
+@pytest.mark.asyncio
+async def test_registry_lost():
+	redis = _InternRedis()
+	first, second = PermissionRegistry(), PermissionRegistry()
+	first.require("sys:user:add")
+	await first.sync(redis, ["sys:role:add"])
+	generation = first.generation
+	assert generation and first.mask_of("sys:role:add")
+
+	# 注册表被淘汰后，其他进程以新的世代重新编号
+	redis.flush()
+	await second.sync(redis, ["sys:menu:add", "sys:role:add"])
+	assert second.generation != generation
+
+	# 遇到新世代的登录信息时重新加载，编号与其他进程一致，本进程已知的权限补充注册
+	await first.refresh(redis)
+	assert first.generation == second.generation
+	assert first.mask_of("sys:role:add") == second.mask_of("sys:role:add")
+	assert first.mask_of("sys:user:add") and first.mask_of("sys:menu:add")
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/18 23:30
+# @Description   :
+import sqlite3
+
+import pytest
+from sqlalchemy import exc
+
+from stardew.core.db.pool import MeteredQueuePool
+
+
+def test_pool_metrics():
+	pool = MeteredQueuePool(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=1, timeout=0.01)
+	first, second = pool.connect(), pool.connect()
+	with pytest.raises(exc.TimeoutError):
+		pool.connect()
+	assert pool.metrics.checkouts == 2
+	assert pool.metrics.overflows == 1
+	assert pool.metrics.timeouts == 1
+
+	first.close()
+	second.close()
+	# 重建连接池后指标延续
+	assert pool.recreate().metrics is pool.metrics
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 02:40
+# @Description   :
+import pytest
+from aioredis import ReplyError
+
+from stardew.core.redis import Script, pipeline
+
+
+class _ScriptRedis:
+	""" 模拟redis的脚本缓存 """
+
+	def __init__(self):
+		self.scripts = {}
+		self.calls = []
+
+	async def evalsha(self, sha, keys, args):
+		self.calls.append("EVALSHA")
+		if sha not in self.scripts:
+			raise ReplyError("NOSCRIPT No matching script. Please use EVAL.")
+		return self.scripts[sha]
+
+	async def eval(self, source, keys, args):
+		self.calls.append("EVAL")
+		script = Script(source)
+		self.scripts[script.sha] = len(keys) + len(args)
+		return self.scripts[script.sha]
+
+
+class _Pipeline:
+
+	def __init__(self):
+		self.executed = False
+
+	async def execute(self):
+		self.executed = True
+
+
+@pytest.mark.asyncio
+async def test_script_falls_back_to_eval():
+	redis = _ScriptRedis()
+	script = Script("return #KEYS + #ARGV")
+	assert await script(redis, keys=["a"], args=[1, 2]) == 3
+	assert await script(redis, keys=["a"], args=[1, 2]) == 3
+	# 只有第一次需要发送脚本内容
+	assert redis.calls == ["EVALSHA", "EVAL", "EVALSHA"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_not_sent_on_error():
+	pipe = _Pipeline()
+
+	class _Redis:
+		def pipeline(self):
+			return pipe
+
+	with pytest.raises(ValueError):
+		async with pipeline(_Redis()):
+			raise ValueError
+	assert not pipe.executed
+
+	async with pipeline(_Redis()):
+		pass
+	assert pipe.executed
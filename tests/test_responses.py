@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 01:10
+# @Description   :
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from stardew.core.web.responses import etag_matches, orm_to_dict, orm_to_dicts
+from stardew.models.system import SysUser, SysRole, SysMenu
+from stardew.schemas.system import UserSimpleSchema, RoleSimpleSchema, MenuSimpleSchema
+
+
+def test_orm_to_dict_matches_schema():
+	user = SysUser(
+		id="u1", username="alice", nickname="", email="alice@stardew.com", mobile="", gender=1, avatar="",
+		password="secret", status=0, is_super=False, remark="", del_flag=False
+	)
+	role = SysRole(id="r1", name="admin", key="admin", status=0, del_flag=False)
+	menu = SysMenu(
+		id="m1", name="system", parent_id="0", order_num=1, path="/system", menu_type="M",
+		visible=True, status=0, perm="sys", icon="", del_flag=False
+	)
+	for obj, schema in ((user, UserSimpleSchema), (role, RoleSimpleSchema), (menu, MenuSimpleSchema)):
+		expected = jsonable_encoder(schema.from_orm(obj))
+		assert orm_to_dict(obj, schema) == expected
+		assert orjson.dumps(orm_to_dicts([obj, obj], schema)) == orjson.dumps([expected, expected])
+	assert "password" not in orm_to_dict(user, UserSimpleSchema)
+
+
+def test_etag_matches():
+	etag = 'W/"42"'
+	assert etag_matches('W/"42"', etag)
+	# 多个ETag，强/弱形式按弱比较
+	assert etag_matches('"41", W/"40" ,"42"', etag)
+	assert etag_matches("*", etag)
+	assert not etag_matches('W/"41", "43"', etag)
+	assert not etag_matches(None, etag)
+	assert not etag_matches("", etag)
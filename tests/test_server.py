@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 08:20
+# @Description   :
+import socket
+
+import pytest
+from sqlalchemy import exc
+
+from stardew.core.db.base import Database
+from stardew.server import bind_socket
+
+
+def test_reuse_port():
+	# 主进程只绑定端口，各工作进程在同一端口上监听
+	reservation = bind_socket("127.0.0.1", 0)
+	port = reservation.getsockname()[1]
+	workers = [bind_socket("127.0.0.1", port, backlog=8) for _ in range(2)]
+	client = socket.create_connection(("127.0.0.1", port), timeout=1)
+	client.close()
+	for sock in [reservation, *workers]:
+		sock.close()
+
+
+@pytest.mark.asyncio
+async def test_warmup(tmp_path):
+	db_file = tmp_path / "warmup.db"
+	db = Database(dsn=f"sqlite:///{db_file}", async_dsn=f"sqlite+aiosqlite:///{db_file}", echo=False)
+	# sqlite的异步引擎不使用连接池，只验证连接能够同时建立并关闭
+	await db.warmup(3)
+	# 同步引擎在首次使用时才创建
+	assert "sync" not in db.pool_stats()
+	assert db.engine is db.engine
+	assert "sync" in db.pool_stats()
+
+	db = Database(dsn="sqlite:///", async_dsn=f"sqlite+aiosqlite:///{tmp_path}/missing/warmup.db", echo=False)
+	with pytest.raises(exc.OperationalError):
+		await db.warmup(2)
+	await db.async_engine.dispose()
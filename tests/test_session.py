@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 01:40
+# @Description   :
+import time
+from datetime import datetime
+
+import pytest
+
+from stardew.settings import settings
+from stardew.core import session
+from stardew.core.session import SessionCache, encode_session, decode_session
+from stardew.core.web.schemas import LoginUser
+from stardew.schemas.system import UserSimpleSchema
+
+
+def _login_user(**kwargs):
+	user = UserSimpleSchema(
+		id="0a1b2c", username="stardew", nickname="", email="stardew@example.com", mobile="", gender=1,
+		avatar="", status=0, is_super=False, remark="", **kwargs
+	)
+	return LoginUser(
+		login_time=datetime(2026, 10, 18, 12, 30), sys_user=user, roles={"admin", "dev"}, perm_mask=format(1 << 70 | 5, "x"),
+		perm_generation=1792300000000000
+	)
+
+
+def test_binary_round_trip():
+	login_user = _login_user()
+	raw = encode_session(login_user)
+	assert len(raw) < len(login_user.json()) / 2
+
+	decoded = decode_session(raw)
+	assert (decoded.user_id, decoded.status, decoded.is_super) == ("0a1b2c", 0, False)
+	assert decoded.login_time == login_user.login_time
+	assert decoded.has_perm(1 << 70) and decoded.has_perm(4) and not decoded.has_perm(2)
+	assert decoded.perm_mask == login_user.perm_mask
+	assert decoded.perm_generation == login_user.perm_generation
+	# 角色及用户信息在访问时才解析
+	assert decoded._sys_user is None
+	assert decoded.roles == {"admin", "dev"}
+	assert decoded.sys_user.dict() == login_user.sys_user.dict()
+
+
+def test_json_compatible_and_fields_changed(monkeypatch):
+	login_user = _login_user()
+	decoded = decode_session(login_user.json().encode())
+	assert decoded.user_id == "0a1b2c" and decoded.roles == {"admin", "dev"}
+	assert decoded.has_perm(1 << 70)
+
+	raw = encode_session(login_user)
+	monkeypatch.setattr(session, "_FIELDS_CRC", session._FIELDS_CRC + 1)
+	assert decode_session(raw) is None
+	assert decode_session(b"\x09garbage") is None
+
+
+def test_session_cache_user_index():
+	cache = SessionCache(maxsize=10)
+	cache.set("sub1", decode_session(encode_session(_login_user())))
+	cache.set("sub2", decode_session(encode_session(_login_user())))
+	cache.invalidate_user("0a1b2c")
+	assert cache.get("sub1") is None and cache.get("sub2") is None
+
+
+class _ExpireRecorder:
+	""" 只记录 expire 调用的redis替身 """
+
+	def __init__(self):
+		self.calls = []
+
+	async def expire(self, key, timeout):
+		self.calls.append((key, timeout))
+
+
+@pytest.mark.asyncio
+async def test_refresh_session_throttled(monkeypatch):
+	monkeypatch.setattr(settings, "JWT_EXPIRED_MINUTES", 60)
+	monkeypatch.setattr(settings, "SESSION_TTL", 600)
+	monkeypatch.setattr(settings, "SESSION_REFRESH_INTERVAL", 60)
+	assert session.session_ttl() == 600
+
+	redis = _ExpireRecorder()
+	current = decode_session(encode_session(_login_user()))
+	current.sub = "sub1"
+	token_expire = time.time() + 300
+	await session.refresh_session(redis, current, token_expire)
+	await session.refresh_session(redis, current, token_expire)
+	# 间隔内只续期一次，且不晚于token的过期时间
+	assert len(redis.calls) == 1
+	key, timeout = redis.calls[0]
+	assert key.endswith("sub1") and 290 < timeout <= 300
+
+	# 存活时间与token有效期一致时不需要续期
+	monkeypatch.setattr(settings, "SESSION_TTL", None)
+	current.refreshed_at = 0.0
+	await session.refresh_session(redis, current, token_expire)
+	assert len(redis.calls) == 1
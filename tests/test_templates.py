@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 04:50
+# @Description   :
+import os
+
+from jinja2 import FileSystemLoader
+
+from stardew.common.utils.templates import TemplateRenderer
+
+
+def test_precompile_and_bytecode_cache(tmp_path):
+	template_dir, cache_dir = tmp_path / "templates", tmp_path / "cache"
+	template_dir.mkdir()
+	cache_dir.mkdir()
+	(template_dir / "welcome.html").write_text("<p>{{ name }}</p>")
+
+	renderer = TemplateRenderer(FileSystemLoader(str(template_dir)), cache_dir=str(cache_dir))
+	assert renderer.precompile() == ["welcome.html"]
+	assert len(os.listdir(cache_dir)) == 1
+	assert renderer.render("welcome.html", {"name": "<b>"}) == "<p>&lt;b&gt;</p>"
+
+	assert TemplateRenderer(FileSystemLoader(str(tmp_path / "missing"))).precompile() == []
+
+
+def test_render_cache(tmp_path):
+	(tmp_path / "notice.html").write_text("{{ title }}: {{ body }}")
+	renderer = TemplateRenderer(FileSystemLoader(str(tmp_path)), bytecode_cache=False, render_cache_size=8)
+	first = renderer.render("notice.html", {"title": "a", "body": "b"}, cache=True)
+	assert renderer.render("notice.html", {"body": "b", "title": "a"}, cache=True) is first
+	assert renderer.render("notice.html", {"title": "a", "body": "c"}, cache=True) == "a: c"
+	# 未显式开启时不经过缓存
+	renderer.render("notice.html", {"title": "a", "body": "b"})
+	assert renderer.stats()["hits"] == 1 and renderer.stats()["size"] == 2
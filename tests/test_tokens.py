@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# @Author        : Yao YuHang
+# @CreatedTime   : 2026/10/19 03:20
+# @Description   :
+from datetime import datetime, timedelta
+
+import pytest
+from jose import ExpiredSignatureError, JWTError
+
+from stardew.common.utils.tokens import HMACBackend, JoseBackend, TokenVerifier, create_verifier
+
+KEY = "stardew-secret"
+
+
+def _claims(minutes=5):
+	return {"exp": datetime.utcnow() + timedelta(minutes=minutes), "sub": "0a1b2c"}
+
+
+def test_backends_compatible():
+	hmac_backend, jose_backend = HMACBackend(KEY), JoseBackend(KEY)
+	for encoder, decoder in ((hmac_backend, jose_backend), (jose_backend, hmac_backend)):
+		assert decoder.decode(encoder.encode(_claims()))["sub"] == "0a1b2c"
+	assert hmac_backend.encode({"sub": "a"}) == jose_backend.encode({"sub": "a"})
+
+
+@pytest.mark.parametrize("backend", [HMACBackend, JoseBackend])
+def test_invalid_tokens(backend):
+	decoder = backend(KEY)
+	with pytest.raises(ExpiredSignatureError):
+		decoder.decode(backend(KEY).encode(_claims(minutes=-1)))
+
+	token = backend(KEY).encode(_claims())
+	header, payload, signature = token.split(".")
+	for invalid in (
+			backend("other").encode(_claims()),
+			f"{header}.{payload}.{signature[:-2]}AA",
+			f"{header}.{JoseBackend(KEY).encode({'sub': 'x'}).split('.')[1]}.{signature}",
+			# alg: none
+			f"eyJhbGciOiJub25lIiwidHlwIjoiSldUIn0.{payload}.",
+			"not-a-token",
+	):
+		with pytest.raises(JWTError):
+			decoder.decode(invalid)
+
+
+def test_verifier_cache():
+	verifier = TokenVerifier(HMACBackend(KEY), maxsize=10)
+	token = verifier.encode(_claims())
+	assert verifier.verify(token) is verifier.verify(token)
+	assert verifier.stats()["hits"] == 1
+
+	with pytest.raises(JWTError):
+		verifier.verify(token + "x")
+	with pytest.raises(ValueError):
+		create_verifier("rsa", KEY)